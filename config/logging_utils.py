@@ -2,6 +2,10 @@ import logging
 import os
 from datetime import datetime
 
+# Carpeta de los logs (y de los reportes de `profile`); PIPELINE_LOG_DIR la reemplaza
+# (los tests la apuntan a un directorio temporal)
+LOG_DIR = os.getenv("PIPELINE_LOG_DIR") or os.path.join(os.path.dirname(__file__), "logs")
+
 def get_logger(ver_cli=False) ->  logging.Logger:
     """
         Crea un Logger para visualizacion de logs:
@@ -9,7 +13,6 @@ def get_logger(ver_cli=False) ->  logging.Logger:
         Se puede indicar ver_cli = True para ver el log por consola
     """
 
-    LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
     os.makedirs(LOG_DIR, exist_ok=True)
 
     RUN_ID = datetime.now().strftime("%Y%m%d_%H%M%S")
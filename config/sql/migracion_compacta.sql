@@ -0,0 +1,50 @@
+-- Almacenamiento compacto de 'events' (SQL.compacto: True). Se ejecuta después de schema.sql
+-- y es idempotente: sobre una tabla ya migrada no hace nada.
+--   user_id    TEXT          -> INTEGER
+--   price      NUMERIC(18,6) -> DOUBLE PRECISION
+--   updated_by TEXT          -> updated_by_id SMALLINT (referencia a 'usuarios_carga')
+-- Los tres cambios se aplican en un solo ALTER TABLE, que reescribe la tabla una vez
+-- y la bloquea mientras tanto.
+
+CREATE TABLE IF NOT EXISTS usuarios_carga (
+    id SMALLSERIAL PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE
+);
+
+-- Id del usuario de carga, registrándolo si es nuevo
+CREATE OR REPLACE FUNCTION id_usuario_carga(p_nombre TEXT) RETURNS SMALLINT AS $$
+DECLARE
+    v_id SMALLINT;
+BEGIN
+    SELECT id INTO v_id FROM usuarios_carga WHERE nombre = p_nombre;
+    IF v_id IS NULL THEN
+        INSERT INTO usuarios_carga (nombre) VALUES (p_nombre)
+        ON CONFLICT (nombre) DO NOTHING;
+        SELECT id INTO v_id FROM usuarios_carga WHERE nombre = p_nombre;
+    END IF;
+    RETURN v_id;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'events' AND column_name = 'updated_by'
+    ) THEN
+        ALTER TABLE events
+            ALTER COLUMN user_id TYPE INTEGER USING user_id::integer,
+            ALTER COLUMN price TYPE DOUBLE PRECISION,
+            ALTER COLUMN updated_by TYPE SMALLINT USING id_usuario_carga(updated_by);
+        ALTER TABLE events RENAME COLUMN updated_by TO updated_by_id;
+        ALTER TABLE events ADD CONSTRAINT fk_events_usuarios_carga
+            FOREIGN KEY (updated_by_id) REFERENCES usuarios_carga (id);
+    END IF;
+END;
+$$;
+
+-- Vista con las columnas originales, para las lecturas (LLM, consultas manuales)
+CREATE OR REPLACE VIEW events_v AS
+SELECT e.id, e.user_id, e.price, e.ts, u.nombre AS updated_by
+FROM events e
+JOIN usuarios_carga u ON u.id = e.updated_by_id;
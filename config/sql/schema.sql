@@ -6,6 +6,12 @@ CREATE TABLE IF NOT EXISTS events (
     updated_by TEXT NOT NULL     
 );
 
+-- Índice para las consultas por usuario del enrutador de preguntas
+CREATE INDEX IF NOT EXISTS idx_events_user_id ON events (user_id);
+
+-- Índice BRIN para consultas por rango de fechas (pequeño; los datos llegan ordenados por ts)
+CREATE INDEX IF NOT EXISTS idx_events_ts_brin ON events USING BRIN (ts);
+
 CREATE TABLE IF NOT EXISTS running_stats (
     id SMALLINT PRIMARY KEY DEFAULT 1,
     count BIGINT NOT NULL,
@@ -18,4 +24,174 @@ CREATE TABLE IF NOT EXISTS running_stats (
 -- Inserta fila única si no existe 
 INSERT INTO running_stats (id, count, mean, min, max)
 SELECT 1, 0, 0.0, 'Infinity'::float8, '-Infinity'::float8
-WHERE NOT EXISTS (SELECT 1 FROM running_stats WHERE id = 1);
\ No newline at end of file
+WHERE NOT EXISTS (SELECT 1 FROM running_stats WHERE id = 1);
+
+-- Momentos de segundo orden (varianza / desviación estándar): M2 = sum((x - mean)^2) y las
+-- compensaciones de las sumas de mean y M2. En una tabla creada antes de estas columnas,
+-- M2 se inicializa una vez desde 'events' (VAR_POP * n).
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'running_stats' AND column_name = 'm2'
+    ) THEN
+        ALTER TABLE running_stats
+            ADD COLUMN m2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+            ADD COLUMN mean_c DOUBLE PRECISION NOT NULL DEFAULT 0,
+            ADD COLUMN m2_c DOUBLE PRECISION NOT NULL DEFAULT 0;
+        UPDATE running_stats
+        SET m2 = COALESCE((SELECT VAR_POP(price) FROM events), 0) * count
+        WHERE count > 1;
+    END IF;
+END;
+$$;
+
+-- Sketch HyperLogLog de los user_id distintos (registros de un byte). Los usuarios ya
+-- cargados antes de agregar la columna no quedan en el sketch.
+ALTER TABLE running_stats ADD COLUMN IF NOT EXISTS hll BYTEA;
+
+-- Unión de dos sketches HyperLogLog: máximo byte a byte (load --worker)
+CREATE OR REPLACE FUNCTION hll_union(a BYTEA, b BYTEA) RETURNS BYTEA AS $$
+DECLARE
+    -- La concatenación deja los valores descomprimidos en memoria: get_byte sobre el
+    -- valor TOAST de la columna lo descomprimiría en cada llamada
+    r BYTEA := a || ''::bytea;
+    x BYTEA := b || ''::bytea;
+    v INT;
+BEGIN
+    IF a IS NULL THEN RETURN b; END IF;
+    IF b IS NULL THEN RETURN a; END IF;
+    FOR i IN 0 .. length(r) - 1 LOOP
+        v := get_byte(x, i);
+        IF v > get_byte(r, i) THEN
+            r := set_byte(r, i, v);
+        END IF;
+    END LOOP;
+    RETURN r;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Filas rechazadas por la validación de la carga (sección VALIDACION de config.yaml),
+-- con los valores como texto (tal como se leyeron del archivo) y el motivo del rechazo.
+CREATE TABLE IF NOT EXISTS cuarentena (
+    id BIGSERIAL PRIMARY KEY,
+    archivo TEXT,
+    user_id TEXT,
+    price TEXT,
+    ts TEXT,
+    motivo TEXT NOT NULL,
+    creado_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Procedencia de las cargas por lotes de archivos (load --coalesce): cada lote inserta
+-- las filas de varios archivos en una transacción y registra aquí las filas de cada uno.
+CREATE SEQUENCE IF NOT EXISTS archivos_cargados_lote_seq;
+CREATE TABLE IF NOT EXISTS archivos_cargados (
+    id BIGSERIAL PRIMARY KEY,
+    lote BIGINT NOT NULL,
+    archivo TEXT NOT NULL,
+    filas BIGINT NOT NULL,
+    rechazadas BIGINT NOT NULL,
+    cargado_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_archivos_cargados_archivo ON archivos_cargados (archivo);
+
+-- Estadísticas por ventana de tiempo (print-stats --window): buffer circular de resúmenes
+-- por bucket de 'ts'. El bucket b (epoch(ts) / bucket_s) ocupa el slot b % buckets.
+CREATE TABLE IF NOT EXISTS running_stats_ventana (
+    slot SMALLINT PRIMARY KEY,
+    bucket BIGINT NOT NULL,
+    count BIGINT NOT NULL,
+    sum DOUBLE PRECISION NOT NULL,
+    min DOUBLE PRECISION NOT NULL,
+    max DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Agregados de 'events' mantenidos por SQL en la misma transacción de cada inserción,
+-- independientes de running_stats (que calcula Python). db-stats suma estas filas
+-- en lugar de recorrer la tabla completa. Cada sesión escribe en una de 16 filas (según
+-- su pid), para que cargas concurrentes en transacciones largas no se bloqueen entre sí.
+CREATE TABLE IF NOT EXISTS events_agg (
+    id SMALLINT PRIMARY KEY DEFAULT 1,
+    count BIGINT NOT NULL,
+    sum NUMERIC NOT NULL,
+    min NUMERIC,
+    max NUMERIC,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Recalcula los agregados desde cero con un recorrido completo de 'events'.
+-- Se usa al crear la tabla sobre datos existentes, tras DELETE/UPDATE (MIN y MAX no se
+-- pueden descontar) y tras eliminar particiones (DROP TABLE no dispara triggers).
+CREATE OR REPLACE FUNCTION recalcular_events_agg() RETURNS VOID AS $$
+BEGIN
+    DELETE FROM events_agg;
+    INSERT INTO events_agg (id, count, sum, min, max, updated_at)
+    SELECT 1, COUNT(*), COALESCE(SUM(price), 0), MIN(price), MAX(price), NOW() FROM events;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger por sentencia: un solo upsert por lote insertado, leyendo las filas nuevas de la
+-- tabla de transición. La fila de la sesión queda bloqueada hasta el commit.
+CREATE OR REPLACE FUNCTION events_agg_insert() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO events_agg AS a (id, count, sum, min, max, updated_at)
+    SELECT 1 + pg_backend_pid() % 16, COUNT(*), COALESCE(SUM(price), 0), MIN(price), MAX(price), NOW()
+    FROM filas_nuevas
+    HAVING COUNT(*) > 0
+    ON CONFLICT (id) DO UPDATE SET
+        count = a.count + EXCLUDED.count,
+        sum = a.sum + EXCLUDED.sum,
+        min = LEAST(a.min, EXCLUDED.min),
+        max = GREATEST(a.max, EXCLUDED.max),
+        updated_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION events_agg_recalcular() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM recalcular_events_agg();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_events_agg_insert
+    AFTER INSERT ON events
+    REFERENCING NEW TABLE AS filas_nuevas
+    FOR EACH STATEMENT EXECUTE FUNCTION events_agg_insert();
+
+CREATE OR REPLACE TRIGGER trg_events_agg_recalcular
+    AFTER UPDATE OR DELETE OR TRUNCATE ON events
+    FOR EACH STATEMENT EXECUTE FUNCTION events_agg_recalcular();
+
+-- Agregados iniciales, calculados sobre lo que ya exista en 'events'
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM events_agg) THEN
+        PERFORM recalcular_events_agg();
+    END IF;
+END;
+$$;
+
+
+-- Cola de archivos para repartir la ingesta entre varios procesos (load --worker).
+-- Cada worker reclama un archivo con FOR UPDATE SKIP LOCKED y lo mantiene con un lease
+-- que renueva con heartbeats; si el lease vence, otro worker puede reintentarlo.
+CREATE TABLE IF NOT EXISTS cola_archivos (
+    nombre TEXT PRIMARY KEY,
+    estado TEXT NOT NULL DEFAULT 'pendiente'
+        CHECK (estado IN ('pendiente', 'en_proceso', 'completado', 'fallido')),
+    intentos INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_hasta TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    filas BIGINT,
+    error TEXT,
+    creado_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    terminado_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_cola_archivos_estado ON cola_archivos (estado, lease_hasta);
@@ -0,0 +1,34 @@
+-- Schema opcional de 'events' particionado por mes sobre 'ts' (SQL.particionado: True).
+-- Se ejecuta antes de schema.sql: como la tabla ya existe, schema.sql solo agrega
+-- los índices (por usuario y BRIN sobre ts, que se propagan a cada partición) y la
+-- tabla running_stats.
+
+CREATE TABLE IF NOT EXISTS events (
+    id BIGSERIAL,
+    user_id TEXT NOT NULL,
+    price NUMERIC(18,6) NOT NULL,
+    ts TIMESTAMPTZ NOT NULL,
+    updated_by TEXT NOT NULL,
+    -- En una tabla particionada la llave primaria debe incluir la columna de partición
+    PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+
+-- Crea (si no existe) la partición mensual que contiene la fecha indicada.
+-- Los límites se calculan en UTC para no depender de la zona horaria de la sesión.
+CREATE OR REPLACE FUNCTION crear_particion_mes(fecha DATE) RETURNS TEXT AS $$
+DECLARE
+    inicio DATE := date_trunc('month', fecha)::date;
+    nombre TEXT := format('events_%s', to_char(inicio, 'YYYY_MM'));
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF events FOR VALUES FROM (%L) TO (%L)',
+        nombre,
+        inicio::timestamp AT TIME ZONE 'UTC',
+        (inicio + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC'
+    );
+    RETURN nombre;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partición del mes en curso
+SELECT crear_particion_mes(CURRENT_DATE);
@@ -0,0 +1,557 @@
+import json
+import time
+import itertools
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+def generar_eventos(n: int, seed: int = 0, usuarios: int = 10) -> pd.DataFrame:
+    """
+        Genera eventos sintéticos con la misma forma que la tabla 'events'
+        (user_id, price, ts, updated_by), reproducibles a partir de `seed`.
+
+        Args:
+            n (int): Número de eventos a generar.
+            seed (int): Semilla del generador aleatorio.
+            usuarios (int): Cantidad de user_id distintos (1..usuarios).
+
+        Returns:
+            pd.DataFrame: DataFrame con n filas.
+    """
+    rng = np.random.default_rng(seed)
+    inicio = pd.Timestamp("2012-01-01", tz="UTC")
+    return pd.DataFrame({
+        "user_id": rng.integers(1, usuarios + 1, size=n),
+        "price": rng.integers(10, 101, size=n).astype(float),
+        "ts": inicio + pd.to_timedelta(rng.integers(0, 365 * 24, size=n), unit="h"),
+        "updated_by": "benchmark",
+    })
+
+
+def percentil_ms(latencias_s: List[float], p: float) -> float:
+    """ Percentil `p` de una lista de latencias en segundos, expresado en milisegundos. """
+    return float(np.percentile(np.asarray(latencias_s), p) * 1000) if latencias_s else float("nan")
+
+
+# Espacio por defecto de los índices HNSW de Chroma
+SPACE_DEFECTO = "l2"
+
+
+def vecinos_exactos(matriz: np.ndarray, consulta: np.ndarray, k: int, space: str = "cosine") -> np.ndarray:
+    """
+        Búsqueda exacta (fuerza bruta) de los k vecinos más cercanos con la métrica del
+        espacio HNSW que se evalúa, para que el recall compare lo mismo que el índice.
+
+        Args:
+            matriz (np.ndarray): Embeddings de los documentos (n x d).
+            consulta (np.ndarray): Embedding de la consulta (d).
+            k (int): Número de vecinos.
+            space (str): 'cosine' (similitud coseno), 'ip' (producto interno) o 'l2'
+                (distancia euclidiana).
+
+        Returns:
+            np.ndarray: Posiciones de los k documentos más cercanos, del más al menos cercano.
+
+        Raises:
+            ValueError: Si el espacio no es válido.
+    """
+    if space == "cosine":
+        normas = np.linalg.norm(matriz, axis=1) * (np.linalg.norm(consulta) or 1.0)
+        similitud = (matriz @ consulta) / np.where(normas == 0, 1.0, normas)
+    elif space == "ip":
+        similitud = matriz @ consulta
+    elif space == "l2":
+        # Mayor similitud = menor distancia (al cuadrado: mismo orden)
+        similitud = -np.sum((matriz - consulta) ** 2, axis=1)
+    else:
+        raise ValueError(f"Espacio HNSW no soportado: {space} (use cosine, ip o l2).")
+    k = min(k, len(similitud))
+    top = np.argpartition(-similitud, k - 1)[:k]
+    return top[np.argsort(-similitud[top])]
+
+
+def _consultas_sinteticas(df: pd.DataFrame, consultas: int, seed: int) -> List[str]:
+    """ Preguntas de prueba construidas a partir de filas aleatorias de los eventos. """
+    rng = np.random.default_rng(seed + 1)
+    muestras = df.iloc[rng.integers(0, len(df), size=consultas)]
+    return [f"compra del usuario {r.user_id} por {r.price} USD el {r.ts}" for r in muestras.itertuples(index=False)]
+
+
+def _medir_consultas(
+    store, embeddings, preguntas: List[str], matriz: np.ndarray, ids: List[str], k: int, space: str,
+) -> Dict[str, float]:
+    """
+        Ejecuta las preguntas contra el vector store midiendo la latencia de cada una y
+        el recall@k frente a los vecinos exactos de la matriz de embeddings, con la
+        métrica `space` del índice.
+    """
+    latencias, aciertos = [], 0
+    for pregunta in preguntas:
+        inicio = time.perf_counter()
+        encontrados = store.similarity_search(pregunta, k=k)
+        latencias.append(time.perf_counter() - inicio)
+
+        exactos = {ids[i] for i in vecinos_exactos(matriz, np.asarray(embeddings.embed_query(pregunta)), k, space)}
+        aciertos += len({d.id for d in encontrados} & exactos)
+
+    return {
+        "p50_ms": percentil_ms(latencias, 50),
+        "p99_ms": percentil_ms(latencias, 99),
+        "recall_k": aciertos / (len(preguntas) * min(k, len(ids))) if preguntas else float("nan"),
+    }
+
+
+def benchmark_recuperacion(
+    config: Dict[str, Any],
+    tamanos: List[int],
+    consultas: int = 100,
+    k: int = None,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+        Mide, para cada tamaño de colección, la velocidad de indexación (documentos/s),
+        la latencia de recuperación (p50/p99) y el recall@k frente a una búsqueda exacta
+        por fuerza bruta sobre los mismos embeddings.
+
+        Cada tamaño se indexa en una colección Chroma nueva dentro de un directorio
+        temporal, con el backend de embeddings y los parámetros HNSW configurados en la
+        sección 'llm' (para no depender de Ollama se usa `backend: local`).
+
+        Args:
+            config (dict): Configuración general con la sección 'llm'.
+            tamanos (list[int]): Tamaños de colección a medir.
+            consultas (int): Número de consultas por tamaño.
+            k (int, opcional): Documentos a recuperar; por defecto el 'k' de la configuración.
+            seed (int): Semilla de los datos sintéticos y de las consultas.
+
+        Returns:
+            list[dict]: Un resultado por tamaño con tamano, docs_por_s, p50_ms, p99_ms
+                y recall_k.
+    """
+    # Imports diferidos: solo este comando necesita Chroma y los backends
+    from langchain_chroma import Chroma
+    from src.submodulos.backends import crear_embeddings
+    from src.submodulos.llm import construir_documentos, configuracion_hnsw
+
+    cfg = config["llm"]
+    k = k or cfg.get("k", 5)
+    embeddings = crear_embeddings(cfg)
+    resultados = []
+
+    hnsw = configuracion_hnsw(cfg)
+    space = hnsw.get("hnsw", {}).get("space", SPACE_DEFECTO)
+
+    for tamano in tamanos:
+        df = generar_eventos(tamano, seed=seed)
+        documentos, ids = construir_documentos(df, cfg.get("metadata"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = Chroma(
+                collection_name=f"benchmark_{tamano}",
+                persist_directory=tmp,
+                embedding_function=embeddings,
+                collection_configuration=hnsw or None,
+            )
+            indexacion_s = _indexar(store, documentos, ids, cfg.get("batch_size"))
+            matriz = np.asarray(embeddings.embed_documents([d.page_content for d in documentos]))
+            medicion = _medir_consultas(store, embeddings, _consultas_sinteticas(df, consultas, seed), matriz, ids, k, space)
+
+        resultado = {
+            "tamano": tamano,
+            "docs_por_s": tamano / indexacion_s if indexacion_s > 0 else float("inf"),
+            **medicion,
+        }
+        logger.info(f"Benchmark recuperación: {resultado}")
+        resultados.append(resultado)
+
+    return resultados
+
+
+def _indexar(store, documentos, ids, batch_size: int = None) -> float:
+    """ Agrega los documentos al vector store por lotes y devuelve el tiempo empleado (s). """
+    batch_size = batch_size or len(documentos) or 1
+    inicio = time.perf_counter()
+    for i in range(0, len(documentos), batch_size):
+        store.add_documents(documents=documentos[i:i + batch_size], ids=ids[i:i + batch_size])
+    return time.perf_counter() - inicio
+
+
+def barrido_hnsw(
+    config: Dict[str, Any],
+    tamano: int,
+    grilla: Dict[str, List[Any]],
+    consultas: int = 100,
+    k: int = None,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+        Barre combinaciones de parámetros HNSW sobre una colección sintética y reporta,
+        para cada una, el recall@k frente a la búsqueda exacta por fuerza bruta y la
+        latencia de consulta (p50/p99).
+
+        Se crea una colección por combinación: Chroma solo aplica un cambio de ef_search
+        al cargar el índice, por lo que no se puede variar sobre un índice ya cargado en
+        el mismo proceso.
+
+        Args:
+            config (dict): Configuración general con la sección 'llm'.
+            tamano (int): Número de documentos de la colección.
+            grilla (dict): Listas de valores por parámetro: "space", "M",
+                "ef_construction" y "ef_search".
+            consultas (int): Número de consultas por combinación.
+            k (int, opcional): Documentos a recuperar; por defecto el 'k' de la configuración.
+            seed (int): Semilla de los datos sintéticos y de las consultas.
+
+        Returns:
+            list[dict]: Un resultado por combinación con space, M, ef_construction,
+                ef_search, indexacion_s, p50_ms, p99_ms y recall_k.
+    """
+    from langchain_chroma import Chroma
+    from src.submodulos.backends import crear_embeddings
+    from src.submodulos.llm import construir_documentos
+
+    cfg = config["llm"]
+    k = k or cfg.get("k", 5)
+    embeddings = crear_embeddings(cfg)
+
+    df = generar_eventos(tamano, seed=seed)
+    documentos, ids = construir_documentos(df, cfg.get("metadata"))
+    preguntas = _consultas_sinteticas(df, consultas, seed)
+    # La línea base exacta se calcula una sola vez para todo el barrido
+    matriz = np.asarray(embeddings.embed_documents([d.page_content for d in documentos]))
+
+    resultados = []
+    combinaciones = itertools.product(grilla["space"], grilla["M"], grilla["ef_construction"], grilla["ef_search"])
+    for space, m, ef_construction, ef_search in combinaciones:
+        parametros = {"space": space, "max_neighbors": m, "ef_construction": ef_construction, "ef_search": ef_search}
+        with tempfile.TemporaryDirectory() as tmp:
+            store = Chroma(
+                collection_name=f"barrido_{space}_{m}_{ef_construction}_{ef_search}",
+                persist_directory=tmp,
+                embedding_function=embeddings,
+                collection_configuration={"hnsw": parametros},
+            )
+            indexacion_s = _indexar(store, documentos, ids, cfg.get("batch_size"))
+            resultado = {
+                "space": space,
+                "M": m,
+                "ef_construction": ef_construction,
+                "ef_search": ef_search,
+                "indexacion_s": indexacion_s,
+                # Vecinos exactos con la métrica del espacio de esta combinación
+                **_medir_consultas(store, embeddings, preguntas, matriz, ids, k, space),
+            }
+        logger.info(f"Barrido HNSW: {resultado}")
+        resultados.append(resultado)
+
+    return resultados
+
+
+# Versión del formato del archivo de línea base (`perf-check`)
+VERSION_BASE = 2
+
+
+def mejor_tiempo(funcion, repeticiones: int = 5, preparar=None) -> float:
+    """
+        Mejor tiempo (s) de `repeticiones` ejecuciones de `funcion()`, después de una de
+        calentamiento. El mínimo es la medida menos sensible al ruido de la máquina.
+        `preparar()`, si se indica, se ejecuta antes de cada corrida sin contar su tiempo.
+    """
+    mejor = float("inf")
+    for corrida in range(repeticiones + 1):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        if corrida:
+            mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def calibracion():
+    """
+        Carga fija de referencia, sin E/S: ordenar y agrupar con numpy y pandas, y un ciclo
+        en Python puro. Su tiempo mide la velocidad de la máquina; `perf-check` compara las
+        demás métricas en múltiplos de él, no en segundos.
+    """
+    valores = np.random.default_rng(0).random(200_000)
+    np.sort(valores)
+    pd.Series(valores).groupby((valores * 1000).astype(np.int64)).sum()
+    return sum(int(x * 1000) for x in valores[:50_000])
+
+
+def medir_calibracion(parametros: Dict[str, Any]) -> Dict[str, float]:
+    """ Métrica 'calibracion': mejor tiempo (s) de `calibracion` en 'repeticiones' corridas. """
+    return {"calibracion": mejor_tiempo(calibracion, parametros["repeticiones"])}
+
+
+def relativas(metricas: Dict[str, float]) -> Dict[str, float]:
+    """
+        Métricas expresadas en múltiplos de 'calibracion' (sin ella). El cociente se
+        mantiene entre máquinas más o menos rápidas, a diferencia de los segundos.
+
+        Raises:
+            KeyError: Si no se midió la calibración.
+    """
+    referencia = metricas["calibracion"]
+    return {nombre: valor / referencia for nombre, valor in metricas.items() if nombre != "calibracion"}
+
+
+def escribir_csv_eventos(df: pd.DataFrame, path: Path) -> Path:
+    """ Escribe eventos de `generar_eventos` con el formato de los CSV de entrada (timestamp %m/%d/%Y, price, user_id). """
+    pd.DataFrame({
+        "timestamp": df["ts"].dt.strftime("%m/%d/%Y"),
+        "price": df["price"].astype(int),
+        "user_id": df["user_id"],
+    }).to_csv(path, index=False)
+    return path
+
+
+def parametros_rendimiento(config: Dict[str, Any]) -> Dict[str, Any]:
+    """ Parámetros de los benchmarks de rendimiento (sección 'BENCHMARK', con valores por defecto). """
+    cfg = config.get('BENCHMARK') or {}
+    e2e = cfg.get("e2e") or {}
+    return {
+        "filas": cfg.get("filas", 100_000),
+        "chunksize": cfg.get("chunksize", 5000),
+        "repeticiones": cfg.get("repeticiones", 5),
+        "e2e_archivos": e2e.get("archivos", 4),
+        "e2e_filas": e2e.get("filas", 50_000),
+        "e2e_repeticiones": e2e.get("repeticiones", 3),
+    }
+
+
+def benchmark_componentes(config: Dict[str, Any], parametros: Dict[str, Any]) -> Dict[str, float]:
+    """
+        Micro-benchmarks del pipeline de carga, sin base de datos, sobre un CSV sintético
+        de 'filas' eventos. Cada métrica es el mejor tiempo (s) de 'repeticiones' corridas:
+            - lectura: `leer_chunks` del CSV completo por chunks de 'chunksize'.
+            - limpieza_df: los pasos de `limpieza_df` de `procesar_chunk` sobre todas las filas.
+            - validacion: `Validador.separar` sobre todas las filas.
+            - running_stats.update_one: `RunningStats.update_one` por fila (modo row).
+            - running_stats.chunk: resumen de cada chunk, `merge_batch` y el sketch de
+              usuarios (modo chunk).
+            - ventana.update_batch: `WindowedStats.update_batch` sobre todas las filas.
+
+        Args:
+            config (dict): Configuración general (secciones 'CSV' y 'VALIDACION').
+            parametros (dict): Ver `parametros_rendimiento`.
+
+        Returns:
+            dict: Métrica → segundos.
+    """
+    from src.modulos.ingesta import leer_chunks, nueva_ventana
+    from src.modulos.limpieza import limpieza_df
+    from src.modulos.stats import RunningStats
+    from src.modulos.validacion import Validador
+
+    filas, chunksize, repeticiones = parametros["filas"], parametros["chunksize"], parametros["repeticiones"]
+    validador = Validador(config)
+
+    def _fechas(crudo):
+        return limpieza_df(crudo).renombrar_columnas({"timestamp": "ts"}).cambiar_tipo_fecha(["ts"]).resultado()
+
+    def _limpiar(validas):
+        return (
+            limpieza_df(validas.assign(updated_by="benchmark"))
+                .reducir_tipos(enteros=["user_id"], categoricas=["updated_by"])
+                .convertir_tipos({"price": "float"})
+                .eliminar_duplicados()
+                .resultado()
+        )
+
+    def _stats_por_chunk(limpio):
+        rs = RunningStats()
+        for inicio in range(0, len(limpio), chunksize):
+            parte = limpio.iloc[inicio:inicio + chunksize]
+            precios = parte["price"]
+            mean = float(precios.mean())
+            rs.merge_batch(len(parte), mean, float(precios.min()), float(precios.max()), float(((precios - mean) ** 2).sum()))
+            rs.usuarios.update_batch(parte["user_id"].to_numpy())
+
+    def _update_one(precios):
+        rs = RunningStats()
+        for x in precios:
+            rs.update_one(x)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = escribir_csv_eventos(generar_eventos(filas, seed=1, usuarios=1000), Path(tmp) / "eventos.csv")
+        crudo = pd.concat(list(leer_chunks(path, chunksize, config)), ignore_index=True)
+        fechas = _fechas(crudo)
+        validas, _ = validador.separar(fechas, crudo=crudo)
+        limpio = _limpiar(validas)
+        precios = limpio["price"].astype(float).tolist()
+
+        metricas = {
+            "lectura": mejor_tiempo(lambda: sum(len(c) for c in leer_chunks(path, chunksize, config)), repeticiones),
+            "limpieza_df": mejor_tiempo(lambda: _limpiar(_fechas(crudo)), repeticiones),
+            "validacion": mejor_tiempo(lambda: validador.separar(fechas, crudo=crudo), repeticiones),
+            "running_stats.update_one": mejor_tiempo(lambda: _update_one(precios), repeticiones),
+            "running_stats.chunk": mejor_tiempo(lambda: _stats_por_chunk(limpio), repeticiones),
+            "ventana.update_batch": mejor_tiempo(lambda: nueva_ventana(config).update_batch(limpio["ts"], limpio["price"]), repeticiones),
+        }
+    logger.info(f"Benchmark de componentes: {metricas}")
+    return metricas
+
+
+def benchmark_carga(config: Dict[str, Any], parametros: Dict[str, Any], mode: str = "chunk") -> Dict[str, float]:
+    """
+        Carga de punta a punta con `ingest_file`: 'e2e_archivos' CSV sintéticos de
+        'e2e_filas' eventos pasan por la lectura, limpieza, validación, inserción y la
+        persistencia de las estadísticas tras cada chunk, con sus commits. Para no tocar
+        las tablas reales, la carga ocurre en un esquema desechable de la base de datos
+        configurada (`db.esquema_temporal`), que se vacía y se crea con `init_db` antes de
+        cada corrida (sin contar ese tiempo) y se elimina al terminar.
+
+        Args:
+            config (dict): Configuración general (secciones 'CSV', 'VALIDACION' y 'SQL').
+            parametros (dict): Ver `parametros_rendimiento`.
+            mode (str): "row" o "chunk", como en `ingest_file`.
+
+        Returns:
+            dict: {"carga.e2e": mejor tiempo en segundos}.
+
+        Raises:
+            psycopg2.OperationalError: Si no hay conexión a la base de datos.
+    """
+    import contextlib
+    import io
+    import os
+    from src.modulos.db import esquema_temporal, reiniciar_esquema
+    from src.modulos.ingesta import ingest_file
+
+    def _cargar(paths):
+        # Sin los prints de progreso de cada chunk
+        with contextlib.redirect_stdout(io.StringIO()):
+            for path in paths:
+                ingest_file(path, mode, parametros["chunksize"], config)
+
+    with tempfile.TemporaryDirectory() as tmp, esquema_temporal(config, f"perf_check_{os.getpid()}") as esquema:
+        paths = [
+            escribir_csv_eventos(generar_eventos(parametros["e2e_filas"], seed=i, usuarios=1000), Path(tmp) / f"eventos_{i}.csv")
+            for i in range(parametros["e2e_archivos"])
+        ]
+        metricas = {"carga.e2e": mejor_tiempo(
+            lambda: _cargar(paths), parametros["e2e_repeticiones"], preparar=lambda: reiniciar_esquema(config, esquema),
+        )}
+    logger.info(f"Benchmark de carga: {metricas}")
+    return metricas
+
+
+def entorno() -> Dict[str, Any]:
+    """ Versiones y máquina en que se midieron los benchmarks (se guardan con la línea base). """
+    import os
+    import platform
+    cpu = platform.processor()
+    memoria = None
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            cpu = next((l.split(":", 1)[1].strip() for l in f if l.startswith("model name")), cpu)
+        with open("/proc/meminfo", encoding="utf-8") as f:
+            memoria = round(int(next(l for l in f if l.startswith("MemTotal")).split()[1]) / 2**20, 1)
+    except (OSError, StopIteration):
+        # Fuera de Linux queda lo que informa `platform`
+        pass
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpu": cpu or platform.machine(),
+        "cpus": os.cpu_count(),
+        "memoria_gib": memoria,
+    }
+
+
+def configuracion_carga(config: Dict[str, Any], mode: str = "chunk") -> Dict[str, Any]:
+    """ Opciones de la configuración que cambian los tiempos de la carga (se guardan con la línea base). """
+    sql = config.get('SQL') or {}
+    return {
+        "mode": mode,
+        "page_size": sql.get("page_size"),
+        "particionado": bool(sql.get("particionado")),
+        "compacto": bool(sql.get("compacto")),
+        "dtypes": (config.get('CSV') or {}).get("dtypes"),
+    }
+
+
+def guardar_linea_base(path: Path, metricas: Dict[str, float], parametros: Dict[str, Any], configuracion: Dict[str, Any] = None):
+    """
+        Escribe la línea base versionada: formato, fecha, entorno, configuración de la carga,
+        parámetros y métricas (s, con la de 'calibracion').
+    """
+    datos = {
+        "version": VERSION_BASE,
+        "creada": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "entorno": entorno(),
+        "configuracion": configuracion,
+        "parametros": parametros,
+        "metricas": {nombre: round(valor, 6) for nombre, valor in sorted(metricas.items())},
+    }
+    Path(path).write_text(json.dumps(datos, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def cargar_linea_base(path: Path, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """
+        Lee la línea base y verifica que sea comparable con la medición actual.
+
+        Raises:
+            FileNotFoundError: Si no existe (se crea con `perf-check --update-baseline`).
+            ValueError: Si es de otra versión de formato, no tiene la calibración o se midió
+                con otros parámetros.
+    """
+    datos = json.loads(Path(path).read_text(encoding="utf-8"))
+    if datos.get("version") != VERSION_BASE:
+        raise ValueError(f"La línea base {path} tiene la versión {datos.get('version')} (se esperaba {VERSION_BASE}).")
+    if not datos.get("metricas", {}).get("calibracion"):
+        raise ValueError(f"La línea base {path} no tiene la métrica 'calibracion': regenérela con --update-baseline.")
+    distintos = sorted(k for k in parametros if datos.get("parametros", {}).get(k) != parametros[k])
+    if distintos:
+        raise ValueError(f"La línea base {path} se midió con otros parámetros ({', '.join(distintos)}): regenérela con --update-baseline.")
+    return datos
+
+
+def comparar_con_linea_base(
+    metricas: Dict[str, float], base: Dict[str, float], tolerancia: float, tolerancias: Dict[str, float] = None,
+) -> List[Dict[str, Any]]:
+    """
+        Compara cada métrica (tiempo, menor es mejor) con la línea base. `perf-check` las
+        compara en múltiplos de la calibración (ver `relativas`).
+
+        Args:
+            metricas (dict): Métrica → tiempo medido.
+            base (dict): Métrica → tiempo de la línea base, en la misma unidad.
+            tolerancia (float): Aumento relativo admitido (0.3 = 30 % más lento).
+            tolerancias (dict, opcional): Tolerancia propia de algunas métricas.
+
+        Returns:
+            list[dict]: Por métrica: metrica, base, actual, delta (relativo, None sin base),
+                tolerancia y estado: 'ok', 'regresion', 'mejora' (más rápido que la
+                tolerancia), 'nueva' (sin base) u 'omitida' (en la base, no medida).
+    """
+    tolerancias = tolerancias or {}
+    resultados = []
+    for nombre in sorted(set(metricas) | set(base)):
+        tol = tolerancias.get(nombre, tolerancia)
+        actual, referencia = metricas.get(nombre), base.get(nombre)
+        delta = (actual - referencia) / referencia if actual is not None and referencia else None
+        if actual is None:
+            estado = "omitida"
+        elif delta is None:
+            estado = "nueva"
+        elif delta > tol:
+            estado = "regresion"
+        elif delta < -tol:
+            estado = "mejora"
+        else:
+            estado = "ok"
+        resultados.append({"metrica": nombre, "base": referencia, "actual": actual, "delta": delta, "tolerancia": tol, "estado": estado})
+    return resultados
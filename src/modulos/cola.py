@@ -0,0 +1,175 @@
+import os
+import signal
+import socket
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+from src.modulos.db import (
+    get_conn, conexion, limpiar_caches, merge_running_stats, encolar_archivos, reclamar_archivo,
+    renovar_lease, completar_archivo, fallar_archivo, estado_cola
+)
+from src.modulos.ingesta import iter_csv_files, cargar_archivo_en_transaccion, persist_windowed_stats, reportar_memoria
+from src.modulos.memoria import reiniciar_pico
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+class WorkerCola:
+    """
+        Worker de ingesta distribuida (`load --worker`): varios procesos, en una o varias
+        máquinas con el mismo 'CSV_DIR' montado, se reparten los archivos a través de la
+        tabla 'cola_archivos'.
+
+        - Al iniciar, registra en la cola los archivos de `iter_csv_files` (los ya
+          registrados no cambian).
+        - Reclama un archivo a la vez con FOR UPDATE SKIP LOCKED y lo mantiene con un lease
+          que un hilo de heartbeat renueva cada 'heartbeat_s'.
+        - Carga el archivo en una sola transacción que también fusiona sus estadísticas con
+          'running_stats' y 'running_stats_ventana' y lo marca 'completado' solo si el lease
+          sigue siendo suyo: si el lease venció y otro worker lo tomó, la transacción se
+          revierte y el archivo no se carga dos veces.
+        - Si la carga falla, el archivo vuelve a 'pendiente' hasta 'max_intentos'. Un worker
+          que muere deja vencer su lease y otro reintenta el archivo.
+        - Termina cuando no quedan archivos por tomar ni en proceso en otros workers, o al
+          recibir SIGINT/SIGTERM (después de terminar el archivo en curso).
+
+        Metodos:
+        --------
+            ejecutar() -> dict
+                Procesa archivos de la cola hasta vaciarla.
+    """
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        mode: str = "row",
+        chunksize: int = 1,
+        include_validation: bool = False,
+        worker_id: str = None,
+    ):
+        cola = config['SQL'].get("cola") or {}
+        self.config = config
+        self.mode = mode
+        self.chunksize = chunksize
+        self.include_validation = include_validation
+        self.worker = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.directorio = Path(config['CSV'].get("CSV_DIR"))
+        self.heartbeat_s = cola.get("heartbeat_s", 15)
+        self.espera_s = cola.get("espera_s", 5)
+        self.detener = threading.Event()
+
+    def ejecutar(self) -> Dict[str, int]:
+        """ Procesa archivos de la cola hasta vaciarla o recibir una señal; devuelve un resumen. """
+        nombres = [p.name for p in iter_csv_files(self.config, self.include_validation)]
+        encolar_archivos(nombres, self.config)
+        logger.info(f"→ Worker {self.worker} iniciado.")
+        print(f"→ Worker {self.worker} iniciado.")
+
+        resumen = {"completados": 0, "fallidos": 0, "filas": 0}
+        anteriores = self._instalar_senales()
+        try:
+            while not self.detener.is_set():
+                reclamado = reclamar_archivo(self.worker, self.config)
+                if reclamado is None:
+                    por_tomar, en_proceso = estado_cola(self.config)
+                    if por_tomar == 0 and en_proceso == 0:
+                        break
+                    # Quedan archivos en otros workers: si sus leases vencen, se reintentan aquí
+                    self.detener.wait(self.espera_s)
+                    continue
+
+                nombre, intento = reclamado
+                filas = self._procesar(nombre, intento)
+                if filas is None:
+                    resumen["fallidos"] += 1
+                else:
+                    resumen["completados"] += 1
+                    resumen["filas"] += filas
+        finally:
+            self._restaurar_senales(anteriores)
+
+        logger.info(f"✓ Worker {self.worker} terminado: {resumen}")
+        print(f"✓ Worker {self.worker} terminado: {resumen['completados']} archivos, {resumen['filas']} filas, {resumen['fallidos']} con error.")
+        return resumen
+
+    def _procesar(self, nombre: str, intento: int):
+        """ Carga un archivo reclamado; devuelve las filas insertadas o None si no se completó. """
+        logger.info(f"→ [{self.worker}] Ingestando {nombre} (intento {intento})")
+        print(f"→ [{self.worker}] Ingestando {nombre} (intento {intento})")
+
+        perdido = threading.Event()
+        fin = threading.Event()
+        hilo = threading.Thread(target=self._heartbeat, args=(nombre, fin, perdido), daemon=True)
+        hilo.start()
+        reiniciar_pico()
+        try:
+            # Conexión del pool: sus sentencias preparadas sirven para todos los archivos
+            with conexion(self.config['SQL']) as conn:
+                filas, rs, ventana = cargar_archivo_en_transaccion(self.directorio / nombre, self.mode, self.chunksize, self.config, conn)
+                if perdido.is_set() or not completar_archivo(nombre, self.worker, filas, self.config, conn):
+                    # Otro worker tomó el archivo: se descarta todo lo insertado
+                    conn.rollback()
+                    limpiar_caches()
+                    logger.warning(f"[{self.worker}] Lease de {nombre} perdido: la carga se revirtió.")
+                    print(f"   ! Lease de {nombre} perdido: la carga se revirtió.")
+                    return None
+                merge_running_stats(
+                    rs.count, rs.mean + rs.mean_c, rs.min, rs.max, self.config, conn,
+                    m2=rs.m2 + rs.m2_c, hll=rs.usuarios.a_bytes(),
+                )
+                persist_windowed_stats(ventana, self.config, conn=conn)
+                conn.commit()
+        except Exception as e:
+            limpiar_caches()
+            logger.exception(f"[{self.worker}] Error cargando {nombre}: {e}")
+            print(f"   ! Error cargando {nombre}: {e}")
+            fallar_archivo(nombre, self.worker, e, self.config)
+            return None
+        finally:
+            fin.set()
+            hilo.join()
+
+        logger.info(f"✓ [{self.worker}] Terminado {nombre}: {filas} filas.")
+        print(f"✓ [{self.worker}] Terminado {nombre}: {filas} filas.")
+        reportar_memoria(nombre)
+        return filas
+
+    def _heartbeat(self, nombre: str, fin: threading.Event, perdido: threading.Event):
+        """ Renueva el lease cada 'heartbeat_s' con su propia conexión hasta que termine la carga. """
+        conn = None
+        try:
+            while not fin.wait(self.heartbeat_s):
+                try:
+                    conn = conn or get_conn()
+                    if not renovar_lease(nombre, self.worker, self.config, conn):
+                        perdido.set()
+                        return
+                except Exception as e:
+                    # Un heartbeat fallido no detiene la carga; si el lease vence, el
+                    # marcado final lo detecta y la transacción se revierte
+                    logger.warning(f"[{self.worker}] Heartbeat de {nombre} falló: {e}")
+                    conn = None
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _instalar_senales(self):
+        def _terminar(signum, frame):
+            logger.info(f"Señal {signum} recibida: el worker termina después del archivo en curso.")
+            print("   Señal recibida: se termina después del archivo en curso.")
+            self.detener.set()
+
+        anteriores = {}
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                anteriores[sig] = signal.signal(sig, _terminar)
+            except ValueError:
+                # Solo el hilo principal puede instalar manejadores
+                pass
+        return anteriores
+
+    @staticmethod
+    def _restaurar_senales(anteriores):
+        for sig, manejador in anteriores.items():
+            signal.signal(sig, manejador)
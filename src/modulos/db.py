@@ -1,7 +1,12 @@
+import atexit
 import os
-import pandas as pd
+import re
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2 import sql
 from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -9,6 +14,13 @@ from config.logging_utils import get_logger
 logger = get_logger()
 load_dotenv()
 
+class ConexionPreparada(psycopg2.extensions.connection):
+    """ Conexión que recuerda las sentencias ya preparadas (PREPARE) en su sesión. """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+
+
 def get_conn():
     """
         Crea y devuelve una conexión a la base de datos PostgreSQL usando variables de entorno.
@@ -37,13 +49,290 @@ def get_conn():
     logger.info(f"Conexión a base de datos {PG_DB} establecida con usuario {PG_USER} .")
 
     return psycopg2.connect(
-        dbname=PG_DB, user=PG_USER, password=PG_PASSWORD, host=PG_HOST, port=PG_PORT
+        dbname=PG_DB, user=PG_USER, password=PG_PASSWORD, host=PG_HOST, port=PG_PORT,
+        connection_factory=ConexionPreparada,
     )
 
 
+class _PoolConexiones(ThreadedConnectionPool):
+    """ Pool cuyas conexiones se crean con `get_conn` (mismas variables de entorno). """
+    def _connect(self, key=None):
+        conn = get_conn()
+        if key is not None:
+            self._used[key] = conn
+            self._rused[id(conn)] = key
+        else:
+            self._pool.append(conn)
+        return conn
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _cerrar_pool():
+    global _pool
+    if _pool is not None and not _pool.closed:
+        _pool.closeall()
+    _pool = None
+
+
+atexit.register(_cerrar_pool)
+
+
+@contextmanager
+def conexion(config):
+    """
+        Conexión del pool del proceso, para las consultas que se repiten en cada chunk
+        (inserción y estadísticas): la conexión y sus sentencias preparadas se reutilizan
+        durante toda la carga en lugar de abrir una conexión por llamada.
+        Hace commit al salir, rollback si hay una excepción, y devuelve la conexión al pool
+        (una conexión rota se descarta).
+
+        Args:
+            config (dict): Sección 'SQL' de la configuración ('pool': 'minconn', 'maxconn').
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            cfg = config.get("pool") or {}
+            _pool = _PoolConexiones(cfg.get("minconn", 1), cfg.get("maxconn", 4))
+        pool = _pool
+    conn = pool.getconn()
+    cerrar = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        cerrar = bool(conn.closed)
+        if not cerrar:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=cerrar)
+
+
+def retraso_replica(conn, config):
+    """
+        Retraso de replicación, en segundos, del servidor de la conexión: 0 si es un primario
+        o si ya aplicó todo lo recibido; None si nunca aplicó una transacción.
+
+        Args:
+            conn (psycopg2.extensions.connection): Conexión al servidor a revisar.
+            config (dict): Sección 'SQL' de la configuración, con 'query_retraso_replica'.
+    """
+    with conn.cursor() as cur:
+        cur.execute(config.get("query_retraso_replica"))
+        retraso = cur.fetchone()[0]
+    return float(retraso) if retraso is not None else None
+
+
+def get_conn_lectura(config):
+    """
+        Conexión de solo lectura para las consultas analíticas (print-stats, db-stats, llm),
+        según 'SQL.lectura': la réplica si está configurada ('host' o la variable de entorno
+        PGHOST_LECTURA), responde en 'timeout_s' y su retraso no supera 'max_retraso_s';
+        en otro caso, el primario (`get_conn`). Base de datos, usuario y contraseña son los
+        del primario salvo que 'lectura' indique 'dbname' / 'user' o exista
+        POSTGRES_PASSWORD_LECTURA.
+
+        Args:
+            config (dict): Sección 'SQL' de la configuración.
+
+        Returns:
+            psycopg2.extensions.connection: Conexión en modo solo lectura.
+    """
+    cfg = config.get("lectura") or {}
+    host = cfg.get("host") or os.getenv("PGHOST_LECTURA")
+    conn = None
+    if host:
+        try:
+            conn = psycopg2.connect(
+                dbname=cfg.get("dbname") or os.getenv("POSTGRES_DB"),
+                user=cfg.get("user") or os.getenv("POSTGRES_USER"),
+                password=os.getenv("POSTGRES_PASSWORD_LECTURA") or os.getenv("POSTGRES_PASSWORD"),
+                host=host,
+                port=int(cfg.get("port") or os.getenv("PGPORT_LECTURA") or os.getenv("PGPORT")),
+                connect_timeout=cfg.get("timeout_s", 3),
+                connection_factory=ConexionPreparada,
+            )
+            conn.set_session(readonly=True)
+            retraso = retraso_replica(conn, config)
+            conn.rollback()
+        except psycopg2.Error as e:
+            logger.warning(f"Réplica de lectura {host} no disponible ({e}); se lee del primario.")
+            if conn is not None:
+                conn.close()
+            conn = None
+        else:
+            max_retraso = cfg.get("max_retraso_s")
+            if max_retraso is not None and (retraso is None or retraso > max_retraso):
+                logger.warning(f"Réplica de lectura {host} con retraso {retraso}s (máximo {max_retraso}s); se lee del primario.")
+                conn.close()
+                conn = None
+            else:
+                logger.info(f"Lectura desde la réplica {host} (retraso {retraso}s).")
+    if conn is None:
+        conn = get_conn()
+        conn.set_session(readonly=True)
+    return conn
+
+
+@contextmanager
+def conexion_lectura(config):
+    """
+        Conexión de `get_conn_lectura` para una consulta: se cierra al salir (las lecturas
+        son ocasionales y no usan el pool de la carga).
+
+        Args:
+            config (dict): Sección 'SQL' de la configuración ('lectura').
+    """
+    conn = get_conn_lectura(config)
+    try:
+        yield conn
+    finally:
+        if not conn.closed:
+            conn.rollback()
+            conn.close()
+
+
+# Registro de sentencias preparadas: queries de la sección 'SQL' que se ejecutan en cada
+# chunk o archivo. Se preparan una vez por conexión (PREPARE) y luego solo se ejecutan
+# (EXECUTE), sin que el servidor vuelva a analizar y planificar el texto.
+SENTENCIAS = (
+    "insert_query", "query_cuarentena", "query_update", "query_running", "query_merge_running", "query_ventana",
+)
+
+_MARCADOR = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+def a_marcadores_posicionales(query):
+    """
+        Convierte los marcadores de psycopg2 de una query ('%s' o '%(nombre)s') en los
+        parámetros posicionales de PREPARE ($1, $2, ...). Un mismo '%(nombre)s' usa siempre
+        el mismo parámetro.
+
+        Returns:
+            tuple[str, list]: Texto con $n y, por parámetro, su nombre (None si es '%s').
+    """
+    nombres = []
+
+    def _reemplazar(m):
+        if m.group(0) == "%%":
+            return "%"
+        nombre = m.group(1)
+        if nombre is not None and nombre in nombres:
+            return f"${nombres.index(nombre) + 1}"
+        nombres.append(nombre)
+        return f"${len(nombres)}"
+
+    return _MARCADOR.sub(_reemplazar, query).strip().rstrip(";"), nombres
+
+
+def _clave_query(config, nombre):
+    """ Clave efectiva de la query: `<nombre>_compacto` si aplica la variante compacta. """
+    if config.get("compacto") and config.get(f"{nombre}_compacto"):
+        return f"{nombre}_compacto"
+    return nombre
+
+
+def preparar(cur, nombre, config):
+    """
+        Prepara (si la conexión aún no la tiene) la sentencia registrada `nombre`.
+        El nombre de la sentencia en el servidor es la clave efectiva de la query.
+
+        Returns:
+            list: Nombres de los parámetros de la sentencia (ver `a_marcadores_posicionales`).
+    """
+    clave = _clave_query(config, nombre)
+    texto, nombres = a_marcadores_posicionales(config.get(clave))
+    preparadas = cur.connection.preparadas
+    if clave not in preparadas:
+        cur.execute(f"PREPARE {clave} AS {texto}")
+        preparadas.add(clave)
+    return nombres
+
+
+def ejecutar_preparada(cur, nombre, config, params=()):
+    """
+        Ejecuta una query del registro `SENTENCIAS` con EXECUTE, preparándola la primera vez
+        en esta conexión. Con una conexión sin registro de sentencias (que no se creó con
+        `get_conn`) se ejecuta el texto de la query directamente.
+
+        Args:
+            cur (psycopg2.extensions.cursor): Cursor de la conexión.
+            nombre (str): Clave de la query en la sección 'SQL'.
+            config (dict): Sección 'SQL' de la configuración.
+            params (tuple | dict): Parámetros, como se pasarían a `cur.execute` con el texto.
+    """
+    if not hasattr(getattr(cur, "connection", None), "preparadas"):
+        cur.execute(get_query(config, nombre), params or None)
+        return
+    nombres = preparar(cur, nombre, config)
+    if isinstance(params, dict):
+        params = tuple(params[n] for n in nombres)
+    if not nombres:
+        cur.execute(f"EXECUTE {_clave_query(config, nombre)}")
+        return
+    cur.execute(f"EXECUTE {_clave_query(config, nombre)} ({', '.join(['%s'] * len(nombres))})", params)
+
+
+def validar_sql(config):
+    """
+        Valida al inicio de una carga las queries del registro: las prepara en una conexión
+        del pool, de modo que un error de sintaxis, una tabla o columna inexistente o un
+        parámetro sin tipo en 'config.yaml' se detecta antes de leer el primer archivo.
+        Las sentencias quedan preparadas en esa conexión para la carga.
+
+        Args:
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'.
+
+        Raises:
+            ValueError: Si una query falta en la configuración o el servidor la rechaza.
+    """
+    config = config['SQL']
+    with conexion(config) as conn, conn.cursor() as cur:
+        for nombre in SENTENCIAS:
+            clave = _clave_query(config, nombre)
+            if not config.get(clave):
+                raise ValueError(f"Falta la query '{clave}' en la sección SQL de la configuración.")
+            try:
+                preparar(cur, nombre, config)
+            except psycopg2.Error as e:
+                conn.rollback()
+                logger.error(f"La query '{clave}' de la configuración no es válida: {e}")
+                raise ValueError(f"La query '{clave}' de la configuración no es válida: {str(e).strip()}") from e
+    logger.info(f"Queries de la configuración validadas y preparadas: {', '.join(SENTENCIAS)}.")
+
+
+# Meses (primer día) cuya partición ya se aseguró en este proceso
+_particiones_creadas = set()
+# Nombre → id de 'usuarios_carga' ya resueltos en este proceso (almacenamiento compacto)
+_usuarios_carga = {}
+
+
+def get_query(config, nombre):
+    """
+        Devuelve la query `nombre` de la sección 'SQL', o su variante `<nombre>_compacto`
+        si el almacenamiento compacto está activo y la variante existe.
+
+        Args:
+            config (dict): Sección 'SQL' de la configuración.
+            nombre (str): Clave de la query.
+
+        Returns:
+            str: Texto de la query.
+    """
+    return config.get(_clave_query(config, nombre))
+
+
 def init_db(config):
     """
         Inicializa la base de datos ejecutando un script SQL.
+        Si 'particionado' está activo, antes ejecuta el script de la tabla 'events'
+        particionada por mes ('sql_path_particionado'), que crea la partición del mes en curso.
+        Si 'compacto' está activo, después ejecuta la migración al almacenamiento compacto
+        ('sql_path_compacto'), que también convierte una tabla 'events' con datos.
 
         Args:
             config (dict): Diccionario de configuración que contiene la clave 'SQL' 
@@ -55,21 +344,215 @@ def init_db(config):
     """
     config = config['SQL']
 
-    sql_path = Path(__file__).parents[2] / config.get("sql_path")
+    base = Path(__file__).parents[2]
+    scripts = [base / config.get("sql_path")]
+    if config.get("particionado"):
+        scripts.insert(0, base / config.get("sql_path_particionado"))
+    if config.get("compacto"):
+        scripts.append(base / config.get("sql_path_compacto"))
+
     with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(sql_path.read_text())
+        for sql_path in scripts:
+            cur.execute(sql_path.read_text())
         conn.commit()
         logger.info('DB inicializada.')
 
-def insert_events(rows, config):
+
+def meses_de_ts(ts):
+    """
+        Meses (primer día, en UTC) a los que pertenecen las filas a insertar, calculados
+        sobre la columna 'ts' completa, sin armar un Timestamp por fila.
+
+        Args:
+            ts (pd.Series | Sequence): Fechas de las filas; sin zona horaria se toman como UTC.
+
+        Returns:
+            set[datetime.date]: Primer día de cada mes presente en las filas.
+    """
+    import pandas as pd
+
+    fechas = pd.DatetimeIndex(pd.to_datetime(ts, utc=True)).tz_convert(None)
+    return {mes.start_time.date() for mes in fechas.to_period("M").unique()}
+
+
+def asegurar_particiones(cur, meses, config):
+    """
+        Crea las particiones mensuales que necesitan las filas y que aún no se hayan
+        asegurado en este proceso (la función SQL es idempotente; la caché evita repetirla
+        en cada lote).
+
+        Args:
+            cur (psycopg2.extensions.cursor): Cursor de la transacción de inserción.
+            meses (set[datetime.date]): Meses de las filas (ver `meses_de_ts`).
+            config (dict): Sección 'SQL' de la configuración, con 'query_particion'.
+    """
+    for mes in sorted(meses - _particiones_creadas):
+        cur.execute(config.get("query_particion"), (mes,))
+        logger.info(f"Partición asegurada: {cur.fetchone()[0]}")
+        _particiones_creadas.add(mes)
+
+class FilasChunk:
+    """
+        Filas (user_id, price, ts, updated_by) de un chunk limpio como secuencia de tuplas
+        que se construyen al pedirlas. `insert_events` las toma por páginas de 'page_size'
+        (`insertar_por_columnas`), así que en memoria solo están las tuplas de una página:
+        una fila como tupla de objetos Python (con su Timestamp) ocupa ~10 veces lo que
+        ocupa en el DataFrame, y con la lista completa era el pico de memoria del chunk.
+    """
+    COLUMNAS = ["user_id", "price", "ts", "updated_by"]
+
+    def __init__(self, df):
+        self.df = df[self.COLUMNAS]
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def __iter__(self):
+        return self.df.itertuples(index=False, name=None)
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return list(self.df.iloc[posicion].itertuples(index=False, name=None))
+        return next(self.df.iloc[[posicion]].itertuples(index=False, name=None))
+
+    def usuarios_carga(self):
+        """ Nombres distintos de 'updated_by' (las categorías de la columna). """
+        return list(self.df["updated_by"].astype("category").cat.categories)
+
+    def compactas(self, ids):
+        """
+            Las mismas filas con 'updated_by' reemplazado por su id: cada categoría se
+            traduce una vez y la columna pasa a ser sus códigos, sin recorrer las filas.
+
+            Args:
+                ids (dict): Nombre → id en 'usuarios_carga' (ver `ids_usuarios_carga`).
+        """
+        import numpy as np
+
+        updated_by = self.df["updated_by"].astype("category").cat
+        por_codigo = np.array([ids[nombre] for nombre in updated_by.categories], dtype=np.int16)
+        return FilasChunk(self.df.assign(updated_by=por_codigo[updated_by.codes.to_numpy()]))
+
+
+def ids_usuarios_carga(cur, nombres, config):
+    """
+        Id de cada usuario de carga en 'usuarios_carga'; cada nombre se resuelve una vez
+        por proceso.
+
+        Args:
+            cur (psycopg2.extensions.cursor): Cursor de la transacción de inserción.
+            nombres (Iterable[str]): Nombres de 'updated_by'.
+            config (dict): Sección 'SQL' de la configuración, con 'query_usuario_carga'.
+
+        Returns:
+            dict: Nombre → id.
+    """
+    nombres = set(nombres)
+    for nombre in nombres - _usuarios_carga.keys():
+        cur.execute(config.get("query_usuario_carga"), (nombre,))
+        _usuarios_carga[nombre] = cur.fetchone()[0]
+    return {nombre: _usuarios_carga[nombre] for nombre in nombres}
+
+
+def filas_compactas(cur, rows, config):
+    """
+        Adapta las filas al almacenamiento compacto: user_id entero, price float y
+        updated_by reemplazado por su id en 'usuarios_carga'. Las de un `FilasChunk` ya
+        tienen los tipos de `procesar_chunk` y se adaptan sobre el DataFrame (`FilasChunk.compactas`).
+
+        Args:
+            cur (psycopg2.extensions.cursor): Cursor de la transacción de inserción.
+            rows (FilasChunk | list[tuple]): Filas con formato (user_id, price, ts, updated_by).
+            config (dict): Sección 'SQL' de la configuración, con 'query_usuario_carga'.
+
+        Returns:
+            FilasChunk | list[tuple]: Filas con formato (user_id, price, ts, updated_by_id).
+    """
+    if isinstance(rows, FilasChunk):
+        return rows.compactas(ids_usuarios_carga(cur, rows.usuarios_carga(), config))
+    ids = ids_usuarios_carga(cur, (row[3] for row in rows), config)
+    return [(int(u), float(p), ts, ids[nombre]) for u, p, ts, nombre in rows]
+
+
+def limpiar_caches():
+    """
+        Olvida las particiones y usuarios de carga resueltos en este proceso. Se usa tras
+        un rollback: lo creado dentro de la transacción revertida ya no existe.
+    """
+    _particiones_creadas.clear()
+    _usuarios_carga.clear()
+
+
+def _ejecutar_en_esquema(config, query, nombre):
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(sql.SQL(config.get(query)).format(esquema=sql.Identifier(nombre)))
+        conn.commit()
+
+
+@contextmanager
+def esquema_temporal(config, nombre):
+    """
+        Esquema desechable para cargar sin tocar las tablas reales (perf-check). Mientras
+        dura, las conexiones nuevas, también las del pool, lo usan como search_path
+        (variable de entorno PGOPTIONS, que lee libpq). Las tablas se crean con
+        `reiniciar_esquema`; al salir el esquema se elimina con todo su contenido.
+
+        Args:
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'
+                con 'query_crear_esquema' y 'query_borrar_esquema'.
+            nombre (str): Nombre del esquema.
+    """
+    anterior = os.environ.get("PGOPTIONS")
+    _cerrar_pool()
+    os.environ["PGOPTIONS"] = f"{anterior or ''} -c search_path={nombre}".strip()
+    try:
+        yield nombre
+    finally:
+        if anterior is None:
+            os.environ.pop("PGOPTIONS", None)
+        else:
+            os.environ["PGOPTIONS"] = anterior
+        _cerrar_pool()
+        limpiar_caches()
+        _ejecutar_en_esquema(config['SQL'], "query_borrar_esquema", nombre)
+        logger.info(f"Esquema temporal {nombre} eliminado.")
+
+
+def reiniciar_esquema(config, nombre):
+    """
+        Deja el esquema de `esquema_temporal` vacío (lo borra y lo vuelve a crear) y crea
+        sus tablas con `init_db`. Las conexiones del pool y las particiones y usuarios de
+        carga resueltos se descartan: eran de las tablas anteriores.
+    """
+    _cerrar_pool()
+    limpiar_caches()
+    _ejecutar_en_esquema(config['SQL'], "query_crear_esquema", nombre)
+    init_db(config)
+
+
+def insert_events(rows, config, conn=None, meses=None):
     """
         Inserta registros en la tabla 'events'.
+        Con el almacenamiento compacto ('compacto') las filas se adaptan con `filas_compactas`
+        y se usa 'insert_query_compacto'.
+        Las filas se envían por columnas (un arreglo por columna, que la query desarma con
+        unnest) en lotes de 'page_size', con la sentencia preparada de 'insert_query': la
+        query tiene siempre los mismos parámetros, sea cual sea el tamaño del lote.
+        Con un `FilasChunk` los meses de las particiones y los ids del almacenamiento
+        compacto salen del DataFrame, y las tuplas se arman de a una página también en
+        esos modos.
 
         Args:
-            rows (list[tuple]): Lista de tuplas con los valores a insertar.
+            rows (Sequence[tuple]): Lista de tuplas con los valores a insertar, o una
+                secuencia que las arma por página (`FilasChunk`).
                 Formato esperado: (user_id, price, ts, updated_by).
             config (dict): Diccionario de configuración que contiene la clave 'SQL'
                 con 'insert_query' (query para insertar los datos) y 'page_size'.
+            conn (psycopg2.extensions.connection, opcional): Conexión de una transacción
+                en curso; si se indica, la inserción forma parte de ella y no se hace commit.
+            meses (set[datetime.date], opcional): Meses de las filas, para las particiones
+                ('particionado'); `procesar_chunk` los calcula de la columna 'ts' del chunk.
+                Si no se indican se calculan de la columna 'ts' del `FilasChunk` o de las filas.
 
         Returns:
             - len(rows): Número de filas insertadas.
@@ -78,28 +561,133 @@ def insert_events(rows, config):
     """
     if not rows:
         return 0
+
+    if conn is None:
+        with conexion(config['SQL']) as conn:
+            return insert_events(rows, config, conn=conn, meses=meses)
     
     config = config['SQL']
-    page_size = config.get("page_size")
-    query = config.get("insert_query")   
+    page_size = config.get("page_size") or len(rows)
 
-    with get_conn() as conn, conn.cursor() as cur:
-        # excecute_values para inserción en batch.
-        execute_values(cur, query, rows, page_size=page_size)
-        conn.commit()
+    with conn.cursor() as cur:
+        if config.get("particionado"):
+            if meses is None:
+                meses = meses_de_ts(rows.df["ts"] if isinstance(rows, FilasChunk) else [row[2] for row in rows])
+            asegurar_particiones(cur, meses, config)
+        if config.get("compacto"):
+            rows = filas_compactas(cur, rows, config)
+        insertar_por_columnas(cur, "insert_query", rows, config, page_size)
     
     logger.info(f"Se agregaron {len(rows)} nuevas filas a la tabla 'events'.")
 
     return len(rows) 
 
 
-def fetch_db_stats(config):
+def insertar_por_columnas(cur, nombre, rows, config, page_size, *fijos):
+    """
+        Inserción en batch con una sentencia preparada del registro: un EXECUTE por lote de
+        `page_size` filas, con una lista por columna (la query las desarma con unnest).
+
+        Args:
+            cur (psycopg2.extensions.cursor): Cursor de la transacción de inserción.
+            nombre (str): Clave de la query en la sección 'SQL'.
+            rows (list[tuple]): Filas a insertar.
+            config (dict): Sección 'SQL' de la configuración.
+            page_size (int): Filas por EXECUTE.
+            *fijos: Parámetros comunes a todas las filas, antes de las columnas.
+    """
+    for inicio in range(0, len(rows), page_size):
+        columnas = [list(c) for c in zip(*rows[inicio:inicio + page_size])]
+        ejecutar_preparada(cur, nombre, config, (*fijos, *columnas))
+
+
+def insert_cuarentena(rows, config, conn=None):
+    """
+        Inserta en la tabla 'cuarentena' las filas rechazadas por la validación, por el
+        mismo camino en batch que `insert_events`.
+
+        Args:
+            rows (list[tuple]): Filas (archivo, user_id, price, ts, motivo), con los valores
+                originales como texto.
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'
+                con 'query_cuarentena' y 'page_size'.
+            conn (psycopg2.extensions.connection, opcional): Transacción en curso (sin commit).
+
+        Returns:
+            int: Número de filas enviadas a cuarentena.
+    """
+    if not rows:
+        return 0
+    if conn is None:
+        with conexion(config['SQL']) as conn:
+            return insert_cuarentena(rows, config, conn=conn)
+
+    config = config['SQL']
+    with conn.cursor() as cur:
+        insertar_por_columnas(cur, "query_cuarentena", rows, config, config.get("page_size") or len(rows))
+    logger.info(f"Se enviaron {len(rows)} filas a la tabla 'cuarentena'.")
+    return len(rows)
+
+
+def registrar_archivos(conteos, config, conn):
+    """
+        Registra en 'archivos_cargados' la procedencia de un lote de `load --coalesce`.
+
+        Args:
+            conteos (dict): Archivo → (filas insertadas, filas rechazadas).
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'
+                con la query bajo la clave 'query_registrar_archivos'.
+            conn (psycopg2.extensions.connection): Transacción del lote (no se hace commit).
+
+        Returns:
+            int: Número de lote asignado (None si no hay archivos).
+    """
+    if not conteos:
+        return None
+    archivos = list(conteos)
+    with conn.cursor() as cur:
+        cur.execute(config['SQL'].get("query_registrar_archivos"), (
+            archivos, [conteos[a][0] for a in archivos], [conteos[a][1] for a in archivos],
+        ))
+        return cur.fetchone()[0]
+
+
+def fetch_archivos_cargados(config):
+    """
+        Nombres de los archivos que la base de datos registra como cargados: los de
+        'archivos_cargados' (`load --coalesce` y `load --follow`) y los completados en
+        'cola_archivos' (`load --worker`). `load` sin estas opciones no deja registro.
+
+        Args:
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'.
+
+        Returns:
+            set[str]: Nombres de archivo; vacío si las tablas no existen.
+    """
+    config = config['SQL']
+    with conexion(config) as conn, conn.cursor() as cur:
+        cur.execute(config.get("query_existen_archivos_cargados"))
+        if not cur.fetchone()[0]:
+            logger.warning("No existen las tablas de procedencia ('archivos_cargados', 'cola_archivos').")
+            return set()
+        cur.execute(config.get("query_archivos_cargados"))
+        return {r[0] for r in cur.fetchall()}
+
+
+def fetch_db_stats(config, desde=None, hasta=None, exacto=False):
     """
         Obtiene estadísticas agregadas de la tabla 'events'.
+        Por defecto lee la tabla 'events_agg', que los triggers de 'events' mantienen en la
+        misma transacción de cada inserción (tiempo constante). Con `exacto` se recorre
+        'events' completa ('query_stats_exacto'). Si se indica un rango de fechas se usa
+        'query_stats_rango', que con la tabla particionada solo lee las particiones del rango.
 
         Args:
             config (dict): Diccionario de configuración que contiene la clave 'SQL'
                 con la query bajo la clave 'query_stats'.
+            desde (datetime, opcional): Fecha inicial (inclusiva).
+            hasta (datetime, opcional): Fecha final (exclusiva).
+            exacto (bool, opcional): Calcula los agregados recorriendo 'events'.
 
         Returns:
             dict: Diccionario con estadísticas de la base de datos:
@@ -112,9 +700,13 @@ def fetch_db_stats(config):
 
     """
     config = config['SQL']
-    query = config.get("query_stats")
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(query)
+    query = config.get("query_stats_exacto") if exacto else config.get("query_stats")
+    params = None
+    if desde is not None or hasta is not None:
+        query = config.get("query_stats_rango")
+        params = {"desde": desde, "hasta": hasta}
+    with conexion_lectura(config) as conn, conn.cursor() as cur:
+        cur.execute(query, params)
         r = cur.fetchone()
         return {
             "total_rows": r[0] or 0,
@@ -124,13 +716,51 @@ def fetch_db_stats(config):
         }
 
 
-def get_running_stats(config):
+def fetch_user_stats(user_id, config):
+    """
+        Obtiene estadísticas agregadas de las compras de un usuario en la tabla 'events'.
+        La consulta filtra por `user_id`, que cuenta con un índice en el schema.
+
+        Args:
+            user_id (int): Usuario a consultar.
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'
+                con la query bajo la clave 'query_user_stats'.
+
+        Returns:
+            dict: Diccionario con estadísticas del usuario:
+                {
+                    "total_rows": int,
+                    "avg_price": float,
+                    "min_price": float,
+                    "max_price": float,
+                    "sum_price": float
+                }
+
+    """
+    config = config['SQL']
+    query = config.get("query_user_stats")
+    with conexion_lectura(config) as conn, conn.cursor() as cur:
+        cur.execute(query, (str(user_id),))
+        r = cur.fetchone()
+        return {
+            "total_rows": r[0] or 0,
+            "avg_price": r[1],
+            "min_price": r[2],
+            "max_price": r[3],
+            "sum_price": r[4],
+        }
+
+
+def get_running_stats(config, lectura=False):
     """
         Obtiene las estadísticas acumuladas (running stats) de la base de datos.
 
         Args:
             config (dict): Diccionario de configuración que contiene la clave 'SQL'
                 con la query bajo la clave 'query_running'.
+            lectura (bool, opcional): Lee de la réplica de 'SQL.lectura' (ver
+                `get_conn_lectura`). Solo para mostrar: la carga lee las estadísticas que
+                va a actualizar del primario.
 
         Returns:
             dict: Diccionario con estadísticas en ejecución:
@@ -139,19 +769,34 @@ def get_running_stats(config):
                     "mean": float,
                     "min": float,
                     "max": float,
-                    "updated_at": datetime
+                    "updated_at": datetime,
+                    "m2": float,
+                    "mean_c": float,
+                    "m2_c": float,
+                    "stddev": float | None,
+                    "hll": bytes | None
                 }
 
     """
     config = config['SQL']
-    query = config.get("query_running")
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(query)
+    with (conexion_lectura(config) if lectura else conexion(config)) as conn, conn.cursor() as cur:
+        if lectura:
+            # Conexión de una sola consulta: preparar la sentencia sería un viaje más al servidor
+            cur.execute(get_query(config, "query_running"))
+        else:
+            ejecutar_preparada(cur, "query_running", config)
         r = cur.fetchone()
-        return {"count": r[0], "mean": r[1], "min": r[2], "max": r[3], "updated_at": r[4]}
+        count, m2 = r[0], r[5] + r[7]
+        # Desviación estándar muestral a partir de M2
+        stddev = (max(m2, 0.0) / (count - 1)) ** 0.5 if count > 1 else None
+        return {
+            "count": count, "mean": r[1], "min": r[2], "max": r[3], "updated_at": r[4],
+            "m2": r[5], "mean_c": r[6], "m2_c": r[7], "stddev": stddev,
+            "hll": bytes(r[8]) if r[8] is not None else None,
+        }
 
 
-def update_running_stats(count, mean, min_, max_, config):
+def update_running_stats(count, mean, min_, max_, config, m2=0.0, mean_c=0.0, m2_c=0.0, hll=None):
     """
         Actualiza las estadísticas acumuladas en la base de datos.
 
@@ -162,34 +807,225 @@ def update_running_stats(count, mean, min_, max_, config):
             max_ (float): Valor máximo acumulado.
             config (dict): Diccionario de configuración que contiene la clave 'SQL'
                 con la query bajo la clave 'query_update'.
+            m2 (float): Suma de cuadrados de las desviaciones respecto a la media.
+            mean_c (float): Compensación de la suma de la media.
+            m2_c (float): Compensación de la suma de M2.
+            hll (bytes): Registros del sketch HyperLogLog de usuarios.
 
         Side Effects:
             - Ejecuta un UPDATE en la tabla de estadísticas.
         
     """
     config = config['SQL']
-    query = config.get("query_update")
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(query, (count, mean, min_, max_))
-        conn.commit()
+    with conexion(config) as conn, conn.cursor() as cur:
+        ejecutar_preparada(cur, "query_update", config, (count, mean, min_, max_, m2, mean_c, m2_c, psycopg2.Binary(hll) if hll else None))
+
+
+def merge_running_stats(count, mean, min_, max_, config, conn, m2=0.0, hll=None):
+    """
+        Fusiona en SQL el resumen de un lote con 'running_stats' (fusión de Chan para la
+        media y M2, LEAST, GREATEST, unión de los sketches de usuarios). A diferencia de `update_running_stats` no sobrescribe
+        la fila, por lo que varios procesos pueden fusionar sus lotes sin perder
+        actualizaciones.
 
+        Args:
+            count (int): Cantidad de registros del lote.
+            mean (float): Media del lote.
+            min_ (float): Mínimo del lote.
+            max_ (float): Máximo del lote.
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'
+                con la query bajo la clave 'query_merge_running'.
+            conn (psycopg2.extensions.connection): Transacción en curso (no se hace commit).
+            m2 (float): Suma de cuadrados de las desviaciones del lote respecto a su media.
+            hll (bytes): Registros del sketch HyperLogLog de usuarios del lote.
+    """
+    if count == 0:
+        return
+    config = config['SQL']
+    with conn.cursor() as cur:
+        ejecutar_preparada(cur, "query_merge_running", config, {
+            "count": count, "mean": mean, "min": min_, "max": max_, "m2": m2,
+            "hll": psycopg2.Binary(hll) if hll else None,
+        })
 
-def db_query(config, limit_rows: int = None) -> pd.DataFrame:
+
+def get_windowed_stats(config, lectura=False):
+    """
+        Obtiene los slots persistidos de las estadísticas por ventana de tiempo.
+
+        Args:
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'
+                con la query bajo la clave 'query_ventana'.
+            lectura (bool, opcional): Lee de la réplica de 'SQL.lectura', como en `get_running_stats`.
+
+        Returns:
+            list[tuple]: Filas (slot, bucket, count, sum, min, max).
+    """
+    config = config['SQL']
+    with (conexion_lectura(config) if lectura else conexion(config)) as conn, conn.cursor() as cur:
+        if lectura:
+            cur.execute(get_query(config, "query_ventana"))
+        else:
+            ejecutar_preparada(cur, "query_ventana", config)
+        return cur.fetchall()
+
+
+def update_windowed_stats(filas, config, conn=None):
+    """
+        Persiste slots de las estadísticas por ventana. Sin `conn` sobrescribe los slots
+        ('query_update_ventana') en su propia transacción; con `conn` los fusiona con los
+        existentes ('query_merge_ventana') dentro de esa transacción, sin commit, para que
+        varios workers no pierdan actualizaciones.
+
+        Args:
+            filas (list[tuple]): Slots (slot, bucket, count, sum, min, max).
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'.
+            conn (psycopg2.extensions.connection, opcional): Transacción en curso.
+    """
+    if not filas:
+        return
+    if conn is None:
+        with conexion(config['SQL']) as conn, conn.cursor() as cur:
+            execute_values(cur, config['SQL'].get("query_update_ventana"), filas)
+        return
+    with conn.cursor() as cur:
+        execute_values(cur, config['SQL'].get("query_merge_ventana"), filas)
+
+def encolar_archivos(nombres, config):
+    """
+        Registra archivos en 'cola_archivos' como pendientes; los ya registrados no cambian.
+        Las operaciones de la cola usan una conexión del pool (`conexion`): un worker reclama
+        un archivo tras otro y consulta el estado de la cola mientras espera, sin abrir una
+        conexión nueva cada vez.
+
+        Args:
+            nombres (list[str]): Nombres de archivo relativos a 'CSV_DIR'.
+            config (dict): Diccionario de configuración con 'query_encolar' en la clave 'SQL'.
+
+        Returns:
+            int: Número de archivos nuevos en la cola.
+    """
+    if not nombres:
+        return 0
+    config = config['SQL']
+    with conexion(config) as conn, conn.cursor() as cur:
+        execute_values(cur, config.get("query_encolar"), [(n,) for n in nombres])
+        nuevos = cur.rowcount
+    logger.info(f"Cola de archivos: {nuevos} archivos nuevos de {len(nombres)}.")
+    return nuevos
+
+
+def reclamar_archivo(worker, config):
+    """
+        Reclama el siguiente archivo disponible de 'cola_archivos' (pendiente o con lease
+        vencido) con FOR UPDATE SKIP LOCKED: dos workers nunca obtienen el mismo archivo.
+
+        Args:
+            worker (str): Identificador del worker.
+            config (dict): Diccionario de configuración con 'query_reclamar' y la sección 'cola'.
+
+        Returns:
+            tuple | None: (nombre, intentos) del archivo reclamado, o None si no hay.
+    """
+    config = config['SQL']
+    cola = config.get("cola") or {}
+    params = {"worker": worker, "lease": cola.get("lease_s", 60), "max_intentos": cola.get("max_intentos", 3)}
+    with conexion(config) as conn, conn.cursor() as cur:
+        cur.execute(config.get("query_reclamar"), params)
+        r = cur.fetchone()
+    return r
+
+
+def renovar_lease(nombre, worker, config, conn):
+    """
+        Heartbeat: extiende el lease del archivo. Devuelve False si el archivo ya no
+        pertenece a este worker (el lease venció y otro lo reclamó).
+    """
+    config = config['SQL']
+    lease = (config.get("cola") or {}).get("lease_s", 60)
+    with conn.cursor() as cur:
+        cur.execute(config.get("query_heartbeat"), {"nombre": nombre, "worker": worker, "lease": lease})
+        renovado = cur.rowcount == 1
+    conn.commit()
+    return renovado
+
+
+def completar_archivo(nombre, worker, filas, config, conn):
+    """
+        Marca el archivo como completado dentro de la transacción de su carga. Devuelve
+        False si el archivo ya no pertenece a este worker; en ese caso la transacción
+        debe revertirse para no cargarlo dos veces.
+    """
+    config = config['SQL']
+    with conn.cursor() as cur:
+        cur.execute(config.get("query_completar"), {"nombre": nombre, "worker": worker, "filas": filas})
+        return cur.rowcount == 1
+
+
+def fallar_archivo(nombre, worker, error, config):
+    """
+        Devuelve el archivo a 'pendiente' para reintentarlo, o lo marca 'fallido' si agotó
+        'max_intentos'.
+    """
+    config = config['SQL']
+    max_intentos = (config.get("cola") or {}).get("max_intentos", 3)
+    with conexion(config) as conn, conn.cursor() as cur:
+        cur.execute(config.get("query_fallar"), {"nombre": nombre, "worker": worker, "error": str(error)[:1000], "max_intentos": max_intentos})
+
+
+def estado_cola(config):
+    """
+        Marca como 'fallido' los leases vencidos sin intentos restantes y devuelve
+        (archivos por tomar, archivos en proceso en otros workers).
+    """
+    config = config['SQL']
+    max_intentos = (config.get("cola") or {}).get("max_intentos", 3)
+    with conexion(config) as conn, conn.cursor() as cur:
+        cur.execute(config.get("query_estado_cola"), {"max_intentos": max_intentos})
+        r = cur.fetchone()
+    return r[0], r[1]
+
+
+def resumen_cola(config):
+    """
+        Resumen de 'cola_archivos' por estado.
+
+        Returns:
+            list[tuple]: (estado, archivos, filas cargadas).
+    """
+    config = config['SQL']
+    with conexion(config) as conn, conn.cursor() as cur:
+        cur.execute(config.get("query_resumen_cola"))
+        return cur.fetchall()
+
+
+def db_query(config, limit_rows: int = None, desde=None, hasta=None) -> "pd.DataFrame":
     """
     Ejecuta una consulta SQL definida en el archivo de configuración y 
     devuelve el resultado como un DataFrame de Pandas.
 
     Args:
         config (dict): Diccionario de configuración que contiene la clave 'SQL'
-            con la query bajo la clave 'query_llm'.
+            con la query bajo la clave 'query_llm' ('query_llm_rango' si se filtra por fechas;
+            con 'compacto' sus variantes '_compacto', que leen la vista 'events_v').
         limit_rows (int, optional): Límite de filas a retornar. 
             Si es None no se aplica límite.
+        desde (datetime, optional): Fecha inicial (inclusiva) de los eventos.
+        hasta (datetime, optional): Fecha final (exclusiva) de los eventos.
 
     Returns:
         pd.DataFrame: Resultado de la consulta en un DataFrame.
     """
+    # Import diferido: pandas solo se necesita aquí y al particionar, no en los comandos
+    # que hacen una sola consulta (print-stats, initdb)
+    import pandas as pd
+
     config = config['SQL']
-    query = config.get("query_llm")
+    query = get_query(config, "query_llm")
+    params = None
+    if desde is not None or hasta is not None:
+        query = get_query(config, "query_llm_rango")
+        params = {"desde": desde, "hasta": hasta}
 
     # Validar si aplicar límite
     if limit_rows is not None:
@@ -197,8 +1033,40 @@ def db_query(config, limit_rows: int = None) -> pd.DataFrame:
             raise ValueError("limit_rows debe ser un entero positivo")
         query = f"{query} LIMIT {limit_rows};"
 
-    # Ejecutar query y pasar a DataFrame
-    with get_conn() as conn:
-        df = pd.read_sql_query(query, conn)
+    # Ejecutar query y pasar a DataFrame (en la réplica de lectura si está configurada)
+    with conexion_lectura(config) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+
+    return df
+
+
+def drop_partitions(config, antes):
+    """
+        Elimina las particiones mensuales de 'events' anteriores a un mes.
+        Borrar una partición es un DROP TABLE: no recorre las filas ni deja la tabla
+        fragmentada como un DELETE. Como DROP TABLE no dispara triggers, los agregados
+        de 'events_agg' se recalculan en la misma transacción.
+
+        Args:
+            config (dict): Diccionario de configuración que contiene la clave 'SQL'
+                con 'query_particiones' y 'query_recalcular_agg'.
+            antes (datetime.date): Se eliminan los meses estrictamente anteriores a este.
+
+        Returns:
+            list[str]: Nombres de las particiones eliminadas.
+    """
+    config = config['SQL']
+    limite = f"events_{antes:%Y_%m}"
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(config.get("query_particiones"))
+        # Las particiones se llaman events_YYYY_MM, por lo que el orden alfabético es el temporal
+        eliminadas = [r[0] for r in cur.fetchall() if r[0] < limite]
+        for nombre in eliminadas:
+            cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(nombre)))
+        if eliminadas:
+            cur.execute(config.get("query_recalcular_agg"))
+        conn.commit()
 
-    return df
\ No newline at end of file
+    _particiones_creadas.clear()
+    logger.info(f"Particiones eliminadas: {eliminadas}")
+    return eliminadas
\ No newline at end of file
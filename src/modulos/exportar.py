@@ -0,0 +1,89 @@
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+from src.modulos.db import conexion_lectura, get_query
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+def exportar_parquet(
+    config: Dict[str, Any],
+    destino: Path = None,
+    row_group_size: int = None,
+    desde=None,
+    hasta=None,
+) -> Dict[str, int]:
+    """
+        Exporta la tabla 'events' a archivos Parquet particionados por mes
+        (`<destino>/mes=YYYY-MM/events.parquet`), sin materializar la tabla completa:
+        las filas se leen con un cursor del lado del servidor en lotes de 'itersize'.
+        Es la lectura más pesada: va a la réplica de 'SQL.lectura' si está disponible
+        (`conexion_lectura`), para no competir con la carga en el primario.
+
+        Cada mes tiene su propio escritor abierto y acumula filas hasta completar
+        'row_group_size', de modo que los row groups no dependen del tamaño del lote leído.
+
+        Args:
+            config (dict): Configuración general con las secciones 'SQL' (query 'query_export')
+                y 'PARQUET' ('export_dir', 'row_group_size', 'itersize', 'compression').
+            destino (Path, opcional): Directorio de salida; por defecto 'export_dir'.
+            row_group_size (int, opcional): Filas por row group; por defecto el de la configuración.
+            desde (datetime, opcional): Fecha inicial (inclusiva) de los eventos.
+            hasta (datetime, opcional): Fecha final (exclusiva) de los eventos.
+
+        Returns:
+            dict: Filas exportadas por mes ("YYYY-MM" → filas).
+    """
+    # Import diferido: pyarrow solo se necesita para exportar
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    cfg = config.get('PARQUET') or {}
+    destino = Path(destino or cfg.get("export_dir", "./exports"))
+    row_group_size = row_group_size or cfg.get("row_group_size", 100000)
+    itersize = cfg.get("itersize", 10000)
+    compression = cfg.get("compression", "snappy")
+    query = get_query(config['SQL'], "query_export")
+
+    escritores, pendientes, filas = {}, {}, {}
+
+    def _escribir(mes, forzar=False):
+        # Escribe los row groups completos del mes (o lo que quede, al cerrar)
+        buffer = pd.concat(pendientes[mes], ignore_index=True)
+        corte = len(buffer) if forzar else (len(buffer) // row_group_size) * row_group_size
+        if corte == 0:
+            pendientes[mes] = [buffer]
+            return
+        tabla = pa.Table.from_pandas(buffer.iloc[:corte], preserve_index=False)
+        if mes not in escritores:
+            carpeta = destino / f"mes={mes}"
+            carpeta.mkdir(parents=True, exist_ok=True)
+            escritores[mes] = pq.ParquetWriter(carpeta / "events.parquet", tabla.schema, compression=compression)
+        escritores[mes].write_table(tabla, row_group_size=row_group_size)
+        pendientes[mes] = [buffer.iloc[corte:]]
+
+    with conexion_lectura(config['SQL']) as conn:
+        # Cursor con nombre = cursor del lado del servidor: trae 'itersize' filas por viaje
+        with conn.cursor(name="exportar_events") as cur:
+            cur.itersize = itersize
+            cur.execute(query, {"desde": desde, "hasta": hasta})
+            columnas = None
+            while lote := cur.fetchmany(itersize):
+                columnas = columnas or [c[0] for c in cur.description]
+                df = pd.DataFrame(lote, columns=columnas)
+                df["ts"] = pd.to_datetime(df["ts"], utc=True)
+                for periodo, grupo in df.groupby(df["ts"].dt.strftime("%Y-%m"), sort=False):
+                    pendientes.setdefault(periodo, []).append(grupo)
+                    filas[periodo] = filas.get(periodo, 0) + len(grupo)
+                    if sum(len(g) for g in pendientes[periodo]) >= row_group_size:
+                        _escribir(periodo)
+
+    for mes in pendientes:
+        _escribir(mes, forzar=True)
+        escritores[mes].close()
+
+    logger.info(f"Exportación Parquet a {destino}: {sum(filas.values())} filas en {len(filas)} meses.")
+    return dict(sorted(filas.items()))
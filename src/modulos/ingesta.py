@@ -2,19 +2,43 @@ import getpass
 from pathlib import Path
 from typing import Any, Dict
 
-from src.modulos.db import insert_events, get_running_stats, update_running_stats
+import pandas as pd
 
-from src.modulos.stats import RunningStats
-from src.submodulos.csv_reader import CSVReader
+from src.modulos.db import conexion, FilasChunk, insert_events, meses_de_ts, insert_cuarentena, registrar_archivos, get_running_stats, update_running_stats, get_windowed_stats, update_windowed_stats
+
+from src.modulos.stats import RunningStats, WindowedStats, HyperLogLog
+from src.submodulos.csv_reader import CSVReader, COMPRESIONES
+from src.submodulos.parquet_reader import ParquetReader
 from src.modulos.limpieza import limpieza_df
+from src.modulos.validacion import Validador
+from src.modulos.memoria import PresupuestoMemoria, reiniciar_pico, rss_pico
 
 from config.logging_utils import get_logger
 logger = get_logger()
 
 
+# Extensiones de entrada soportadas y el lector que corresponde a cada una
+LECTORES = {".csv": CSVReader, ".parquet": ParquetReader}
+
+
+def formato_entrada(path: Path) -> str:
+    """
+        Extensión de datos del archivo, ignorando la de compresión: '2012-1.csv.gz' → '.csv'.
+        Devuelve None si el archivo no es una entrada soportada (solo los CSV pueden venir
+        comprimidos).
+    """
+    sufijos = [s.lower() for s in path.suffixes]
+    if len(sufijos) >= 2 and sufijos[-1] in COMPRESIONES and sufijos[-2] == ".csv":
+        return ".csv"
+    if sufijos and sufijos[-1] in LECTORES:
+        return sufijos[-1]
+    return None
+
+
 def iter_csv_files(config: Dict[str, Any], include_validation: bool = False):
     """
-        Itera sobre los archivos CSV disponibles en el directorio configurado.
+        Itera sobre los archivos de entrada (CSV, CSV comprimido '.csv.gz' / '.csv.zst' /
+        '.csv.bz2', o Parquet) disponibles en el directorio configurado.
         Devuelve con ayuda de yield la lista 1 a 1
 
         Args:
@@ -25,14 +49,14 @@ def iter_csv_files(config: Dict[str, Any], include_validation: bool = False):
                 del listado. Por defecto es False.
 
         Yields:
-            pathlib.Path: Ruta de cada archivo CSV encontrado en el directorio.
+            pathlib.Path: Ruta de cada archivo CSV o Parquet encontrado en el directorio.
 
     """
     config = config['CSV']
     csv_dir = Path(config.get("CSV_DIR"))
     # Utilizamos sorted paraque el orden temporal sea respetado (2012-1.csv antes que 2012-2.csv, etc.).
     csv_path_files = sorted(
-        [f for f in csv_dir.iterdir() if f.is_file() and f.suffix == ".csv"]
+        [f for f in csv_dir.iterdir() if f.is_file() and formato_entrada(f)]
     )
     
     if include_validation == False:
@@ -43,6 +67,60 @@ def iter_csv_files(config: Dict[str, Any], include_validation: bool = False):
         yield path_archivo
 
 
+def leer_chunks(path: Path, chunksize: int, config: Dict[str, Any], lector=None, bytes_por_fila: float = None):
+    """
+        Lee el archivo por chunks con el lector de su formato. Con presupuesto de memoria
+        ('CSV.max_memoria', ver `PresupuestoMemoria`):
+            - El tamaño de chunk se limita a las filas que caben en el presupuesto, según la
+              memoria por fila estimada con las primeras filas del archivo (o `bytes_por_fila`).
+            - Los chunks más grandes que ese tamaño (row groups de Parquet) se dividen.
+            - Contrapresión: si tras procesar un chunk el RSS supera el presupuesto, los
+              siguientes se reducen a la mitad.
+
+        Args:
+            path (Path): Archivo a leer.
+            chunksize (int): Filas por chunk pedidas.
+            config (dict): Diccionario de configuración con la sección 'CSV'.
+            lector (CSVReader | ParquetReader, opcional): Lector a reutilizar.
+            bytes_por_fila (float, opcional): Memoria por fila ya estimada.
+
+        Yields:
+            pd.DataFrame: Chunks del archivo.
+    """
+    lector = lector or LECTORES.get(formato_entrada(path), CSVReader)(config=config)
+    presupuesto = PresupuestoMemoria.desde_config(config)
+    if presupuesto is not None:
+        bytes_por_fila = bytes_por_fila or lector.estimar_bytes_por_fila(path)
+        ajustado = presupuesto.filas_por_chunk(bytes_por_fila, chunksize)
+        if ajustado < chunksize:
+            logger.info(f"   Chunks de {ajustado} filas (~{bytes_por_fila:.0f} bytes/fila) para el presupuesto de memoria.")
+        chunksize = ajustado
+
+    datos = lector.run(path, chunksize)
+    if isinstance(datos, pd.DataFrame):
+        # Lectura sin chunks ('usar_chunk': False): un único chunk
+        datos = [datos]
+    for chunk in datos:
+        if presupuesto is None:
+            yield chunk
+            continue
+        inicio = 0
+        while inicio < len(chunk):
+            yield chunk.iloc[inicio:inicio + chunksize]
+            inicio += chunksize
+            if presupuesto.aliviar() and chunksize > 1:
+                chunksize = max(chunksize // 2, 1)
+                logger.warning(f"   RSS sobre el presupuesto de memoria: chunks de {chunksize} filas.")
+
+
+def reportar_memoria(nombre: str):
+    """ Registra el pico de RSS de la carga de `nombre` (archivo o lote) y reinicia la medición. """
+    pico = rss_pico() / (1 << 20)
+    logger.info(f"   Pico de memoria (RSS) [{nombre}]: {pico:.1f} MiB")
+    print(f"   Pico de memoria (RSS) [{nombre}]: {pico:.1f} MiB")
+    reiniciar_pico()
+
+
 def load_running_stats_from_db(config) -> RunningStats:
     """
         Esta función carga las estadísticas acumuladas (running stats) 
@@ -58,10 +136,16 @@ def load_running_stats_from_db(config) -> RunningStats:
                 - mean (float): Media acumulada.
                 - min (float): Valor mínimo registrado.
                 - max (float): Valor máximo registrado.
+                - m2, mean_c, m2_c (float): M2 y compensaciones (ver `RunningStats`).
+                - usuarios (HyperLogLog): Sketch de los user_id distintos.
         
     """
     rs = get_running_stats(config)
-    return RunningStats(count=rs["count"], mean=rs["mean"], min=rs["min"], max=rs["max"])
+    return RunningStats(
+        count=rs["count"], mean=rs["mean"], min=rs["min"], max=rs["max"],
+        m2=rs.get("m2", 0.0), mean_c=rs.get("mean_c", 0.0), m2_c=rs.get("m2_c", 0.0),
+        usuarios=HyperLogLog.desde_bytes(rs.get("hll")),
+    )
 
 
 def persist_running_stats(rs: RunningStats, config: Dict[str, Any]):
@@ -81,16 +165,137 @@ def persist_running_stats(rs: RunningStats, config: Dict[str, Any]):
         Side Effects:
             - Actualiza la tabla de estadísticas en la base de datos.
     """
-    update_running_stats(rs.count, rs.mean, rs.min, rs.max, config)
+    update_running_stats(
+        rs.count, rs.mean, rs.min, rs.max, config,
+        m2=rs.m2, mean_c=rs.mean_c, m2_c=rs.m2_c, hll=rs.usuarios.a_bytes(),
+    )
+
+
+def nueva_ventana(config: Dict[str, Any], filas=()) -> WindowedStats:
+    """
+        Crea un `WindowedStats` con la resolución y retención de 'SQL.ventana'
+        ('bucket_s', 'buckets'), opcionalmente a partir de slots persistidos.
+    """
+    cfg = config['SQL'].get("ventana") or {}
+    return WindowedStats.desde_filas(filas, bucket_s=cfg.get("bucket_s", 3600), n_buckets=cfg.get("buckets", 720))
+
+
+def load_windowed_stats_from_db(config: Dict[str, Any], lectura: bool = False) -> WindowedStats:
+    """
+        Carga desde la base de datos las estadísticas por ventana de tiempo
+        (tabla 'running_stats_ventana'). Con `lectura` se leen de la réplica de
+        'SQL.lectura' (solo para mostrarlas, ver `get_running_stats`).
+    """
+    return nueva_ventana(config, get_windowed_stats(config, lectura=lectura))
+
+
+def persist_windowed_stats(ventana: WindowedStats, config: Dict[str, Any], conn=None):
+    """
+        Persiste los slots de la ventana modificados desde la última persistencia. Con `conn`
+        se fusionan con los de la base de datos en esa transacción (ver `update_windowed_stats`).
+    """
+    update_windowed_stats(ventana.filas(), config, conn=conn)
+    ventana.limpiar()
+
+def procesar_chunk(
+    chunk, rs: RunningStats, mode: str, config: Dict[str, Any], conn=None, ventana: WindowedStats = None,
+    origen: str = None, conteos: Dict[str, list] = None,
+) -> int:
+    """
+        Limpia y valida un chunk leído del archivo, lo inserta en la tabla 'events' y
+        actualiza en memoria las estadísticas acumuladas y, si se indica, las de la ventana
+        de tiempo (no las persiste). Las filas que no cumplen las reglas de 'VALIDACION'
+        van a la tabla 'cuarentena' (si 'cuarentena' está activa) en la misma transacción.
+        Un chunk con la columna 'archivo' puede combinar filas de varios archivos
+        (`load --coalesce`): la procedencia se toma de esa columna en lugar de `origen`.
+
+        Args:
+            chunk (pd.DataFrame): Filas leídas con las columnas del CSV (user_id, price, timestamp).
+            rs (RunningStats): Estadísticas acumuladas a actualizar.
+            mode (str): "row" (actualiza por fila) o "chunk" (fusiona el resumen del chunk).
+            config (dict): Diccionario de configuración con la sección 'SQL'.
+            conn (psycopg2.extensions.connection, opcional): Transacción en curso para la
+                inserción (ver `insert_events`).
+            ventana (WindowedStats, opcional): Estadísticas por ventana de tiempo a actualizar.
+            origen (str, opcional): Nombre del archivo, para las filas en cuarentena.
+            conteos (dict, opcional): Archivo → [filas insertadas, filas rechazadas], se
+                acumulan los de este chunk.
+
+        Returns:
+            int: Número de filas insertadas.
+    """
+    # Normalizamos columnas esperadas. La validación separa las filas con valores vacíos,
+    # de tipo inválido o fuera de rango antes de convertir tipos.
+    chunk_fechas = (
+        limpieza_df(chunk)
+            .renombrar_columnas({"timestamp": "ts"})
+            .cambiar_tipo_fecha(["ts"])
+            .resultado()
+    )
+    validas, rechazadas = Validador(config).separar(chunk_fechas, crudo=chunk)
+    combinado = "archivo" in chunk.columns
+    if len(rechazadas):
+        rechazadas.insert(0, "archivo", chunk.loc[rechazadas.index, "archivo"] if combinado else origen)
+        if (config.get('VALIDACION') or {}).get("cuarentena", False):
+            insert_cuarentena(list(rechazadas.itertuples(index=False, name=None)), config, conn=conn)
+    # Los tipos se reducen apenas la validación entrega 'user_id' entero, antes de las
+    # copias que hacen la deduplicación y la conversión de tipos
+    chunk_limpio = (
+        limpieza_df(validas.assign(updated_by=getpass.getuser()))
+            .reducir_tipos(enteros=["user_id"], categoricas=["updated_by"])
+            .convertir_tipos({"price":"float"})
+            .eliminar_duplicados()
+            .resultado()
+    )
+
+    # Cargamos la data a la BD (las tuplas se arman por página, ver `FilasChunk`); los meses
+    # de las particiones salen de la columna 'ts', no de las filas
+    rows = FilasChunk(chunk_limpio)
+    meses = meses_de_ts(chunk_limpio["ts"]) if (config.get('SQL') or {}).get("particionado") else None
+    insertados = insert_events(rows, config, conn=conn, meses=meses)
+    if conteos is not None:
+        # Filas por archivo: en un chunk combinado, las duplicadas solo se eliminan dentro de un mismo archivo
+        por_archivo = chunk_limpio["archivo"].value_counts().items() if combinado else [(origen, insertados)]
+        for nombre, n in por_archivo:
+            conteos.setdefault(nombre, [0, 0])[0] += int(n)
+        for nombre, n in (rechazadas["archivo"].value_counts().items() if len(rechazadas) else []):
+            conteos.setdefault(nombre, [0, 0])[1] += int(n)
+
+    # Actualización de estadísticas (Sin tocar el historico ya cargado en la BD)
+    # Se usan las filas insertadas: las descartadas por la limpieza (p. ej. precio vacío) no cuentan
+    precios = chunk_limpio["price"]
+    if mode == "row" and insertados != 0 :
+        # Altualizamos segun cada row insertado en la bd
+        for x in precios.astype(float).tolist():
+            rs.update_one(float(x))
+    if mode == "chunk": 
+        # Calcula resumen del chunk y fusiona
+        cnt = int(precios.shape[0])
+        if cnt > 0:
+            mn = float(precios.min())
+            mx = float(precios.max())
+            mean = float(precios.mean())
+            # M2 del chunk en dos pasadas (media primero), sin cancelación catastrófica
+            m2 = float(((precios - mean) ** 2).sum())
+            rs.merge_batch(cnt, mean, mn, mx, m2)
+    if insertados != 0:
+        # Sketch de usuarios distintos: un update vectorizado por chunk, en ambos modos
+        rs.usuarios.update_batch(chunk_limpio["user_id"].to_numpy())
+    if ventana is not None and insertados != 0:
+        # Resumen por bucket de 'ts', en ambos modos
+        ventana.update_batch(chunk_limpio["ts"], precios)
+
+    return insertados
 
 
 def ingest_file(path: Path, mode: str, chunksize: int, config: Dict[str, Any]): 
     """
         Funcion principal del pipeline, esta funcion realiza el proceso de ingesta y estadistica,
         en donde ingresa un(os) archivo(s) CSV a la base de datos y actualiza las estadísticas acumuladas.
+        Los archivos '.parquet' se leen con `ParquetReader` y siguen el mismo flujo.
 
         Args:
-            path (Path): Ruta del archivo CSV a procesar.
+            path (Path): Ruta del archivo CSV (o Parquet) a procesar.
             mode (str): Modo de actualización de estadísticas:
                 - "row": Actualiza por cada fila insertada (La ventaja que se tiene es que 
                     hace el update más preciso, pero se sacrifica el costo computacional).
@@ -103,9 +308,11 @@ def ingest_file(path: Path, mode: str, chunksize: int, config: Dict[str, Any]):
 
         Detalle del Workflow de la funcion:
             1. Lee el CSV en chunks usando `CSVReader`.
-            2. Aplica transformaciones y limpieza con `limpieza_df`.
+            2. Aplica transformaciones y limpieza con `limpieza_df` y valida las filas con
+               `Validador` (las rechazadas van a la tabla 'cuarentena').
             3. Inserta los registros en la tabla 'events'.
-            4. Actualiza las estadísticas acumuladas en memoria (`RunningStats`).
+            4. Actualiza las estadísticas acumuladas en memoria (`RunningStats`) y las de
+               la ventana de tiempo (`WindowedStats`).
             5. Persiste las estadísticas en la base de datos tras cada chunk.
 
         Side Effects:
@@ -123,43 +330,19 @@ def ingest_file(path: Path, mode: str, chunksize: int, config: Dict[str, Any]):
     
     # Cargamos las stats actuales de la BD
     rs = load_running_stats_from_db(config)
+    ventana = load_windowed_stats_from_db(config)
     
     # Usamos Pandas maneja parseo incremental
     # Con esto aeguramos que no carga los CSV completos en memoria: itera por fila o por chunks
-    csv_reader = CSVReader(config=config)
-    for chunk in csv_reader.run(path, chunksize):
-        # Normalizamos columnas esperadas
-        chunk_limpio = (
-            limpieza_df(chunk)
-                .renombrar_columnas({"timestamp": "ts"})
-                .cambiar_tipo_fecha(["ts"])
-                .convertir_tipos({"price":"float", "user_id":"int"})
-                .eliminar_nulos(["ts", "price", "user_id"])                
-                .eliminar_duplicados()
-                .resultado()
-        )
-
-        chunk_limpio['updated_by'] = getpass.getuser()
-        # Cargamos la data a la BD
-        rows = list(chunk_limpio[["user_id", "price", "ts", "updated_by"]].itertuples(index=False, name=None))
-        insertados = insert_events(rows, config)
-
-        # Actualización de estadísticas (Sin tocar el historico ya cargado en la BD)
-        if mode == "row" and insertados != 0 :
-            # Altualizamos segun cada row insertado en la bd
-            for x in chunk["price"].astype(float).tolist():
-                rs.update_one(float(x))
-        if mode == "chunk": 
-            # Calcula resumen del chunk y fusiona
-            cnt = int(chunk.shape[0])
-            if cnt > 0:
-                mn = float(chunk["price"].min())
-                mx = float(chunk["price"].max())
-                mean = float(chunk["price"].mean())
-                rs.merge_batch(cnt, mean, mn, mx)
+    # (los Parquet se leen por row group)
+    # Con 'CSV.max_memoria' el tamaño de chunk se ajusta al presupuesto (ver `leer_chunks`)
+    reiniciar_pico()
+    for chunk in leer_chunks(path, chunksize, config):
+        insertados = procesar_chunk(chunk, rs, mode, config, ventana=ventana, origen=path.name)
 
         ## Persistimos progreso tras cada chunk
         persist_running_stats(rs, config)
+        persist_windowed_stats(ventana, config)
         logger.info(f"   + {insertados} filas. Stats parciales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
         print(f"   + {insertados} filas. Stats parciales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
 
@@ -167,3 +350,112 @@ def ingest_file(path: Path, mode: str, chunksize: int, config: Dict[str, Any]):
 
     logger.info(f"✓ Terminado {path.name}. Stats finales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
     print(f"✓ Terminado {path.name}. Stats finales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
+    reportar_memoria(path.name)
+
+
+def cargar_archivo_en_transaccion(path: Path, mode: str, chunksize: int, config: Dict[str, Any], conn):
+    """
+        Variante de `ingest_file` para los workers de la cola: inserta todos los chunks del
+        archivo en la transacción `conn` (sin commit) y acumula sus estadísticas en un
+        `RunningStats` y un `WindowedStats` propios, que el llamador fusiona con
+        'running_stats' y 'running_stats_ventana' en la misma transacción. Así el archivo
+        queda cargado completo o no queda cargado.
+
+        Args:
+            path (Path): Ruta del archivo a procesar.
+            mode (str): "row" o "chunk", como en `ingest_file`.
+            chunksize (int): Tamaño de los "lotes" a leer del archivo.
+            config (dict): Diccionario de configuración con las secciones 'CSV' y 'SQL'.
+            conn (psycopg2.extensions.connection): Transacción en curso.
+
+        Returns:
+            tuple[int, RunningStats, WindowedStats]: Filas insertadas y estadísticas del archivo.
+    """
+    rs = RunningStats()
+    ventana = nueva_ventana(config)
+    filas = 0
+    for chunk in leer_chunks(path, chunksize, config):
+        filas += procesar_chunk(chunk, rs, mode, config, conn=conn, ventana=ventana, origen=path.name)
+    return filas, rs, ventana
+
+
+def ingest_files_coalesced(paths, mode: str, config: Dict[str, Any], filas_lote: int = None):
+    """
+        Variante de `ingest_file` para muchos archivos pequeños (`load --coalesce`): concatena
+        las filas de varios archivos hasta completar 'filas_lote' y las procesa como un solo
+        chunk. Por lote hay una transacción con la inserción, la cuarentena y la procedencia
+        (tabla 'archivos_cargados', filas insertadas y rechazadas de cada archivo), y luego
+        una persistencia de las estadísticas; estas se leen de la base de datos una sola vez.
+        Un archivo más grande que 'filas_lote' se reparte en varios lotes. Con presupuesto de
+        memoria ('CSV.max_memoria') el lote también se cierra antes de que las filas
+        acumuladas lo excedan.
+
+        Args:
+            paths (Iterable[Path]): Archivos a cargar, en orden.
+            mode (str): "row" o "chunk", como en `ingest_file`.
+            config (dict): Diccionario de configuración con las secciones 'CSV' y 'SQL'.
+            filas_lote (int, opcional): Filas por lote; por defecto 'CSV.coalesce.filas_lote'.
+
+        Returns:
+            dict: Archivo → [filas insertadas, filas rechazadas].
+    """
+    filas_lote = filas_lote or (config['CSV'].get("coalesce") or {}).get("filas_lote", 50000)
+    rs = load_running_stats_from_db(config)
+    ventana = load_windowed_stats_from_db(config)
+    presupuesto = PresupuestoMemoria.desde_config(config)
+    # Un lector (y una estimación de memoria por fila) por formato para todos los archivos
+    lectores, bytes_por_fila = {}, {}
+    pendientes, archivos, filas_pendientes, bytes_pendientes = [], [], 0, 0
+    total = {}
+    reiniciar_pico()
+
+    def _vaciar():
+        conteos = {nombre: [0, 0] for nombre in archivos}
+        chunk = pd.concat(pendientes, ignore_index=True) if pendientes else None
+        with conexion(config['SQL']) as conn:
+            if chunk is not None:
+                procesar_chunk(chunk, rs, mode, config, conn=conn, ventana=ventana, conteos=conteos)
+            lote = registrar_archivos(conteos, config, conn)
+        persist_running_stats(rs, config)
+        persist_windowed_stats(ventana, config)
+        for nombre, (filas, rechazadas) in conteos.items():
+            acumulado = total.setdefault(nombre, [0, 0])
+            acumulado[0] += filas
+            acumulado[1] += rechazadas
+        insertados = sum(c[0] for c in conteos.values())
+        logger.info(f"   + Lote {lote}: {insertados} filas de {len(conteos)} archivos. Stats parciales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
+        print(f"   + Lote {lote}: {insertados} filas de {len(conteos)} archivos. Stats parciales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
+        reportar_memoria(f"lote {lote}")
+        pendientes.clear()
+        archivos.clear()
+
+    for path in paths:
+        formato = formato_entrada(path)
+        if formato not in lectores:
+            lectores[formato] = LECTORES.get(formato, CSVReader)(config=config)
+            if presupuesto is not None:
+                bytes_por_fila[formato] = lectores[formato].estimar_bytes_por_fila(path)
+        vacio = True
+        for chunk in leer_chunks(path, filas_lote, config, lectores[formato], bytes_por_fila.get(formato)):
+            vacio = False
+            if path.name not in archivos:
+                archivos.append(path.name)
+            pendientes.append(chunk.assign(archivo=path.name))
+            filas_pendientes += len(chunk)
+            if presupuesto is not None:
+                bytes_pendientes += int(chunk.memory_usage(deep=True).sum())
+            # Contrapresión: el lote se cierra por filas o por memoria acumulada (al vaciarlo,
+            # pd.concat copia las filas en espera: cuentan dos veces)
+            if filas_pendientes >= filas_lote or (presupuesto is not None and presupuesto.excedido(2 * bytes_pendientes)):
+                _vaciar()
+                filas_pendientes = bytes_pendientes = 0
+        if vacio:
+            # Un archivo sin filas también queda registrado
+            archivos.append(path.name)
+        logger.info(f"   {path.name} agregado al lote ({filas_pendientes} filas pendientes)")
+    if archivos:
+        _vaciar()
+
+    logger.info(f"✓ Terminados {len(total)} archivos. Stats finales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
+    print(f"✓ Terminados {len(total)} archivos. Stats finales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
+    return total
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 from config.logging_utils import get_logger
@@ -24,6 +25,9 @@ class limpieza_df:
 
             cambiar_tipo_fecha(col_fecha: list)
                 Convierte columnas de fecha a tipo timestamp en el DataFrame.
+
+            reducir_tipos(enteros: list, categoricas: list)
+                Reduce la memoria de columnas enteras (int32) y de texto repetido (category).
             
             renombrar_columnas(col_renom: dict)
                 Renombra columnas específicas del DataFrame según el diccionario proporcionado.
@@ -116,10 +120,45 @@ class limpieza_df:
         logger.info(f"Cambiando columnas: {col_fecha} a tipo timestamp")
     
         for col_ in col_fecha:
-            self.df[col_] = pd.to_datetime(self.df[col_], format="%m/%d/%Y", utc=True, errors="coerce")
+            serie = self.df[col_]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                # Leída como category ('CSV.dtypes'): cada fecha distinta se convierte una vez
+                fechas = pd.to_datetime(serie.cat.categories, format="%m/%d/%Y", utc=True, errors="coerce")
+                valores = fechas.take(serie.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT)
+                self.df[col_] = pd.Series(valores, index=serie.index)
+            else:
+                self.df[col_] = pd.to_datetime(serie, format="%m/%d/%Y", utc=True, errors="coerce")
 
         return self
     
+    def reducir_tipos(
+        self,
+        enteros: list = None,
+        categoricas: list = None
+    ):
+        """ 
+            Reduce la memoria del DataFrame: las columnas enteras pasan a int32 cuando todos
+            sus valores caben (si no, se dejan como están) y las de texto con pocos valores
+            distintos pasan a 'category'.
+            Args:
+                enteros (list, optional): Columnas enteras a convertir a int32.
+                categoricas (list, optional): Columnas a convertir a 'category'.
+
+            Returns:
+                self: Devuelve la instancia del objeto con el DataFrame actualizado.
+        """
+        limites = np.iinfo(np.int32)
+        for col_ in enteros or []:
+            serie = self.df[col_]
+            if len(serie) and (serie.min() < limites.min or serie.max() > limites.max):
+                logger.info(f"La columna '{col_}' no cabe en int32: se mantiene {serie.dtype}")
+                continue
+            self.df[col_] = serie.astype("int32")
+        for col_ in categoricas or []:
+            self.df[col_] = self.df[col_].astype("category")
+
+        return self
+
     def renombrar_columnas(
         self, 
         col_renom: dict
@@ -0,0 +1,133 @@
+import gc
+import os
+import resource
+from typing import Any, Dict
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+# Sufijos aceptados por --max-memory / 'CSV.max_memoria' (potencias de 1024)
+UNIDADES_MEMORIA = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+# Memoria que usa `procesar_chunk` por cada byte del chunk leído: copias de la limpieza y
+# la validación, las tuplas de Python de la inserción y el texto del EXECUTE. Medido entre
+# 3,4 y 5,3 con chunks de 20.000 a 400.000 filas del CSV de eventos; se deja margen.
+FACTOR_TRABAJO = 6
+
+_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def parse_tamano(valor) -> int:
+    """
+        Convierte un tamaño de memoria ('512M', '2G', '800k' o un entero de bytes) a bytes.
+
+        Raises:
+            ValueError: Si el valor no es un entero positivo con un sufijo K, M o G opcional.
+    """
+    texto = str(valor).strip().upper().removesuffix("B")
+    factor = UNIDADES_MEMORIA.get(texto[-1:], 1)
+    numero = texto[:-1] if texto[-1:] in UNIDADES_MEMORIA else texto
+    if not numero.isdigit() or int(numero) == 0:
+        raise ValueError(f"Tamaño de memoria inválido: {valor!r} (use p. ej. 512M, 2G o bytes).")
+    return int(numero) * factor
+
+
+def rss_actual() -> int:
+    """ Memoria residente (RSS) actual del proceso, en bytes. """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except OSError:
+        # Sin /proc (macOS): el máximo es la mejor aproximación disponible
+        return rss_pico()
+
+
+def rss_pico() -> int:
+    """ Pico de memoria residente del proceso (desde el inicio o el último `reiniciar_pico`), en bytes. """
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo if os.uname().sysname == "Darwin" else maximo * 1024
+
+
+def reiniciar_pico() -> bool:
+    """
+        Reinicia el pico de RSS del proceso (Linux: escribir '5' en /proc/self/clear_refs),
+        para medir el pico de cada archivo. Devuelve False si el sistema no lo permite; en
+        ese caso `rss_pico` sigue siendo el máximo desde el inicio del proceso.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class PresupuestoMemoria:
+    """
+        Presupuesto de memoria de una carga ('CSV.max_memoria' o `load --max-memory`).
+        La memoria disponible para procesar chunks es el presupuesto menos el RSS del proceso
+        al crearlo (intérprete, pandas, conexiones).
+
+        Metodos:
+        --------
+            desde_config(config: dict)
+                Presupuesto configurado, o None si no hay límite.
+
+            filas_por_chunk(bytes_por_fila: float, pedido: int)
+                Filas por chunk que caben en el presupuesto (a lo sumo `pedido`).
+
+            excedido(bytes_pendientes: int)
+                Si las filas acumuladas (más el RSS actual) superan el presupuesto.
+
+            aliviar()
+                Libera memoria; devuelve si el RSS sigue por encima del presupuesto.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.base = rss_actual()
+        if self.base >= max_bytes:
+            logger.warning(
+                f"El proceso ya usa {self.base / (1 << 20):.0f} MiB, más que el presupuesto de "
+                f"{max_bytes / (1 << 20):.0f} MiB: los chunks serán mínimos."
+            )
+
+    @classmethod
+    def desde_config(cls, config: Dict[str, Any]):
+        valor = config['CSV'].get("max_memoria")
+        return cls(parse_tamano(valor)) if valor else None
+
+    @property
+    def disponible(self) -> int:
+        """ Bytes para los datos en proceso (presupuesto menos el RSS base). """
+        return max(self.max_bytes - self.base, 0)
+
+    def filas_por_chunk(self, bytes_por_fila: float, pedido: int = None) -> int:
+        """
+            Filas por chunk tales que el chunk y su memoria de trabajo (`FACTOR_TRABAJO`)
+            quepan en lo disponible. Con `pedido` se devuelve como máximo ese valor.
+        """
+        filas = max(int(self.disponible / (max(bytes_por_fila, 1.0) * FACTOR_TRABAJO)), 1)
+        return min(filas, pedido) if pedido else filas
+
+    def excedido(self, bytes_pendientes: int = 0) -> bool:
+        """ Si las filas en espera, con su memoria de trabajo, o el RSS actual superan el presupuesto. """
+        return (
+            self.base + bytes_pendientes * FACTOR_TRABAJO > self.max_bytes
+            or rss_actual() > self.max_bytes
+        )
+
+    def aliviar(self) -> bool:
+        """ Recolecta basura; devuelve True si el RSS sigue por encima del presupuesto. """
+        if rss_actual() <= self.max_bytes:
+            return False
+        gc.collect()
+        return rss_actual() > self.max_bytes
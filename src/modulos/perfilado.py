@@ -0,0 +1,292 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from config.logging_utils import get_logger, LOG_DIR
+logger = get_logger()
+
+
+# Raíz del proyecto: las rutas de los frames se muestran relativas a ella
+RAIZ = Path(__file__).resolve().parents[2]
+
+# Etapa del pipeline de cada módulo (prefijo de la ruta relativa → plantilla del nombre).
+# En una pila cuenta el frame más externo que pertenece a una etapa: el tiempo de pandas
+# dentro de `limpieza_df.eliminar_duplicados` es de esa etapa, y el de psycopg2 dentro de
+# `insert_events`, de 'db.insert_events'.
+ETAPAS = (
+    ("src/submodulos/csv_reader.py", "lectura"),
+    ("src/submodulos/parquet_reader.py", "lectura"),
+    ("pandas/io/parsers/", "lectura"),
+    ("pyarrow/parquet/", "lectura"),
+    ("src/modulos/limpieza.py", "limpieza_df.{nombre}"),
+    ("src/modulos/validacion.py", "validacion.{nombre}"),
+    ("src/modulos/db.py", "db.{nombre}"),
+    ("src/modulos/stats.py", "stats.{funcion}"),
+    ("src/modulos/memoria.py", "memoria"),
+)
+
+PERFILADORES = ("muestreo", "determinista")
+
+
+def ruta_relativa(archivo: str) -> str:
+    """ Ruta del código relativa a la raíz del proyecto, o al paquete instalado (site-packages). """
+    archivo = archivo.replace("\\", "/")
+    raiz = str(RAIZ).replace("\\", "/") + "/"
+    if archivo.startswith(raiz):
+        return archivo[len(raiz):]
+    if "site-packages/" in archivo:
+        return archivo.rsplit("site-packages/", 1)[1]
+    return os.path.basename(archivo)
+
+
+def etapa_de(ruta: str, funcion: str) -> str:
+    """
+        Etapa del pipeline a la que pertenece una función, o None si no es de ninguna.
+
+        Args:
+            ruta (str): Ruta relativa del archivo (ver `ruta_relativa`).
+            funcion (str): Nombre calificado de la función ('RunningStats.merge_batch').
+    """
+    if funcion == "<module>":
+        return None
+    for prefijo, plantilla in ETAPAS:
+        if ruta.startswith(prefijo):
+            return plantilla.format(nombre=funcion.rsplit(".", 1)[-1], funcion=funcion)
+    return None
+
+
+def _etapa_de_pila(pila: Tuple[str, ...]) -> str:
+    """
+        Etapa de una pila (de la raíz a la hoja) de etiquetas 'ruta:funcion': la del frame
+        más externo con etapa; si no hay, la función más interna del proyecto ('ingesta.procesar_chunk').
+        El tiempo de ejecutar un módulo al importarlo va a 'importación'.
+    """
+    propio = None
+    for etiqueta in pila:
+        ruta, _, funcion = etiqueta.partition(":")
+        if funcion == "<module>":
+            # Imports diferidos de los comandos (ver src/proceso.py)
+            return "importación"
+        etapa = etapa_de(ruta, funcion)
+        if etapa is not None:
+            return etapa
+        if ruta.startswith("src/"):
+            propio = f"{Path(ruta).stem}.{funcion}"
+    return propio or "otros"
+
+
+@dataclass
+class Perfil:
+    """
+        Resultado de perfilar una carga.
+
+        Atributos:
+            perfilador (str): 'muestreo' o 'determinista'.
+            total_s (float): Segundos perfilados.
+            etapas (dict): Etapa → segundos atribuidos.
+            funciones (list): (función, segundos de tiempo propio), de mayor a menor.
+            pilas (Counter): Pila (tupla de 'ruta:funcion', de la raíz a la hoja) →
+                microsegundos. Solo con el perfilador de muestreo.
+            stats (pstats.Stats): Estadísticas de cProfile. Solo con el perfilador determinista.
+    """
+    perfilador: str
+    total_s: float
+    etapas: Dict[str, float]
+    funciones: List[Tuple[str, float]]
+    pilas: Counter = field(default_factory=Counter)
+    stats: pstats.Stats = None
+
+
+class Muestreador:
+    """
+        Perfilador por muestreo: un hilo aparte toma cada `intervalo` segundos la pila del
+        hilo perfilado (`sys._current_frames`) y acumula el tiempo transcurrido desde la
+        muestra anterior en esa pila. No instrumenta las llamadas, por lo que el costo es
+        casi nulo y los tiempos de pandas o psycopg2 no se distorsionan; a cambio, las
+        funciones de menos de unos pocos intervalos pueden no aparecer.
+
+        Metodos:
+        --------
+            iniciar()
+                Comienza a muestrear el hilo actual (solo los frames por debajo de la llamada).
+
+            detener()
+                Detiene el muestreo.
+    """
+    def __init__(self, intervalo: float = 0.005):
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._etiquetas = {}
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _etiqueta(self, codigo) -> str:
+        etiqueta = self._etiquetas.get(codigo)
+        if etiqueta is None:
+            nombre = getattr(codigo, "co_qualname", codigo.co_name)
+            etiqueta = self._etiquetas[codigo] = f"{ruta_relativa(codigo.co_filename)}:{nombre}"
+        return etiqueta
+
+    def iniciar(self):
+        self._objetivo = threading.get_ident()
+        # La pila se corta en el frame que llamó a iniciar(): no se registran los de click
+        self._raiz = sys._getframe(1)
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _muestrear(self):
+        anterior = time.perf_counter()
+        while not self._detener.wait(self.intervalo):
+            ahora = time.perf_counter()
+            frame = sys._current_frames().get(self._objetivo)
+            pila = []
+            while frame is not None and frame is not self._raiz:
+                pila.append(frame.f_code)
+                frame = frame.f_back
+            # Sin la función perfilada en curso (p. ej. dentro de detener()) no se registra
+            if pila and pila[-1].co_filename != __file__:
+                pila = [self._etiqueta(codigo) for codigo in reversed(pila)]
+                # El GIL puede atrasar la muestra: se pondera por el tiempo real transcurrido
+                self.pilas[tuple(pila)] += int((ahora - anterior) * 1e6)
+            anterior = ahora
+
+
+def resumir_pilas(pilas: Counter, top: int = 25) -> Tuple[Dict[str, float], List[Tuple[str, float]]]:
+    """ Segundos por etapa y las `top` funciones con más tiempo propio (hoja de la pila). """
+    etapas, propias = Counter(), Counter()
+    for pila, micro in pilas.items():
+        etapas[_etapa_de_pila(pila)] += micro / 1e6
+        propias[pila[-1]] += micro / 1e6
+    return dict(etapas.most_common()), propias.most_common(top)
+
+
+def resumir_cprofile(stats: pstats.Stats, top: int = 25) -> Tuple[Dict[str, float], List[Tuple[str, float]]]:
+    """
+        Segundos por etapa a partir de cProfile. Sin las pilas completas, cada etapa suma
+        el tiempo acumulado de sus funciones en las llamadas directas desde el código del
+        pipeline fuera de toda etapa (ingesta, cola, seguimiento): equivale al frame más
+        externo. Lo que queda (imports, click, conexiones abiertas desde el pool) va a 'otros'.
+    """
+    etapas, propias = Counter(), Counter()
+    total = 0.0
+    for (archivo, linea, nombre), (_, _, propio, _, llamadores) in stats.stats.items():
+        total += propio
+        ruta = ruta_relativa(archivo)
+        propias[f"{ruta}:{nombre}"] += propio
+        etapa = etapa_de(ruta, nombre)
+        if etapa is None:
+            continue
+        for (archivo_ll, _, nombre_ll), (_, _, _, acumulado) in llamadores.items():
+            ruta_ll = ruta_relativa(archivo_ll)
+            if ruta_ll.startswith("src/") and nombre_ll != "<module>" and etapa_de(ruta_ll, nombre_ll) is None:
+                etapas[etapa] += acumulado
+    etapas["otros"] = max(total - sum(etapas.values()), 0.0)
+    return dict(etapas.most_common()), propias.most_common(top)
+
+
+def perfilar(funcion: Callable[[], object], perfilador: str = "muestreo", intervalo: float = 0.005) -> Perfil:
+    """
+        Ejecuta `funcion()` bajo el perfilador indicado.
+
+        Args:
+            funcion (callable): Carga a perfilar, sin argumentos.
+            perfilador (str): 'muestreo' (pilas completas, apto para flamegraph) o
+                'determinista' (cProfile: conteo exacto de llamadas, más sobrecarga).
+            intervalo (float): Segundos entre muestras del perfilador de muestreo.
+
+        Returns:
+            Perfil: Tiempos por etapa y por función.
+
+        Raises:
+            ValueError: Si el perfilador no es válido.
+    """
+    if perfilador not in PERFILADORES:
+        raise ValueError(f"Perfilador no soportado: {perfilador} (use {', '.join(PERFILADORES)}).")
+
+    inicio = time.perf_counter()
+    if perfilador == "determinista":
+        perfil = cProfile.Profile()
+        try:
+            perfil.runcall(funcion)
+        finally:
+            total = time.perf_counter() - inicio
+        stats = pstats.Stats(perfil)
+        etapas, funciones = resumir_cprofile(stats)
+        return Perfil(perfilador, total, etapas, funciones, stats=stats)
+
+    muestreador = Muestreador(intervalo)
+    muestreador.iniciar()
+    try:
+        funcion()
+    finally:
+        muestreador.detener()
+        total = time.perf_counter() - inicio
+    etapas, funciones = resumir_pilas(muestreador.pilas)
+    return Perfil(perfilador, total, etapas, funciones, pilas=muestreador.pilas)
+
+
+def formatear_reporte(perfil: Perfil) -> str:
+    """ Reporte en texto: tiempo por etapa del pipeline y funciones con más tiempo propio. """
+    perfilado = sum(perfil.etapas.values()) or 1.0
+    lineas = [
+        f"Perfilador: {perfil.perfilador} | Tiempo total: {perfil.total_s:.2f}s",
+        "",
+        f"{'etapa':<45} {'segundos':>9} {'%':>6}",
+    ]
+    for etapa, segundos in perfil.etapas.items():
+        lineas.append(f"{etapa:<45} {segundos:>9.3f} {100 * segundos / perfilado:>6.1f}")
+    lineas += ["", f"{'función (tiempo propio)':<70} {'segundos':>9}"]
+    for funcion, segundos in perfil.funciones:
+        lineas.append(f"{funcion[-70:]:<70} {segundos:>9.3f}")
+    return "\n".join(lineas) + "\n"
+
+
+def escribir_pilas(pilas: Counter, destino: Path):
+    """
+        Escribe las pilas en formato colapsado ('a;b;c valor' por línea), el que leen
+        flamegraph.pl, speedscope o inferno. El valor son microsegundos.
+    """
+    with open(destino, "w", encoding="utf-8") as f:
+        for pila, micro in sorted(pilas.items()):
+            if micro > 0:
+                f.write(f"{';'.join(pila).replace(' ', '_')} {micro}\n")
+
+
+def guardar_perfil(perfil: Perfil, directorio=None) -> Dict[str, Path]:
+    """
+        Guarda los artefactos del perfil junto a los logs ('config/logs' por defecto):
+            - profile_<fecha>.txt: reporte por etapa y por función.
+            - profile_<fecha>.folded: pilas colapsadas para flamegraph (muestreo).
+            - profile_<fecha>.prof: estadísticas de cProfile, para pstats o snakeviz (determinista).
+
+        Returns:
+            dict: Tipo de artefacto ('reporte', 'pilas', 'pstats') → ruta.
+    """
+    directorio = Path(directorio or LOG_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    base = directorio / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    rutas = {"reporte": base.with_suffix(".txt")}
+    rutas["reporte"].write_text(formatear_reporte(perfil), encoding="utf-8")
+    if perfil.pilas:
+        rutas["pilas"] = base.with_suffix(".folded")
+        escribir_pilas(perfil.pilas, rutas["pilas"])
+    if perfil.stats is not None:
+        rutas["pstats"] = base.with_suffix(".prof")
+        perfil.stats.dump_stats(rutas["pstats"])
+    logger.info(f"Perfil guardado en {rutas['reporte']}")
+    return rutas
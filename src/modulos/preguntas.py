@@ -0,0 +1,82 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+def leer_preguntas(path: Path) -> List[str]:
+    """
+        Lee un archivo de preguntas, una por línea. Se ignoran las líneas vacías
+        y las que empiezan con '#'.
+
+        Args:
+            path (Path): Ruta del archivo de preguntas.
+
+        Returns:
+            list[str]: Preguntas en el orden del archivo.
+
+        Raises:
+            FileNotFoundError: Si el archivo no existe.
+    """
+    path = Path(path)
+    if not path.exists():
+        logger.error(f"No se encontró el archivo de preguntas '{path}'.")
+        raise FileNotFoundError(f"Archivo no encontrado: {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        preguntas = [linea.strip() for linea in f]
+    preguntas = [p for p in preguntas if p and not p.startswith("#")]
+    logger.info(f"Se leyeron {len(preguntas)} preguntas desde {path.name}")
+    return preguntas
+
+
+def escribir_respuestas(path: Path, resultados: List[Dict[str, Any]]) -> int:
+    """
+        Escribe los resultados en formato JSONL (un objeto JSON por línea).
+
+        Args:
+            path (Path): Ruta del archivo de salida.
+            resultados (list[dict]): Registros con pregunta, ruta, respuesta y latencia.
+
+        Returns:
+            int: Número de registros escritos.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for r in resultados:
+            f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+    logger.info(f"Se escribieron {len(resultados)} respuestas en {path}")
+    return len(resultados)
+
+
+def consumir_stream(fragmentos: Iterable[str], al_recibir: Callable[[str], Any] = None) -> Dict[str, Any]:
+    """
+        Consume una respuesta en streaming midiendo el tiempo al primer token y la
+        latencia total. El cronómetro empieza antes de pedir el primer fragmento, de modo
+        que la recuperación de contexto queda incluida en ambos tiempos.
+
+        Args:
+            fragmentos (Iterable[str]): Fragmentos de la respuesta (p.ej. `responder_stream`).
+            al_recibir (callable, opcional): Función llamada con cada fragmento apenas llega
+                (p.ej. para imprimirlo por consola).
+
+        Returns:
+            dict: Diccionario con:
+                - "respuesta" (str): Respuesta completa.
+                - "ttft_s" (float | None): Tiempo hasta el primer fragmento; None si no hubo.
+                - "latencia_s" (float): Tiempo total de la respuesta.
+    """
+    inicio = time.perf_counter()
+    ttft = None
+    partes = []
+    for fragmento in fragmentos:
+        if ttft is None:
+            ttft = time.perf_counter() - inicio
+        partes.append(fragmento)
+        if al_recibir is not None:
+            al_recibir(fragmento)
+    return {"respuesta": "".join(partes), "ttft_s": ttft, "latencia_s": time.perf_counter() - inicio}
@@ -0,0 +1,296 @@
+import io
+import json
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+from src.modulos.db import conexion, registrar_archivos, fetch_archivos_cargados
+from src.modulos.ingesta import (
+    formato_entrada, ingest_file, procesar_chunk, load_running_stats_from_db, persist_running_stats,
+    load_windowed_stats_from_db, persist_windowed_stats
+)
+from src.submodulos.csv_reader import compresion_de
+from src.modulos.memoria import PresupuestoMemoria
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+class Seguidor:
+    """
+        Ingesta continua del directorio 'CSV_DIR' (`load --follow`): detecta archivos nuevos
+        y filas agregadas al final de CSV que siguen creciendo, y las inserta en micro-lotes
+        que se vacían al llegar a 'max_filas' o cuando la fila más antigua pendiente
+        supera 'max_latencia_s'.
+
+        - Espera cambios con watchfiles (inotify en Linux) y, si no está disponible o se pide
+          `forzar_polling`, revisa el directorio cada 'intervalo_s'.
+        - De los CSV planos guarda el offset en bytes ya cargado en el archivo de estado
+          ('estado'), por lo que al reiniciar continúa donde quedó. Las filas se leen hasta el
+          último salto de línea; una última línea sin salto se carga cuando el archivo lleva
+          'max_latencia_s' sin cambiar.
+        - Sin archivo de estado, el estado inicial se toma de los archivos que la base de datos
+          registra como cargados (`fetch_archivos_cargados`): se asumen completos y solo se
+          siguen sus filas nuevas. `load` sin --coalesce ni --worker no deja ese registro, por
+          lo que un directorio cargado así debe seguirse desde el inicio con su estado o
+          quedar a cargo solo de este modo.
+        - Cada lote se inserta en una transacción junto con su procedencia en
+          'archivos_cargados' (filas insertadas y rechazadas por archivo), como `--coalesce`.
+        - Los archivos comprimidos y Parquet no se pueden leer por partes: se cargan completos
+          con `ingest_file` cuando dejan de cambiar.
+        - El offset se guarda después de insertar el lote, así que una caída entre la inserción
+          y el guardado del estado puede repetir ese último lote al reiniciar.
+        - Con presupuesto de memoria ('CSV.max_memoria') el lote también se vacía cuando las
+          filas pendientes, con su memoria de trabajo, lo superarían.
+        - SIGINT/SIGTERM detienen el ciclo después de vaciar el lote pendiente.
+
+        Metodos:
+        --------
+            ejecutar()
+                Ciclo principal hasta recibir una señal de término.
+
+            revisar()
+                Una pasada: revisa el directorio y vacía el lote si corresponde.
+
+            vaciar()
+                Inserta el lote pendiente, persiste las estadísticas y los offsets.
+    """
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        mode: str = "row",
+        chunksize: int = 1,
+        include_validation: bool = False,
+        forzar_polling: bool = False,
+    ):
+        cfg = config['CSV']
+        seguimiento = cfg.get("follow") or {}
+        self.config = config
+        self.mode = mode
+        self.chunksize = chunksize
+        self.directorio = Path(cfg.get("CSV_DIR"))
+        self.excluido = None if include_validation else cfg.get("file_validation")
+        self.sep = cfg.get("separadores", ",")
+        self.usecols = cfg.get("usecols", None)
+        self.dtypes = cfg.get("dtypes")
+        self.intervalo = seguimiento.get("intervalo_s", 1.0)
+        self.max_filas = seguimiento.get("max_filas", 5000)
+        self.max_latencia = seguimiento.get("max_latencia_s", 2.0)
+        self.max_bytes = seguimiento.get("max_bytes_lectura", 8 << 20)
+        self.estado_path = Path(seguimiento.get("estado", "./follow_state.json"))
+        self.forzar_polling = forzar_polling
+        self.presupuesto = PresupuestoMemoria.desde_config(config)
+
+        self.detener = threading.Event()
+        self.sembrar = not self.estado_path.exists()
+        self.estado = self._cargar_estado()
+        # Offsets leídos (incluye lo que está en el lote pendiente) y último tamaño visto
+        self.leido: Dict[str, int] = {}
+        self.vistos: Dict[str, Dict[str, float]] = {}
+        self.pendientes = []
+        self.filas_pendientes = 0
+        self.bytes_pendientes = 0
+        self.desde_pendiente = None
+        self.rs = None
+        self.ventana = None
+
+    # ------------------------------------------------------------------ estado
+    def _cargar_estado(self) -> Dict[str, Dict[str, Any]]:
+        if self.estado_path.exists():
+            with open(self.estado_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _sembrar_estado(self):
+        """ Estado inicial sin archivo de estado: los archivos ya cargados se siguen desde su final. """
+        cargados = fetch_archivos_cargados(self.config)
+        for path in sorted(self.directorio.iterdir()):
+            if path.name not in cargados or path.name in self.estado or not path.is_file():
+                continue
+            info = self.estado[path.name] = {"offset": path.stat().st_size}
+            if formato_entrada(path) == ".csv" and compresion_de(path) is None:
+                with open(path, "rb") as f:
+                    info["cabecera"] = f.readline().decode("utf-8").rstrip("\r\n")
+            logger.info(f"   {path.name} ya está cargado: se siguen solo sus filas nuevas.")
+        self.sembrar = False
+        self._guardar_estado()
+
+    def _guardar_estado(self):
+        # Escritura atómica: un corte a mitad de escritura no deja el estado corrupto
+        tmp = self.estado_path.with_suffix(self.estado_path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.estado, f, indent=2)
+        tmp.replace(self.estado_path)
+
+    # ------------------------------------------------------------------ ciclo
+    def ejecutar(self):
+        """ Ciclo principal: revisa el directorio en cada cambio o timeout hasta recibir una señal. """
+        logger.info(f"→ Siguiendo {self.directorio} (lote: {self.max_filas} filas / {self.max_latencia}s)")
+        print(f"→ Siguiendo {self.directorio} (lote: {self.max_filas} filas / {self.max_latencia}s). Ctrl+C para terminar.")
+        anteriores = self._instalar_senales()
+        try:
+            for _ in self._despertares():
+                self.revisar()
+                if self.detener.is_set():
+                    break
+        finally:
+            self.vaciar()
+            self._restaurar_senales(anteriores)
+            logger.info("✓ Seguimiento terminado.")
+            print("✓ Seguimiento terminado.")
+
+    def revisar(self):
+        """ Una pasada: lee lo nuevo de cada archivo y vacía el lote si se cumplió tamaño o latencia. """
+        if self.rs is None:
+            self.rs = load_running_stats_from_db(self.config)
+            self.ventana = load_windowed_stats_from_db(self.config)
+        if self.sembrar:
+            self._sembrar_estado()
+        self._escanear()
+        if self.desde_pendiente is not None and time.monotonic() - self.desde_pendiente >= self.max_latencia:
+            self.vaciar()
+
+    def _despertares(self):
+        """ Genera un evento por cada cambio en el directorio o cada 'intervalo_s' sin cambios. """
+        yield None
+        if not self.forzar_polling:
+            try:
+                import watchfiles
+            except ImportError:
+                logger.warning("watchfiles no está disponible: se usa polling.")
+            else:
+                espera_ms = max(int(self.intervalo * 1000), 50)
+                yield from watchfiles.watch(
+                    self.directorio, stop_event=self.detener, rust_timeout=espera_ms,
+                    yield_on_timeout=True, raise_interrupt=False, debounce=espera_ms, recursive=False,
+                )
+                return
+        while not self.detener.wait(self.intervalo):
+            yield None
+
+    def _instalar_senales(self):
+        def _terminar(signum, frame):
+            logger.info(f"Señal {signum} recibida: terminando seguimiento.")
+            self.detener.set()
+
+        anteriores = {}
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                anteriores[sig] = signal.signal(sig, _terminar)
+            except ValueError:
+                # Solo el hilo principal puede instalar manejadores
+                pass
+        return anteriores
+
+    @staticmethod
+    def _restaurar_senales(anteriores):
+        for sig, manejador in anteriores.items():
+            signal.signal(sig, manejador)
+
+    # ------------------------------------------------------------------ lectura
+    def _escanear(self):
+        ahora = time.monotonic()
+        for path in sorted(self.directorio.iterdir()):
+            if not path.is_file() or not formato_entrada(path) or path.name == self.excluido:
+                continue
+            tamano = path.stat().st_size
+            visto = self.vistos.setdefault(path.name, {"tamano": -1, "cambio": ahora})
+            if tamano != visto["tamano"]:
+                visto.update(tamano=tamano, cambio=ahora)
+            quieto = ahora - visto["cambio"] >= self.max_latencia
+
+            if formato_entrada(path) == ".csv" and compresion_de(path) is None:
+                self._leer_cola(path, tamano, quieto)
+            elif quieto and self.estado.get(path.name, {}).get("offset") != tamano:
+                self._cargar_completo(path, tamano)
+
+    def _cargar_completo(self, path: Path, tamano: int):
+        # ingest_file lee y persiste running_stats por su cuenta: se vacía antes y se recarga después
+        self.vaciar()
+        ingest_file(path, self.mode, self.chunksize, self.config)
+        self.rs = load_running_stats_from_db(self.config)
+        self.ventana = load_windowed_stats_from_db(self.config)
+        self.estado[path.name] = {"offset": tamano}
+        self._guardar_estado()
+
+    def _leer_cola(self, path: Path, tamano: int, quieto: bool):
+        info = self.estado.setdefault(path.name, {"offset": 0})
+        leido = self.leido.get(path.name, info["offset"])
+        if tamano < leido:
+            logger.warning(f"{path.name} es más pequeño que el offset guardado ({tamano} < {leido}): se vuelve a leer desde el inicio.")
+            self.vaciar()
+            info.clear()
+            info["offset"] = leido = 0
+
+        while leido < tamano:
+            with open(path, "rb") as f:
+                f.seek(leido)
+                datos = f.read(min(tamano - leido, self.max_bytes))
+            completo = leido + len(datos) == tamano and quieto
+            if not completo:
+                # Solo se procesan líneas terminadas; el resto queda para la próxima revisión
+                fin = datos.rfind(b"\n")
+                if fin == -1:
+                    break
+                datos = datos[:fin + 1]
+
+            cuerpo = datos
+            if "cabecera" not in info:
+                cabecera, _, cuerpo = datos.partition(b"\n")
+                info["cabecera"] = cabecera.decode("utf-8").rstrip("\r")
+
+            leido += len(datos)
+            self.leido[path.name] = leido
+            self._agregar(path.name, cuerpo, info["cabecera"])
+
+    def _agregar(self, nombre: str, cuerpo: bytes, cabecera: str):
+        if cuerpo.strip():
+            df = pd.read_csv(io.BytesIO(cabecera.encode("utf-8") + b"\n" + cuerpo), sep=self.sep, usecols=self.usecols, dtype=self.dtypes)
+            if len(df):
+                # Procedencia por fila: un lote combina varios archivos (ver `procesar_chunk`)
+                self.pendientes.append(df.assign(archivo=nombre))
+                self.filas_pendientes += len(df)
+                if self.presupuesto is not None:
+                    self.bytes_pendientes += int(df.memory_usage(deep=True).sum())
+                if self.desde_pendiente is None:
+                    self.desde_pendiente = time.monotonic()
+                logger.info(f"   {nombre}: {len(df)} filas nuevas en el lote")
+        lleno = self.filas_pendientes >= self.max_filas or (
+            self.presupuesto is not None and self.presupuesto.excedido(2 * self.bytes_pendientes)
+        )
+        if lleno or not self.pendientes:
+            # Lote lleno (filas o memoria), o solo se avanzó el offset (cabecera / líneas vacías)
+            self.vaciar()
+
+    # ------------------------------------------------------------------ escritura
+    def vaciar(self):
+        """ Inserta el lote pendiente, persiste las estadísticas y guarda los offsets leídos. """
+        if self.pendientes:
+            chunk = pd.concat(self.pendientes, ignore_index=True)
+            conteos = {}
+            with conexion(self.config['SQL']) as conn:
+                procesar_chunk(chunk, self.rs, self.mode, self.config, conn=conn, ventana=self.ventana, conteos=conteos)
+                registrar_archivos(conteos, self.config, conn)
+            insertados = sum(c[0] for c in conteos.values())
+            persist_running_stats(self.rs, self.config)
+            persist_windowed_stats(self.ventana, self.config)
+            rs = self.rs
+            logger.info(f"   + {insertados} filas. Stats parciales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
+            print(f"   + {insertados} filas. Stats parciales → n={rs.count} mean={rs.mean:.2f} min={rs.min:.2f} max={rs.max:.2f}")
+
+        cambios = False
+        for nombre, offset in self.leido.items():
+            if self.estado[nombre].get("offset") != offset:
+                self.estado[nombre]["offset"] = offset
+                cambios = True
+        if cambios or self.pendientes:
+            self._guardar_estado()
+
+        self.pendientes = []
+        self.filas_pendientes = 0
+        self.bytes_pendientes = 0
+        self.desde_pendiente = None
@@ -1,4 +1,138 @@
-from dataclasses import dataclass
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+def suma_compensada(total: float, comp: float, valor: float):
+    """
+        Suma compensada de Neumaier: agrega `valor` a `total` y acumula en `comp` el error
+        de redondeo de la suma. El valor corregido es total + comp.
+
+        Returns:
+            tuple[float, float]: Nuevos (total, comp).
+    """
+    t = total + valor
+    if abs(total) >= abs(valor):
+        comp += (total - t) + valor
+    else:
+        comp += (valor - t) + total
+    return t, comp
+
+
+# Constantes de splitmix64 (mezclador de 64 bits usado como hash de los user_id)
+_SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_SPLITMIX_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_SPLITMIX_M2 = np.uint64(0x94D049BB133111EB)
+
+
+def splitmix64(valores) -> np.ndarray:
+    """
+        Hash splitmix64 vectorizado: mezcla cada entero de 64 bits en un valor de 64 bits
+        con sus bits uniformemente distribuidos. La aritmética es módulo 2^64.
+    """
+    z = np.asarray(valores).astype(np.int64).view(np.uint64) + _SPLITMIX_GAMMA
+    z = (z ^ (z >> np.uint64(30))) * _SPLITMIX_M1
+    z = (z ^ (z >> np.uint64(27))) * _SPLITMIX_M2
+    return z ^ (z >> np.uint64(31))
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """ Número de bits significativos de cada uint64 (búsqueda binaria por desplazamientos). """
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for s in (32, 16, 8, 4, 2, 1):
+        mayor = x >= (np.uint64(1) << np.uint64(s))
+        n[mayor] += s
+        x[mayor] >>= np.uint64(s)
+    return n + (x > 0)
+
+
+class HyperLogLog:
+    """
+        Sketch HyperLogLog para contar valores distintos (usuarios) en memoria constante:
+        2^p registros de un byte (16 KB con p = 14), con un error estándar relativo de
+        1.04 / sqrt(2^p) (0.81 % con p = 14).
+
+        Cada valor se transforma con splitmix64; los primeros p bits eligen el registro y el
+        registro guarda el máximo "rango" (posición del primer bit en 1) de los bits
+        restantes. Dos sketches con la misma precisión se fusionan con el máximo registro a
+        registro, por lo que el resultado no depende del orden ni de cómo se repartieron
+        los datos entre procesos.
+
+        Metodos:
+        --------
+            update_batch(valores)
+                Agrega un lote de enteros (vectorizado con NumPy).
+
+            merge(otro: HyperLogLog)
+                Fusiona otro sketch en este.
+
+            estimar() -> float
+                Estimación del número de valores distintos.
+
+            error_relativo(confianza: float) -> float
+                Cota de error relativo para el nivel de confianza indicado.
+
+            a_bytes() / desde_bytes(datos)
+                Serialización de los registros (para la columna 'hll' de 'running_stats').
+    """
+    def __init__(self, p: int = 14, registros: np.ndarray = None):
+        if not 4 <= p <= 18:
+            raise ValueError(f"Precisión de HyperLogLog fuera de rango (4..18): {p}")
+        self.p = p
+        self.m = 1 << p
+        self.registros = registros if registros is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def update_batch(self, valores):
+        """ Agrega un lote de enteros; los repetidos no cambian el sketch. """
+        if len(valores) == 0:
+            return
+        h = splitmix64(valores)
+        indice = (h >> np.uint64(64 - self.p)).astype(np.intp)
+        resto = h & np.uint64((1 << (64 - self.p)) - 1)
+        rango = (64 - self.p) - _bit_length(resto) + 1
+        np.maximum.at(self.registros, indice, rango.astype(np.uint8))
+
+    def merge(self, otro: "HyperLogLog"):
+        """ Fusiona otro sketch de la misma precisión (máximo por registro). """
+        if otro.p != self.p:
+            raise ValueError(f"No se pueden fusionar HyperLogLog de precisión {self.p} y {otro.p}")
+        np.maximum(self.registros, otro.registros, out=self.registros)
+
+    def estimar(self) -> float:
+        """
+            Estimación de HyperLogLog: E = alpha_m * m^2 / sum(2^-M[j]). Para cardinalidades
+            pequeñas (E <= 2.5 m con registros vacíos) se usa el conteo lineal m * ln(m / V).
+            Con un hash de 64 bits no se requiere la corrección de rango alto.
+        """
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimacion = alpha * self.m * self.m / float(np.sum(np.ldexp(1.0, -self.registros.astype(np.int32))))
+        vacios = int(np.count_nonzero(self.registros == 0))
+        if estimacion <= 2.5 * self.m and vacios > 0:
+            return self.m * math.log(self.m / vacios)
+        return estimacion
+
+    def error_relativo(self, confianza: float = 0.95) -> float:
+        """ Cota de error relativo: z * 1.04 / sqrt(m) (z = 1.96 para 95 %). """
+        z = {0.68: 1.0, 0.95: 1.96, 0.99: 2.576}.get(confianza, 1.96)
+        return z * 1.04 / math.sqrt(self.m)
+
+    def a_bytes(self) -> bytes:
+        return self.registros.tobytes()
+
+    @classmethod
+    def desde_bytes(cls, datos) -> "HyperLogLog":
+        """ Reconstruye el sketch desde sus registros; la precisión se deduce del tamaño. """
+        if not datos:
+            return cls()
+        registros = np.frombuffer(bytes(datos), dtype=np.uint8).copy()
+        p = len(registros).bit_length() - 1
+        if len(registros) != 1 << p:
+            raise ValueError(f"Tamaño de HyperLogLog inválido: {len(registros)} bytes")
+        return cls(p=p, registros=registros)
+
 
 @dataclass
 class RunningStats:
@@ -15,24 +149,44 @@ class RunningStats:
                 Valor mínimo registrado.
             max : float
                 Valor máximo registrado.
+            m2 : float
+                Suma de los cuadrados de las desviaciones respecto a la media
+                (M2 = sum((x - mean)^2)), de la que se obtienen varianza y desviación estándar.
+            mean_c : float
+                Compensación (suma de Neumaier) de los incrementos de la media.
+            m2_c : float
+                Compensación (suma de Neumaier) de los incrementos de M2.
+            usuarios : HyperLogLog
+                Sketch de los user_id distintos.
 
         Metodos:
         --------
             update_one(price: float)
-                Actualiza las estadísticas agregando un único valor de price.
+                Actualiza las estadísticas agregando un único valor de price (Welford).
 
-            merge_batch(cnt: int, mean: float, mn: float, mx: float)
+            merge_batch(cnt: int, mean: float, mn: float, mx: float, m2: float)
                 Combina un resumen de batch con las estadísticas actuales sin recorrer el 
-                historial completo.
+                historial completo (fusión en paralelo de Chan).
+
+            merge(otro: RunningStats)
+                Fusiona otras estadísticas completas, incluido el sketch de usuarios.
+
+            varianza / desviacion
+                Varianza y desviación estándar muestrales (n - 1), None con menos de 2 valores.
     """
     count: int = 0
     mean: float = 0.0
     min: float = float("inf")
     max: float = float("-inf")
+    m2: float = 0.0
+    mean_c: float = 0.0
+    m2_c: float = 0.0
+    usuarios: HyperLogLog = field(default_factory=HyperLogLog, repr=False, compare=False)
 
     def update_one(self, price: float):
         """
-            Actualiza las estadísticas realizadas con un único valor.
+            Actualiza las estadísticas realizadas con un único valor, con el algoritmo
+            de Welford.
 
             Args:
             -----
@@ -48,33 +202,45 @@ class RunningStats:
                         mean' = mean + (price - mean) / n'
                     Donde mean es la media, price es el precio, n' es el contador actualizado 
 
+                - m2 (suma de cuadrados de las desviaciones) dado por la formula:
+                        m2' = m2 + (price - mean) * (price - mean')
+                    Los incrementos de mean y m2 se suman con compensación (mean_c, m2_c)
+                    para no perder los bits bajos cuando el incremento es muy pequeño
+                    frente al acumulado.
+
                 - min : Se actualiza si price es un numero menor al que se tenia registro
                 - max : Se actualiza si price es un numero mayor al que se tenia registrado
         """
         # Actualizamos el contador basados en que: n' = n + 1
         n1 = self.count + 1
         # Actualizamos la media basados en la formula: mean' = mean + (price - mean) / n'
-        new_mean = self.mean + (price - self.mean) / n1
+        media = self.mean + self.mean_c
+        delta = price - media
+        self.mean, self.mean_c = suma_compensada(self.mean, self.mean_c, delta / n1)
+        # m2' = m2 + (price - mean) * (price - mean')
+        self.m2, self.m2_c = suma_compensada(self.m2, self.m2_c, delta * (price - (self.mean + self.mean_c)))
         self.count = n1
-        self.mean = new_mean
         if price < self.min:
             self.min = price
         if price > self.max:
             self.max = price
 
-    def merge_batch(self, cnt: int, mean: float, min: float, max: float):
+    def merge_batch(self, cnt: int, mean: float, mn: float, mx: float, m2: float = 0.0):
         """
-        Combina un batch de estadísticas con las estadísticas globales actuales.
-        Para esta parte se tiene en cuenta la ponderacion de elementos, es decir, que se basa
-        en la formula:
-            
+        Combina un batch de estadísticas con las estadísticas globales actuales, con la
+        fusión en paralelo de Chan et al. En lugar de ponderar las medias,
+
             m = (m1*n1 + m2*n2)/(n1+n2)
-        
-        Donde m seria la nueva media, m1 seria la media registrada anteriormente, n1 el conteo 
-        registrado anteriormente, m2 la media otorgada en el batch, n2 el numero de elementos en 
-        el batch. De manera que obtendriamos:
 
-            combined_mean = (self.mean * self.count + mean * cnt) / (self.count + cnt)
+        que a partir de miles de millones de filas pierde precisión al multiplicar y dividir
+        por conteos grandes, se suma a la media actual la corrección ponderada por el batch:
+
+            delta = mean_b - mean
+            mean' = mean + delta * n_b / (n + n_b)
+            m2'   = m2 + m2_b + delta^2 * n * n_b / (n + n_b)
+
+        Donde n y mean son el conteo y la media registrados, n_b, mean_b y m2_b los del batch.
+        Los incrementos se suman con compensación (mean_c, m2_c).
 
         Args:
         -----
@@ -82,29 +248,203 @@ class RunningStats:
                 Número de elementos en el batch.
             mean : float
                 Media de los valores en el batch.
-            min : float
+            mn : float
                 Valor mínimo del batch.
-            max : float
+            mx : float
                 Valor máximo del batch.
+            m2 : float
+                Suma de cuadrados de las desviaciones del batch respecto a su media
+                (0.0 si solo se conoce el resumen count/mean/min/max).
         
         Notes:
         ------
-            - Se combina la media por ponderación usando count (contador general) 
-                y cnt que es el numeor de elementos a ingresar.
             - No se recorren los valores individuales del batch.
             - Si cnt es 0, no se realiza ninguna actualización, esto para prevenir 
                 los chunks que toman dataframes vacios.
         """
         if cnt == 0:
             return
-        # Establecemos n1 + n2 (denominador de la formula) 
+        # Establecemos n + n_b (denominador de la formula)
         total = self.count + cnt
-        if total == 0:
-            return
-        # Nos basamos en la formula para combinar medias por pesos: m = (m1*n1 + m2*n2)/(n1+n2)
-        # Para no tener errores en la ejecución, devolvemos 0.0 si n1 + n2 es igual a 0.
-        combined_mean = (self.mean * self.count + mean * cnt) / total if total > 0 else 0.0 
-        self.mean = combined_mean
+        media = self.mean + self.mean_c
+        delta = mean - media
+        self.mean, self.mean_c = suma_compensada(self.mean, self.mean_c, delta * cnt / total)
+        self.m2, self.m2_c = suma_compensada(self.m2, self.m2_c, m2 + delta * delta * self.count * cnt / total)
         self.count = total
-        self.min = min(self.min, min)
-        self.max = max(self.max, max)
\ No newline at end of file
+        self.min = min(self.min, mn)
+        self.max = max(self.max, mx)
+
+    def merge(self, otro: "RunningStats"):
+        """ Fusiona otro `RunningStats` (p. ej. el de otro archivo o proceso) con este. """
+        self.merge_batch(otro.count, otro.mean + otro.mean_c, otro.min, otro.max, otro.m2 + otro.m2_c)
+        self.usuarios.merge(otro.usuarios)
+
+    @property
+    def varianza(self):
+        """ Varianza muestral: M2 / (n - 1). """
+        if self.count < 2:
+            return None
+        return max(self.m2 + self.m2_c, 0.0) / (self.count - 1)
+
+    @property
+    def desviacion(self):
+        """ Desviación estándar muestral. """
+        varianza = self.varianza
+        return None if varianza is None else math.sqrt(varianza)
+
+@dataclass
+class WindowedStats:
+    """
+        Estadísticas por ventana de tiempo (últimos N minutos / horas / días) sobre 'ts',
+        como complemento de `RunningStats`, que solo conoce el acumulado histórico.
+
+        Es un buffer circular de 'n_buckets' resúmenes (count, sum, min, max), uno por
+        intervalo de 'bucket_s' segundos: el bucket con índice b = epoch(ts) // bucket_s
+        ocupa el slot b % n_buckets. Cuando llega un bucket más nuevo que ocupa el mismo
+        slot, el anterior se descarta, de modo que se retienen los últimos
+        n_buckets * bucket_s segundos. Las ventanas se cuentan hacia atrás desde el bucket
+        más reciente cargado (tiempo del evento, no la hora actual) y se responden sumando
+        a lo sumo n_buckets resúmenes, sin recorrer 'events'.
+
+            Attributes:
+            -----------
+            bucket_s : int
+                Segundos de cada bucket (resolución de las ventanas).
+            n_buckets : int
+                Número de buckets retenidos.
+            ultimo : int
+                Índice del bucket más reciente (-1 si no hay datos).
+
+        Metodos:
+        --------
+            update_batch(ts: pd.Series, precios: pd.Series)
+                Agrega un lote de valores, resumido por bucket.
+
+            agregar(bucket: int, count: int, sum_: float, min_: float, max_: float) -> bool
+                Fusiona el resumen de un bucket en su slot.
+
+            resumen(segundos: int) -> dict
+                Conteo, media, mínimo y máximo de la ventana de los últimos `segundos`.
+
+            filas(solo_sucias: bool) -> list
+                Slots en formato (slot, bucket, count, sum, min, max) para persistir.
+    """
+    bucket_s: int = 3600
+    n_buckets: int = 720
+    ultimo: int = -1
+    buckets: List[int] = field(default=None, repr=False)
+    counts: List[int] = field(default=None, repr=False)
+    sums: List[float] = field(default=None, repr=False)
+    mins: List[float] = field(default=None, repr=False)
+    maxs: List[float] = field(default=None, repr=False)
+    sucios: set = field(default_factory=set, repr=False)
+
+    def __post_init__(self):
+        if self.buckets is None:
+            self.buckets = [-1] * self.n_buckets
+            self.counts = [0] * self.n_buckets
+            self.sums = [0.0] * self.n_buckets
+            self.mins = [float("inf")] * self.n_buckets
+            self.maxs = [float("-inf")] * self.n_buckets
+
+    @classmethod
+    def desde_filas(cls, filas, bucket_s: int = 3600, n_buckets: int = 720) -> "WindowedStats":
+        """ Reconstruye el buffer desde las filas persistidas (slot, bucket, count, sum, min, max). """
+        ws = cls(bucket_s=bucket_s, n_buckets=n_buckets)
+        # De menor a mayor bucket: si 'n_buckets' cambió, los buckets nuevos desplazan a los viejos
+        for _, bucket, count, sum_, min_, max_ in sorted(filas, key=lambda f: f[1]):
+            ws.agregar(bucket, count, sum_, min_, max_)
+        ws.sucios.clear()
+        return ws
+
+    def agregar(self, bucket: int, count: int, sum_: float, min_: float, max_: float) -> bool:
+        """
+            Fusiona el resumen de un bucket en su slot. Devuelve False si el bucket es más
+            antiguo que la retención (queda fuera del buffer y se descarta).
+        """
+        if count == 0 or (self.ultimo >= 0 and bucket <= self.ultimo - self.n_buckets):
+            return False
+        slot = bucket % self.n_buckets
+        if self.buckets[slot] != bucket:
+            # El slot guardaba un bucket que ya salió de la retención: se reinicia
+            self.buckets[slot] = bucket
+            self.counts[slot] = 0
+            self.sums[slot] = 0.0
+            self.mins[slot] = float("inf")
+            self.maxs[slot] = float("-inf")
+        self.counts[slot] += int(count)
+        self.sums[slot] += float(sum_)
+        self.mins[slot] = min(self.mins[slot], float(min_))
+        self.maxs[slot] = max(self.maxs[slot], float(max_))
+        self.ultimo = max(self.ultimo, bucket)
+        self.sucios.add(slot)
+        return True
+
+    def update_batch(self, ts: "pd.Series", precios: "pd.Series"):
+        """
+            Agrega un lote de valores: se resume por bucket con un groupby y se fusiona un
+            resumen por bucket (no una actualización por fila).
+
+            Args:
+            -----
+                ts : pd.Series
+                    Fechas (con zona horaria UTC) de cada valor.
+                precios : pd.Series
+                    Valores, alineados con `ts`.
+        """
+        # Import diferido: print-stats usa este módulo sin necesitar pandas
+        import pandas as pd
+
+        if len(precios) == 0:
+            return
+        # Índice de bucket desde el origen de epoch: bucket = (ts - 1970-01-01) // bucket_s
+        bucket = (ts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=self.bucket_s)
+        resumen = precios.astype(float).groupby(bucket.to_numpy()).agg(["count", "sum", "min", "max"])
+        for b, count, sum_, min_, max_ in resumen.itertuples(name=None):
+            self.agregar(int(b), count, sum_, min_, max_)
+
+    def resumen(self, segundos: int) -> Dict[str, object]:
+        """
+            Conteo, media, mínimo y máximo de los últimos `segundos` (redondeados a buckets
+            completos) hasta el bucket más reciente.
+
+            Raises:
+                ValueError: Si la ventana es mayor que la retención del buffer.
+        """
+        k = max(1, math.ceil(segundos / self.bucket_s))
+        if k > self.n_buckets:
+            raise ValueError(
+                f"La ventana ({segundos}s) supera la retención de {self.n_buckets * self.bucket_s}s "
+                f"({self.n_buckets} buckets de {self.bucket_s}s)."
+            )
+        count, sum_, mn, mx = 0, 0.0, float("inf"), float("-inf")
+        for slot in range(self.n_buckets):
+            if self.ultimo - k < self.buckets[slot] <= self.ultimo:
+                count += self.counts[slot]
+                sum_ += self.sums[slot]
+                mn = min(mn, self.mins[slot])
+                mx = max(mx, self.maxs[slot])
+        desde = hasta = None
+        if self.ultimo >= 0:
+            desde = datetime.fromtimestamp((self.ultimo - k + 1) * self.bucket_s, tz=timezone.utc)
+            hasta = datetime.fromtimestamp((self.ultimo + 1) * self.bucket_s, tz=timezone.utc)
+        return {
+            "count": count,
+            "mean": sum_ / count if count else None,
+            "min": mn if count else None,
+            "max": mx if count else None,
+            "desde": desde,
+            "hasta": hasta,
+        }
+
+    def filas(self, solo_sucias: bool = True) -> List[Tuple[int, int, int, float, float, float]]:
+        """ Slots ocupados (o solo los modificados desde `limpiar`) como filas para persistir. """
+        slots = sorted(self.sucios) if solo_sucias else [s for s in range(self.n_buckets) if self.buckets[s] >= 0]
+        return [
+            (s, self.buckets[s], self.counts[s], self.sums[s], self.mins[s], self.maxs[s])
+            for s in slots
+        ]
+
+    def limpiar(self):
+        """ Marca todos los slots como persistidos. """
+        self.sucios.clear()
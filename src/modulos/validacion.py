@@ -0,0 +1,149 @@
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+# Motivos de rechazo. Cada regla ocupa un bit del código de la fila (bit i → MOTIVOS[i])
+MOTIVOS = (
+    "ts vacío o inválido",
+    "price vacío o no numérico",
+    "user_id vacío o no entero",
+    "ts fuera de rango",
+    "price fuera de rango",
+    "user_id fuera de rango",
+    "user_id no permitido",
+)
+
+
+class Validador:
+    """
+        Validación declarativa de las filas de un chunk, configurada en la sección
+        'VALIDACION'. Todas las reglas se evalúan como máscaras vectorizadas sobre columnas
+        completas, en una sola pasada, y cada fila recibe un código con un bit por regla
+        incumplida; las filas rechazadas se separan con su motivo en lugar de descartarse
+        en silencio o de abortar el archivo.
+
+        Reglas (las de tipo siempre aplican; las de rango solo si se configuran):
+            - ts: fecha válida (ya convertida con `limpieza_df.cambiar_tipo_fecha`) dentro de
+              ['desde', 'hasta').
+            - price: numérico, dentro de ['min', 'max'].
+            - user_id: entero, dentro de ['min', 'max'] y, si se indica, en 'permitidos'.
+
+        Metodos:
+        --------
+            evaluar(df: pd.DataFrame)
+                Código de rechazo por fila (0 = válida) y columnas numéricas convertidas.
+
+            separar(df: pd.DataFrame, crudo: pd.DataFrame)
+                Divide el chunk en filas válidas (con tipos) y rechazadas (con su motivo).
+
+            motivos(codigos: np.ndarray)
+                Texto del motivo de cada código.
+    """
+    def __init__(self, config: Dict[str, Any]):
+        """
+            Args:
+                config (dict): Configuración general; las reglas se leen de
+                    'VALIDACION.reglas' (sin esa sección solo se validan los tipos).
+        """
+        reglas = (config.get('VALIDACION') or {}).get("reglas") or {}
+        ts = reglas.get("ts") or {}
+        price = reglas.get("price") or {}
+        user_id = reglas.get("user_id") or {}
+        self.ts_desde = pd.Timestamp(ts["desde"], tz="UTC") if ts.get("desde") else None
+        self.ts_hasta = pd.Timestamp(ts["hasta"], tz="UTC") if ts.get("hasta") else None
+        self.price_min = price.get("min")
+        self.price_max = price.get("max")
+        self.user_min = user_id.get("min")
+        self.user_max = user_id.get("max")
+        permitidos = user_id.get("permitidos")
+        self.permitidos = np.unique(np.asarray(permitidos, dtype=np.int64)) if permitidos else None
+
+    def evaluar(self, df: pd.DataFrame):
+        """
+            Evalúa todas las reglas sobre el chunk.
+
+            Args:
+                df (pd.DataFrame): Chunk con 'ts' convertida a fecha y 'price' / 'user_id'
+                    sin convertir (texto o número).
+
+            Returns:
+                tuple[np.ndarray, pd.Series, pd.Series]: Código de rechazo por fila (uint8)
+                    y las columnas 'price' (float) y 'user_id' (float, entero si es válido).
+        """
+        ts = df["ts"]
+        price = pd.to_numeric(df["price"], errors="coerce").astype("float64")
+        user_id = pd.to_numeric(df["user_id"], errors="coerce").astype("float64")
+
+        ts_nulo = ts.isna().to_numpy()
+        price_nulo = ~np.isfinite(price.to_numpy())
+        uid = user_id.to_numpy()
+        user_nulo = ~np.isfinite(uid) | (np.floor(uid) != uid)
+
+        # Las comparaciones con NaN/NaT dan False: una fila inválida por tipo no suma rango
+        fuera_ts = np.zeros(len(df), dtype=bool)
+        if self.ts_desde is not None:
+            fuera_ts |= (ts < self.ts_desde).to_numpy()
+        if self.ts_hasta is not None:
+            fuera_ts |= (ts >= self.ts_hasta).to_numpy()
+        fuera_price = np.zeros(len(df), dtype=bool)
+        if self.price_min is not None:
+            fuera_price |= price.to_numpy() < self.price_min
+        if self.price_max is not None:
+            fuera_price |= price.to_numpy() > self.price_max
+        fuera_user = np.zeros(len(df), dtype=bool)
+        if self.user_min is not None:
+            fuera_user |= uid < self.user_min
+        if self.user_max is not None:
+            fuera_user |= uid > self.user_max
+        no_permitido = np.zeros(len(df), dtype=bool)
+        if self.permitidos is not None:
+            no_permitido = ~user_nulo & ~np.isin(uid, self.permitidos)
+
+        codigos = np.zeros(len(df), dtype=np.uint8)
+        for bit, mascara in enumerate((ts_nulo, price_nulo, user_nulo, fuera_ts, fuera_price, fuera_user, no_permitido)):
+            codigos |= mascara.astype(np.uint8) << bit
+        return codigos, price, user_id
+
+    @staticmethod
+    def motivos(codigos: np.ndarray) -> np.ndarray:
+        """ Texto del motivo de cada código ('; ' entre reglas), resuelto una vez por código distinto. """
+        unicos, inverso = np.unique(codigos, return_inverse=True)
+        textos = np.array(
+            ["; ".join(m for bit, m in enumerate(MOTIVOS) if int(c) >> bit & 1) for c in unicos],
+            dtype=object,
+        )
+        return textos[inverso]
+
+    def separar(self, df: pd.DataFrame, crudo: pd.DataFrame = None):
+        """
+            Divide el chunk en filas válidas y rechazadas.
+
+            Args:
+                df (pd.DataFrame): Chunk con 'ts' convertida (ver `evaluar`).
+                crudo (pd.DataFrame, opcional): Chunk tal como se leyó, en el mismo orden; de
+                    él se toman los valores originales de las filas rechazadas.
+
+            Returns:
+                tuple[pd.DataFrame, pd.DataFrame]:
+                    - Filas válidas con 'price' float y 'user_id' int64.
+                    - Filas rechazadas: 'user_id', 'price', 'ts' como texto original (o None)
+                      y 'motivo'.
+        """
+        codigos, price, user_id = self.evaluar(df)
+        validas = codigos == 0
+        if validas.all():
+            return df.assign(price=price, user_id=user_id.astype("int64")), pd.DataFrame(columns=["user_id", "price", "ts", "motivo"])
+
+        limpio = df[validas].assign(price=price[validas], user_id=user_id[validas].astype("int64"))
+        origen = (df if crudo is None else crudo)[~validas].rename(columns={"timestamp": "ts"})
+        rechazadas = pd.DataFrame({
+            col: [None if pd.isna(v) else str(v) for v in origen[col]] for col in ("user_id", "price", "ts")
+        }, index=origen.index)
+        rechazadas["motivo"] = self.motivos(codigos[~validas])
+        logger.info(f"Validación: {len(rechazadas)} de {len(df)} filas rechazadas.")
+        return limpio, rechazadas
@@ -1,10 +1,13 @@
+import json
 import click
+from datetime import timezone
 from pathlib import Path
 from config.load_config import cargar_config
+from config.logging_utils import get_logger
 
-from src.modulos.db import init_db, fetch_db_stats, get_running_stats, db_query
-from src.modulos.ingesta import ingest_file, iter_csv_files
-from src.submodulos.llm import VectorStoreLLM
+# Cada comando importa sus módulos al ejecutarse (import diferido): así `print-stats` o
+# `initdb` no cargan pandas, langchain ni Chroma, que solo necesitan `load` y `llm`.
+logger = get_logger()
 
 
 @click.group()
@@ -24,55 +27,165 @@ def initdb(ctx):
     """
         Crea tablas y la fila inicial de la tabla 'running_stats'.
     """
+    from src.modulos.db import init_db
     # Esta función trabaja con la ruta al archivo schema.slq que se describe en el archivo config.yaml
     config = ctx.obj["config"]
     init_db(config)
     click.echo("DB inicializada.")
 
 
+def _tamano_memoria(ctx, param, valor):
+    """ Convierte un tamaño de memoria de la CLI ('512M', '2G') a bytes. """
+    if valor is None:
+        return None
+    from src.modulos.memoria import parse_tamano
+    try:
+        return parse_tamano(valor)
+    except ValueError:
+        raise click.BadParameter("use un entero positivo con sufijo K, M o G opcional (p. ej. 512M, 2G).")
+
 @cli.command()
 @click.option("--mode", type=click.Choice(["row", "chunk"]), default="row", show_default=True)
 @click.option("--chunksize", type=int, default=1, show_default=True, help="Tamaño de procesamiento del CSV, default = 1, por row")
 @click.option("--include-validation", is_flag=True, help="Ingresa también validation.csv")
 @click.option("--single", type=str, default=None, help="Procesa solo un archivo por nombre (opcional)")
+@click.option("--follow", is_flag=True, help="Sigue el directorio: carga archivos nuevos y filas agregadas en micro-lotes hasta Ctrl+C")
+@click.option("--poll", is_flag=True, help="Con --follow, revisa el directorio por polling en lugar de notificaciones del sistema")
+@click.option("--worker", is_flag=True, help="Reparte los archivos con otros procesos a través de la cola 'cola_archivos'")
+@click.option("--worker-id", type=str, default=None, help="Identificador del worker (por defecto host:pid)")
+@click.option("--coalesce", is_flag=True, help="Agrupa archivos pequeños en lotes: una inserción y una actualización de stats por lote")
+@click.option("--batch-rows", type=click.IntRange(min=1), default=None, help="Con --coalesce, filas por lote (por defecto CSV.coalesce.filas_lote)")
+@click.option("--max-memory", default=None, callback=_tamano_memoria, help="Presupuesto de memoria de la carga (p. ej. 512M, 2G); ajusta el tamaño de los chunks")
 @click.pass_context
-def load(ctx, mode, include_validation, single, chunksize):
+def load(ctx, mode, include_validation, single, chunksize, follow, poll, worker, worker_id, coalesce, batch_rows, max_memory):
     """
         Carga los archivos CSV (y opcionalmente validation.csv); 
         tambien puede cargar el archivo CSV individualmente si se le indica.  
         Todo lo hace con estadísticas en ejecución.
     """
+    # Los modos son excluyentes y cada opción propia de un modo lo requiere
+    modos = [nombre for nombre, activo in (("--worker", worker), ("--follow", follow), ("--single", single), ("--coalesce", coalesce)) if activo]
+    if len(modos) > 1:
+        raise click.UsageError(f"{' y '.join(modos)} no se pueden combinar: use uno solo.")
+    for opcion, valor, modo, activo in (
+        ("--worker-id", worker_id, "--worker", worker),
+        ("--poll", poll, "--follow", follow),
+        ("--batch-rows", batch_rows, "--coalesce", coalesce),
+    ):
+        if valor and not activo:
+            raise click.UsageError(f"{opcion} solo aplica con {modo}.")
+
+    from src.modulos.ingesta import ingest_file, iter_csv_files, ingest_files_coalesced
+    from src.modulos.db import validar_sql
     # Esta es la funcion principal del pipeline, en donde ejecuta el proceso de ingesta y realiza las estadisticas 
     config = ctx.obj["config"]
+    if max_memory is not None:
+        config['CSV']['max_memoria'] = max_memory
+    # Las queries de inserción y estadísticas se preparan (y validan) antes de leer archivos
+    try:
+        validar_sql(config)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if worker:
+        # Varios `load --worker` (en cualquier host con el mismo CSV_DIR) se reparten los archivos
+        from src.modulos.cola import WorkerCola
+        WorkerCola(config, mode, chunksize, include_validation, worker_id).ejecutar()
+        return
+    if follow:
+        # Modo continuo: los offsets por archivo quedan en CSV.follow.estado
+        from src.modulos.seguimiento import Seguidor
+        Seguidor(config, mode, chunksize, include_validation, forzar_polling=poll).ejecutar()
+        return
     if single:
         path_ = Path(config['CSV'].get("CSV_DIR")) / single
         ingest_file(path_, mode, chunksize, config)
         return
+    if coalesce:
+        # Lotes de varios archivos; la procedencia por archivo queda en 'archivos_cargados'
+        ingest_files_coalesced(iter_csv_files(config, include_validation), mode, config, batch_rows)
+        return
     for path_ in iter_csv_files(config, include_validation):
         ingest_file(path_, mode, chunksize, config)
 
 @cli.command()
 @click.pass_context
-def print_stats(ctx):
+def queue_status(ctx):
+    """
+        Muestra el estado de la cola de archivos de `load --worker`.
+    """
+    from src.modulos.db import resumen_cola
+    config = ctx.obj["config"]
+    for estado, archivos, filas in resumen_cola(config):
+        click.echo(f"{estado:>12}: {archivos} archivos, {filas} filas")
+
+UNIDADES_DURACION = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def _duracion(ctx, param, valor):
+    """ Convierte una duración de la CLI ('90m', '12h', '1d') a segundos. """
+    if valor is None:
+        return None
+    texto = valor.strip().lower()
+    if len(texto) < 2 or texto[-1] not in UNIDADES_DURACION or not texto[:-1].isdigit() or int(texto[:-1]) == 0:
+        raise click.BadParameter("use un entero positivo seguido de s, m, h o d (p. ej. 90m, 12h, 1d).")
+    return int(texto[:-1]) * UNIDADES_DURACION[texto[-1]]
+
+@cli.command()
+@click.option("--window", "ventana", default=None, callback=_duracion, help="Ventana de tiempo hasta el último 'ts' cargado (p. ej. 90m, 12h, 1d, 7d)")
+@click.pass_context
+def print_stats(ctx, ventana):
     """
         Imprime las estadísticas en ejecución almacenadas.
     """
+    from src.modulos.db import get_running_stats
+    from src.modulos.stats import HyperLogLog
     # Funcion para imprimir todas las estadisticas almacenadas en la ejecucion 
     config = ctx.obj["config"]
-    rs = get_running_stats(config)
+    # Consulta de solo lectura: puede ir a la réplica de 'SQL.lectura'
+    rs = get_running_stats(config, lectura=True)
+    desviacion = f"{rs['stddev']:.2f}" if rs['stddev'] is not None else "nan"
+    click.echo(
+    f"RunningStats → Conteo={rs['count']} Promedio: {rs['mean']:.2f} Minimo={rs['min']:.2f} Maximo={rs['max']:.2f} Desv. estándar={desviacion} Actualizado en: {rs['updated_at']}"
+    )
+    # Usuarios distintos estimados con el sketch HyperLogLog (sin COUNT(DISTINCT) sobre 'events')
+    usuarios = HyperLogLog.desde_bytes(rs['hll'])
+    estimacion = usuarios.estimar()
+    error = usuarios.error_relativo(0.95)
     click.echo(
-    f"RunningStats → Conteo={rs['count']} Promedio: {rs['mean']:.2f} Minimo={rs['min']:.2f} Maximo={rs['max']:.2f} Actualizado en: {rs['updated_at']}"
+    f"Usuarios distintos ≈ {estimacion:,.0f} (± {error * 100:.1f}% / ±{estimacion * error:,.0f} con 95% de confianza; HyperLogLog de {usuarios.m} registros)"
     )
+    if ventana is not None:
+        # Se suman los resúmenes por bucket de 'running_stats_ventana', sin recorrer 'events'
+        from src.modulos.ingesta import load_windowed_stats_from_db
+        try:
+            ws = load_windowed_stats_from_db(config, lectura=True).resumen(ventana)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--window'")
+        if ws["count"] == 0:
+            click.echo("Ventana → sin datos.")
+        else:
+            click.echo(
+            f"Ventana [{ws['desde']} → {ws['hasta']}) → Conteo={ws['count']} Promedio: {ws['mean']:.2f} Minimo={ws['min']:.2f} Maximo={ws['max']:.2f}"
+            )
+
+def _utc(fecha):
+    """ Las fechas de la CLI se interpretan en UTC, igual que los 'ts' cargados. """
+    return fecha.replace(tzinfo=timezone.utc) if fecha is not None else None
+
+FORMATOS_FECHA = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]
 
 @cli.command()
+@click.option("--desde", type=click.DateTime(FORMATOS_FECHA), default=None, help="Fecha inicial (inclusiva, UTC) de los eventos a considerar")
+@click.option("--hasta", type=click.DateTime(FORMATOS_FECHA), default=None, help="Fecha final (exclusiva, UTC) de los eventos a considerar")
+@click.option("--exacto", is_flag=True, help="Recorre toda la tabla 'events' en lugar de leer los agregados de 'events_agg'")
 @click.pass_context
-def db_stats(ctx):
+def db_stats(ctx, desde, hasta, exacto):
     """
         Consulta en DB: count/avg/min/max calculados por SQL (para verificación).
     """
+    from src.modulos.db import fetch_db_stats
     # Esta funcion si entra en la BD y realiza la consulta indicada. 
     config = ctx.obj["config"]
-    stats = fetch_db_stats(config)
+    stats = fetch_db_stats(config, desde=_utc(desde), hasta=_utc(hasta), exacto=exacto)
 
     avg_price = f"{stats['avg_price']:.2f}" if stats['avg_price'] is not None else "nan"
     min_price = f"{stats['min_price']:.2f}" if stats['min_price'] is not None else "nan"
@@ -83,23 +196,260 @@ def db_stats(ctx):
         f"Promedio de precio: {avg_price} precio minimo: {min_price} precio maximo: {max_price}"
     )
 
+@cli.command("drop-partitions")
+@click.option("--before", "antes", type=click.DateTime(["%Y-%m"]), required=True, help="Elimina las particiones de los meses anteriores a este (YYYY-MM)")
+@click.pass_context
+def drop_partitions_cmd(ctx, antes):
+    """
+        Elimina particiones mensuales antiguas de 'events' (requiere SQL.particionado).
+    """
+    from src.modulos.db import drop_partitions
+    config = ctx.obj["config"]
+    if not config["SQL"].get("particionado"):
+        raise click.UsageError("La tabla 'events' no está particionada (SQL.particionado: False).")
+    eliminadas = drop_partitions(config, antes.date())
+    click.echo(f"Particiones eliminadas: {', '.join(eliminadas) if eliminadas else 'ninguna'}")
+
+@cli.command()
+@click.option("--output-dir", type=click.Path(file_okay=False), default=None, help="Directorio de salida (por defecto PARQUET.export_dir)")
+@click.option("--row-group-size", type=click.IntRange(min=1), default=None, help="Filas por row group (por defecto PARQUET.row_group_size)")
+@click.option("--desde", type=click.DateTime(FORMATOS_FECHA), default=None, help="Fecha inicial (inclusiva, UTC) de los eventos a exportar")
+@click.option("--hasta", type=click.DateTime(FORMATOS_FECHA), default=None, help="Fecha final (exclusiva, UTC) de los eventos a exportar")
+@click.pass_context
+def export(ctx, output_dir, row_group_size, desde, hasta):
+    """
+        Exporta la tabla 'events' a Parquet, un archivo por mes.
+    """
+    from src.modulos.exportar import exportar_parquet
+    # Lee con un cursor del lado del servidor: no carga la tabla completa en memoria
+    config = ctx.obj["config"]
+    filas = exportar_parquet(config, output_dir, row_group_size, desde=_utc(desde), hasta=_utc(hasta))
+    for mes, n in filas.items():
+        click.echo(f"   mes={mes}: {n} filas")
+    click.echo(f"Exportación terminada: {sum(filas.values())} filas en {len(filas)} archivos.")
+
 @cli.command()
 @click.option("--limit_rows", type=int, default=1000, help="limite de rows que tomara para trabajar con LLM")
+@click.option("--questions-file", type=click.Path(exists=True, dir_okay=False), default=None, help="Archivo con preguntas (una por línea) para responder en lote, sin modo interactivo")
+@click.option("--output", type=click.Path(dir_okay=False), default="respuestas.jsonl", show_default=True, help="Archivo JSONL de salida del modo por lote")
+@click.option("--workers", type=click.IntRange(min=1), default=4, show_default=True, help="Número máximo de recuperaciones y generaciones simultáneas en el modo por lote")
+@click.option("--stream", is_flag=True, help="Imprime la respuesta token a token a medida que el modelo la genera")
+@click.option("--desde", type=click.DateTime(FORMATOS_FECHA), default=None, help="Solo carga eventos desde esta fecha (inclusiva, UTC)")
+@click.option("--hasta", type=click.DateTime(FORMATOS_FECHA), default=None, help="Solo carga eventos hasta esta fecha (exclusiva, UTC)")
 @click.pass_context
-def llm(ctx, limit_rows):
+def llm(ctx, limit_rows, questions_file, output, workers, stream, desde, hasta):
     """
         Carga la info que tengas en la DB y la usa para entrenar un LLM y poder hacer preguntas
     """
+    from src.modulos.db import db_query
+    from src.modulos.preguntas import leer_preguntas, escribir_respuestas, consumir_stream
+    from src.submodulos.llm import VectorStoreLLM
+    from src.submodulos.router import QueryRouter
     # Esta funcion establece un LLM para interacion con lenguaje natural
     config = ctx.obj["config"]
-    df = db_query(config, limit_rows)
+    df = db_query(config, limit_rows, desde=_utc(desde), hasta=_utc(hasta))
     vector = VectorStoreLLM(df, config)
+    # Las preguntas de agregados se responden desde running_stats / SQL, el resto va al RAG
+    router = QueryRouter(config, rag=vector)
+
+    if questions_file:
+        # Modo por lote: responde todas las preguntas del archivo y escribe las respuestas en JSONL
+        preguntas = leer_preguntas(Path(questions_file))
+        resultados = router.responder_lote(preguntas, max_workers=workers)
+        escribir_respuestas(Path(output), resultados)
+        errores = sum(1 for r in resultados if r.get("error"))
+        click.echo(f"Se respondieron {len(resultados) - errores}/{len(resultados)} preguntas → {output}")
+        return
+
     while True:
         print("\n\n-------------------------------")
         pregunta = input("Hazme tu pregunta (q para salir): ")
         print("\n\n")
         if pregunta == "q":
             break
-        
-        respuesta = vector.get_pregunta(pregunta)
-        print(respuesta)
\ No newline at end of file
+
+        if stream:
+            # Se imprime cada token apenas llega, reduciendo la latencia percibida
+            medicion = consumir_stream(router.responder_stream(pregunta), lambda t: print(t, end="", flush=True))
+            ttft = f"{medicion['ttft_s']:.2f}s" if medicion["ttft_s"] is not None else "nan"
+            logger.info(f"Pregunta respondida en streaming: TTFT={ttft} total={medicion['latencia_s']:.2f}s")
+            print(f"\n\n[Primer token: {ttft} | Total: {medicion['latencia_s']:.2f}s]")
+            continue
+
+        respuesta = router.responder(pregunta)
+        print(respuesta)
+
+@cli.command()
+@click.option("--sizes", type=str, default="1000,5000,20000", show_default=True, help="Tamaños de colección separados por coma")
+@click.option("--queries", type=click.IntRange(min=1), default=100, show_default=True, help="Consultas por tamaño")
+@click.option("--backend", type=click.Choice(["local", "ollama"]), default="local", show_default=True, help="Backend de embeddings a medir")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Archivo JSON donde guardar los resultados (opcional)")
+@click.pass_context
+def bench_llm(ctx, sizes, queries, backend, output):
+    """
+        Benchmark de indexación y recuperación del vector store con eventos sintéticos.
+    """
+    from src.modulos.benchmark import benchmark_recuperacion
+    # Mide documentos/s indexados, latencia p50/p99 y recall@k frente a fuerza bruta por tamaño de colección
+    config = ctx.obj["config"]
+    config["llm"]["backend"] = backend
+    tamanos = [int(t) for t in sizes.split(",") if t.strip()]
+    resultados = benchmark_recuperacion(config, tamanos, consultas=queries)
+
+    click.echo(f"{'tamaño':>8} {'docs/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'recall@k':>9}")
+    for r in resultados:
+        click.echo(f"{r['tamano']:>8} {r['docs_por_s']:>10.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['recall_k']:>9.3f}")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+
+
+@cli.command()
+@click.option("--size", type=click.IntRange(min=1), default=20000, show_default=True, help="Tamaño de la colección sintética")
+@click.option("--queries", type=click.IntRange(min=1), default=100, show_default=True, help="Consultas por combinación")
+@click.option("--space", type=str, default="l2", show_default=True, help="Métricas de distancia separadas por coma (l2, cosine, ip)")
+@click.option("--M", "m", type=str, default="8,16,32", show_default=True, help="Valores de M separados por coma")
+@click.option("--ef-construction", type=str, default="50,100,200", show_default=True, help="Valores de ef_construction separados por coma")
+@click.option("--ef-search", type=str, default="10,50,100", show_default=True, help="Valores de ef_search separados por coma")
+@click.option("--backend", type=click.Choice(["local", "ollama"]), default="local", show_default=True, help="Backend de embeddings a medir")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Archivo JSON donde guardar los resultados (opcional)")
+@click.pass_context
+def bench_hnsw(ctx, size, queries, space, m, ef_construction, ef_search, backend, output):
+    """
+        Barrido de parámetros HNSW: recall@k frente a fuerza bruta y latencia de consulta.
+    """
+    from src.modulos.benchmark import barrido_hnsw
+    # Permite elegir el compromiso recall/latencia antes de fijar la seccion 'hnsw' de config.yaml
+    config = ctx.obj["config"]
+    config["llm"]["backend"] = backend
+    grilla = {
+        "space": [v.strip() for v in space.split(",") if v.strip()],
+        "M": [int(v) for v in m.split(",") if v.strip()],
+        "ef_construction": [int(v) for v in ef_construction.split(",") if v.strip()],
+        "ef_search": [int(v) for v in ef_search.split(",") if v.strip()],
+    }
+    resultados = barrido_hnsw(config, size, grilla, consultas=queries)
+
+    click.echo(f"{'space':>6} {'M':>4} {'ef_c':>5} {'ef_s':>5} {'index s':>8} {'p50 ms':>8} {'p99 ms':>8} {'recall@k':>9}")
+    for r in resultados:
+        click.echo(
+            f"{r['space']:>6} {r['M']:>4} {r['ef_construction']:>5} {r['ef_search']:>5} {r['indexacion_s']:>8.2f} "
+            f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['recall_k']:>9.3f}"
+        )
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+
+
+@cli.command()
+@click.option("--mode", type=click.Choice(["row", "chunk"]), default="chunk", show_default=True)
+@click.option("--chunksize", type=int, default=5000, show_default=True, help="Tamaño de procesamiento del CSV")
+@click.option("--include-validation", is_flag=True, help="Ingresa también validation.csv")
+@click.option("--single", type=str, default=None, help="Perfila solo la carga de un archivo por nombre (opcional)")
+@click.option("--coalesce", is_flag=True, help="Perfila la carga agrupada en lotes (ver load --coalesce)")
+@click.option("--batch-rows", type=click.IntRange(min=1), default=None, help="Con --coalesce, filas por lote")
+@click.option("--max-memory", default=None, callback=_tamano_memoria, help="Presupuesto de memoria de la carga (ver load --max-memory)")
+@click.option("--profiler", type=click.Choice(["muestreo", "determinista"]), default="muestreo", show_default=True, help="Muestreo de pilas (flamegraph) o cProfile (conteo exacto de llamadas)")
+@click.option("--interval", type=click.FloatRange(min=0.0005), default=0.005, show_default=True, help="Segundos entre muestras del perfilador de muestreo")
+@click.option("--output-dir", type=click.Path(file_okay=False), default=None, help="Directorio de los artefactos (por defecto config/logs)")
+@click.pass_context
+def profile(ctx, mode, chunksize, include_validation, single, coalesce, batch_rows, max_memory, profiler, interval, output_dir):
+    """
+        Ejecuta `load` bajo un perfilador y atribuye el tiempo a las etapas del pipeline
+        (lectura, limpieza_df, validación, db, stats); guarda el reporte y las pilas colapsadas.
+    """
+    from src.modulos.perfilado import perfilar, formatear_reporte, guardar_perfil
+    # Es la misma carga que `load` (escribe en la base de datos): conviene usar una base de pruebas
+    perfil = perfilar(
+        lambda: ctx.invoke(
+            load, mode=mode, chunksize=chunksize, include_validation=include_validation, single=single,
+            coalesce=coalesce, batch_rows=batch_rows, max_memory=max_memory,
+        ),
+        perfilador=profiler,
+        intervalo=interval,
+    )
+    rutas = guardar_perfil(perfil, output_dir)
+
+    click.echo(formatear_reporte(perfil))
+    for tipo, ruta in rutas.items():
+        click.echo(f"{tipo}: {ruta}")
+
+
+@cli.command("perf-check")
+@click.option("--baseline", type=click.Path(dir_okay=False), default=None, help="Archivo JSON de la línea base (por defecto BENCHMARK.baseline)")
+@click.option("--tolerance", type=click.FloatRange(min=0.0), default=None, help="Aumento relativo de tiempo admitido (0.3 = 30 %%); por defecto BENCHMARK.tolerancia")
+@click.option("--skip-e2e", is_flag=True, help="Solo micro-benchmarks, sin la carga de punta a punta contra la base de datos")
+@click.option("--update-baseline", is_flag=True, help="Guarda las mediciones como nueva línea base en lugar de comparar")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Archivo JSON donde guardar la comparación (opcional)")
+@click.pass_context
+def perf_check(ctx, baseline, tolerance, skip_e2e, update_baseline, output):
+    """
+        Benchmarks de la carga (lectura, limpieza_df, validación, RunningStats y carga de punta
+        a punta) comparados con la línea base versionada; falla si alguna métrica empeora.
+        Las métricas se comparan en múltiplos de una carga de calibración medida en la misma
+        corrida, no en segundos: así la línea base sirve en máquinas más o menos rápidas.
+    """
+    from src.modulos.benchmark import (
+        parametros_rendimiento, medir_calibracion, benchmark_componentes, benchmark_carga, relativas,
+        guardar_linea_base, cargar_linea_base, comparar_con_linea_base, entorno, configuracion_carga,
+    )
+    # La carga de punta a punta usa un esquema desechable de la base de datos configurada
+    config = ctx.obj["config"]
+    cfg = config.get('BENCHMARK') or {}
+    baseline = Path(baseline or cfg.get("baseline", "./config/perf_baseline.json"))
+    parametros = parametros_rendimiento(config)
+
+    base = None
+    if not update_baseline:
+        # La línea base se valida antes de medir: si no es comparable no se pierde la medición
+        try:
+            base = cargar_linea_base(baseline, parametros)
+        except FileNotFoundError:
+            raise click.ClickException(f"No existe la línea base {baseline}: créela con `perf-check --update-baseline`.")
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+    metricas = medir_calibracion(parametros)
+    metricas.update(benchmark_componentes(config, parametros))
+    if not skip_e2e:
+        metricas.update(benchmark_carga(config, parametros))
+
+    if update_baseline:
+        guardar_linea_base(baseline, metricas, parametros, configuracion_carga(config))
+        for nombre, segundos in sorted(metricas.items()):
+            click.echo(f"{nombre:<26} {segundos:>10.4f}s")
+        click.echo(f"Línea base guardada en {baseline}")
+        return
+
+    if base.get("entorno") != entorno():
+        # La calibración compensa la velocidad de la máquina, no las versiones de las librerías
+        click.echo(f"Aviso: la línea base se midió en otro entorno ({base.get('entorno')}).")
+    if base.get("configuracion") != configuracion_carga(config):
+        click.echo(f"Aviso: la línea base se midió con otra configuración de la carga ({base.get('configuracion')}).")
+    calibracion = {"base": base["metricas"]["calibracion"], "actual": metricas["calibracion"]}
+    click.echo(
+        f"Calibración: base {calibracion['base']:.4f}s, actual {calibracion['actual']:.4f}s "
+        f"(velocidad relativa a la máquina de la línea base: {calibracion['base'] / calibracion['actual']:.2f}x)"
+    )
+    tolerancia = tolerance if tolerance is not None else cfg.get("tolerancia", 0.3)
+    resultados = comparar_con_linea_base(relativas(metricas), relativas(base["metricas"]), tolerancia, cfg.get("tolerancias"))
+
+    click.echo(f"{'métrica':<26} {'base x':>10} {'actual x':>10} {'delta':>8} {'tol.':>6}  estado")
+    for r in resultados:
+        base_x = f"{r['base']:.3f}" if r["base"] is not None else "-"
+        actual_x = f"{r['actual']:.3f}" if r["actual"] is not None else "-"
+        delta = f"{r['delta']:+.1%}" if r["delta"] is not None else "-"
+        click.echo(f"{r['metrica']:<26} {base_x:>10} {actual_x:>10} {delta:>8} {r['tolerancia']:>6.0%}  {r['estado'].upper()}")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"linea_base": str(baseline), "calibracion": calibracion, "resultados": resultados}, f, indent=2, ensure_ascii=False)
+
+    regresiones = [r["metrica"] for r in resultados if r["estado"] == "regresion"]
+    if regresiones:
+        logger.warning(f"perf-check: regresión de rendimiento en {', '.join(regresiones)}")
+        raise click.ClickException(f"Regresión de rendimiento en: {', '.join(regresiones)}")
+    logger.info("perf-check: sin regresiones de rendimiento")
+    click.echo("PASS: ninguna métrica supera su tolerancia.")
@@ -0,0 +1,143 @@
+import re
+import zlib
+import math
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+BACKENDS = ("ollama", "local")
+
+
+class HashEmbeddings(Embeddings):
+    """
+        Embeddings locales y deterministas basados en n-gramas de caracteres con hashing.
+
+        Cada texto se normaliza (minúsculas, espacios simples), se parte en n-gramas de
+        caracteres y en palabras, y cada rasgo se proyecta a una posición del vector con
+        CRC32 (con signo según otro bit del hash). El vector resultante se normaliza (L2),
+        por lo que la distancia euclidiana ordena igual que la similitud coseno.
+
+        No requiere servidor ni descarga de modelos: sirve para pruebas y benchmarks de
+        indexación/recuperación, no para calidad semántica.
+
+        Metodos:
+        --------
+            embed_documents(texts: list) -> list
+                Devuelve el embedding de cada texto.
+
+            embed_query(text: str) -> list
+                Devuelve el embedding de una consulta.
+    """
+    def __init__(self, dimension: int = 256, ngram: int = 3):
+        if dimension < 1 or ngram < 1:
+            raise ValueError("dimension y ngram deben ser enteros positivos")
+        self.dimension = dimension
+        self.ngram = ngram
+
+    def _rasgos(self, texto: str) -> List[str]:
+        texto = " ".join(texto.lower().split())
+        relleno = f" {texto} "
+        ngramas = [relleno[i:i + self.ngram] for i in range(max(len(relleno) - self.ngram + 1, 1))]
+        palabras = [f"w:{p}" for p in re.findall(r"\w+", texto)]
+        return ngramas + palabras
+
+    def _embed(self, texto: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for rasgo in self._rasgos(texto):
+            h = zlib.crc32(rasgo.encode("utf-8"))
+            vector[h % self.dimension] += 1.0 if (h >> 31) & 1 else -1.0
+        norma = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norma for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class EchoLLM(LLM):
+    """
+        Modelo de lenguaje local y determinista: responde aplicando una plantilla al prompt
+        recibido (por defecto repite la pregunta y el número de líneas de contexto).
+        Soporta invoke, batch, ainvoke y stream como cualquier LLM de langchain.
+    """
+    plantilla: str = "Respuesta local ({lineas} líneas de contexto): {pregunta}"
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo-local"
+
+    def _responder(self, prompt: str) -> str:
+        lineas = [l for l in prompt.splitlines() if l.strip()]
+        pregunta = lineas[-1] if lineas else ""
+        return self.plantilla.format(prompt=prompt, pregunta=pregunta, lineas=len(lineas))
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        return self._responder(prompt)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        # Se entrega palabra a palabra para emular el streaming de un modelo real
+        for token in re.findall(r"\S+\s*", self._responder(prompt)):
+            chunk = GenerationChunk(text=token)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def _backend(config: Dict[str, Any]) -> str:
+    backend = config.get("backend", "ollama")
+    if backend not in BACKENDS:
+        logger.error(f"Backend de LLM no soportado: {backend}")
+        raise ValueError(f"backend debe ser uno de {BACKENDS}, se recibió '{backend}'")
+    return backend
+
+
+def crear_embeddings(config: Dict[str, Any]) -> Embeddings:
+    """
+        Crea el modelo de embeddings según el backend configurado.
+
+        Args:
+            config (dict): Sección 'llm' de la configuración, con 'backend' ("ollama" o
+                "local"), 'embedding_model' (ollama) y 'local' (dimension, ngram).
+
+        Returns:
+            Embeddings: Modelo de embeddings de langchain.
+
+        Raises:
+            ValueError: Si el backend no es soportado.
+    """
+    if _backend(config) == "local":
+        local = config.get("local") or {}
+        return HashEmbeddings(dimension=local.get("dimension", 256), ngram=local.get("ngram", 3))
+
+    # Import diferido: el backend local no requiere el cliente de Ollama
+    from langchain_ollama import OllamaEmbeddings
+    return OllamaEmbeddings(model=config.get("embedding_model"))
+
+
+def crear_llm(config: Dict[str, Any]) -> LLM:
+    """
+        Crea el modelo de lenguaje según el backend configurado.
+
+        Args:
+            config (dict): Sección 'llm' de la configuración, con 'backend' ("ollama" o
+                "local"), 'llm_model' (ollama) y 'local' (plantilla).
+
+        Returns:
+            LLM: Modelo de lenguaje de langchain.
+
+        Raises:
+            ValueError: Si el backend no es soportado.
+    """
+    if _backend(config) == "local":
+        local = config.get("local") or {}
+        return EchoLLM(plantilla=local["plantilla"]) if local.get("plantilla") else EchoLLM()
+
+    from langchain_ollama.llms import OllamaLLM
+    return OllamaLLM(model=config.get("llm_model"))
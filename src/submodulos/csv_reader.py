@@ -1,13 +1,111 @@
+import io
 import os
+import queue
+import threading
 import pandas as pd
 from typing import Any, Dict
 
 from config.logging_utils import get_logger
 logger = get_logger()
 
+# Extensión de compresión soportada → nombre del formato
+COMPRESIONES = {".gz": "gzip", ".zst": "zstd", ".bz2": "bz2"}
+
+
+def compresion_de(file_path) -> str:
+    """ Formato de compresión según la extensión del archivo ('gzip', 'zstd', 'bz2') o None. """
+    return COMPRESIONES.get(os.path.splitext(str(file_path))[1].lower())
+
+
+def abrir_descompresor(file_path, compresion: str):
+    """
+        Abre el archivo comprimido como un flujo binario que se descomprime a medida
+        que se lee, sin descomprimirlo completo en disco ni en memoria.
+
+        Args:
+            file_path (str): Ruta del archivo.
+            compresion (str): 'gzip', 'zstd' o 'bz2'.
+
+        Returns:
+            io.RawIOBase: Flujo binario con el contenido descomprimido.
+    """
+    if compresion == "gzip":
+        import gzip
+        return gzip.open(file_path, "rb")
+    if compresion == "bz2":
+        import bz2
+        return bz2.open(file_path, "rb")
+    if compresion == "zstd":
+        # Import diferido: zstandard solo se necesita para archivos .zst
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True)
+    raise ValueError(f"Compresión no soportada: {compresion}")
+
+
+class LecturaAnticipada(io.RawIOBase):
+    """
+        Flujo binario que descomprime en un hilo aparte, por bloques, mientras pandas
+        parsea los bloques anteriores. gzip, bz2 y zstd liberan el GIL al descomprimir,
+        por lo que ambas etapas avanzan en paralelo. La cola acotada limita la memoria
+        a 'bloques' x 'tamano_bloque' bytes.
+    """
+    def __init__(self, fuente, tamano_bloque: int = 1 << 20, bloques: int = 4):
+        self.fuente = fuente
+        self.tamano_bloque = tamano_bloque
+        self.cola = queue.Queue(maxsize=bloques)
+        self.pendiente = memoryview(b"")
+        self.detener = threading.Event()
+        self.hilo = threading.Thread(target=self._producir, daemon=True)
+        self.hilo.start()
+
+    def _producir(self):
+        try:
+            while not self.detener.is_set():
+                bloque = self.fuente.read(self.tamano_bloque)
+                self._poner(bloque)
+                if not bloque:
+                    return
+        except Exception as e:
+            self._poner(e)
+
+    def _poner(self, item):
+        # Espera con timeout para poder terminar si el consumidor cierra antes del final
+        while not self.detener.is_set():
+            try:
+                self.cola.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self.pendiente:
+            item = self.cola.get()
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                # Fin del archivo: se deja la marca para lecturas posteriores
+                self.cola.put(item)
+                return 0
+            self.pendiente = memoryview(item)
+        n = min(len(buffer), len(self.pendiente))
+        buffer[:n] = self.pendiente[:n]
+        self.pendiente = self.pendiente[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self.detener.set()
+            self.hilo.join()
+            self.fuente.close()
+        super().close()
+
 class CSVReader():
     """
-        Clase para la lectura de CSV con la libreria de pandas
+        Clase para la lectura de CSV con la libreria de pandas. Los archivos '.csv.gz',
+        '.csv.zst' y '.csv.bz2' se descomprimen como flujo mientras se leen por chunks.
 
         Atributos:
         -----------
@@ -20,6 +118,9 @@ class CSVReader():
             run(file_path: str, chunksize: int)
                 El metodo en el cual se realiza la lectura del dataframe de pandas, 
                 tomando los parametros de configuración del archivo otorgado
+
+            estimar_bytes_por_fila(file_path: str, filas: int)
+                Memoria por fila en pandas, a partir de las primeras filas del archivo.
     """
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config['CSV']
@@ -49,7 +150,8 @@ class CSVReader():
 
         sep = self.config.get("separadores", ",")
         usecols = self.config.get("usecols", None)
-        usar_chunk = self.config.get("usar_chunk", False)
+        # Con presupuesto de memoria ('max_memoria') nunca se lee el archivo completo
+        usar_chunk = self.config.get("usar_chunk", False) or bool(self.config.get("max_memoria"))
 
         if usar_chunk:
             chunksize = chunksize
@@ -67,15 +169,69 @@ class CSVReader():
         
         logger.info(f"Leyendo archivo CSV desde: {os.path.basename(file_path)}")
 
+        compresion = compresion_de(file_path)
+        if compresion:
+            return self._leer_comprimido(file_path, compresion, sep, usecols, chunksize if usar_chunk else None)
+
         try:
             if usar_chunk:
-                df = pd.read_csv(file_path, sep=sep, usecols=usecols, chunksize=chunksize)
+                df = pd.read_csv(file_path, sep=sep, usecols=usecols, dtype=self.config.get("dtypes"), chunksize=chunksize)
                 logger.info(f"Lectura parcial completada.")
             else:
-                df = pd.read_csv(file_path, sep=sep, usecols=usecols)
+                df = pd.read_csv(file_path, sep=sep, usecols=usecols, dtype=self.config.get("dtypes"))
                 logger.info(f"Lectura completada: {df.shape[0]} filas, {df.shape[1]} columnas")
             return df
         except Exception as e:
             logger.error(f"Fallo al leer el archivo CSV.")
             logger.exception(f"leyendo archivo CSV: {e}")
             raise RuntimeError(f"[Error] leyendo archivo CSV: {e}")
+
+    def estimar_bytes_por_fila(self, file_path: str, filas: int = 1000) -> float:
+        """
+            Memoria por fila (con strings incluidos) del DataFrame que produce la lectura,
+            medida sobre las primeras `filas` filas del archivo.
+        """
+        sep = self.config.get("separadores", ",")
+        usecols = self.config.get("usecols", None)
+        compresion = compresion_de(file_path)
+        if compresion:
+            with abrir_descompresor(file_path, compresion) as flujo:
+                df = pd.read_csv(flujo, sep=sep, usecols=usecols, dtype=self.config.get("dtypes"), nrows=filas)
+        else:
+            df = pd.read_csv(file_path, sep=sep, usecols=usecols, dtype=self.config.get("dtypes"), nrows=filas)
+        return float(df.memory_usage(deep=True).sum()) / max(len(df), 1)
+
+    def _abrir(self, file_path: str, compresion: str):
+        """ Flujo descomprimido, con lectura anticipada en otro hilo si está configurada. """
+        fuente = abrir_descompresor(file_path, compresion)
+        if not self.config.get("lectura_anticipada", True):
+            return fuente
+        return io.BufferedReader(LecturaAnticipada(
+            fuente,
+            tamano_bloque=self.config.get("bloque_bytes", 1 << 20),
+            bloques=self.config.get("bloques_en_cola", 4),
+        ))
+
+    def _leer_comprimido(self, file_path: str, compresion: str, sep: str, usecols, chunksize: int = None):
+        """
+            Lee un CSV comprimido descomprimiéndolo como flujo. Con `chunksize` devuelve un
+            iterador de chunks que cierra el archivo al terminar; sin él, un DataFrame.
+        """
+        logger.info(f"Leyendo archivo CSV comprimido ({compresion}) desde: {os.path.basename(file_path)}")
+        try:
+            if chunksize is None:
+                with self._abrir(file_path, compresion) as flujo:
+                    df = pd.read_csv(flujo, sep=sep, usecols=usecols, dtype=self.config.get("dtypes"))
+                logger.info(f"Lectura completada: {df.shape[0]} filas, {df.shape[1]} columnas")
+                return df
+            return self._chunks_comprimidos(file_path, compresion, sep, usecols, chunksize)
+        except Exception as e:
+            logger.error(f"Fallo al leer el archivo CSV.")
+            logger.exception(f"leyendo archivo CSV: {e}")
+            raise RuntimeError(f"[Error] leyendo archivo CSV: {e}")
+
+    def _chunks_comprimidos(self, file_path: str, compresion: str, sep: str, usecols, chunksize: int):
+        with self._abrir(file_path, compresion) as flujo:
+            with pd.read_csv(flujo, sep=sep, usecols=usecols, dtype=self.config.get("dtypes"), chunksize=chunksize) as lector:
+                yield from lector
+        logger.info(f"Lectura parcial completada.")
@@ -1,12 +1,82 @@
 
 import os
+import time
+import asyncio
+from typing import Any, Dict, Iterator, List
 
-from langchain_ollama.llms import OllamaLLM
+import pandas as pd
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import OllamaEmbeddings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
+from src.submodulos.backends import crear_embeddings, crear_llm
+from src.submodulos.retrieval import HybridRetriever
+
+
+def construir_documentos(df, metadata: Dict[str, str]):
+    """
+        Convierte cada fila del DataFrame en un `Document` semántico, concatenando la 
+        información principal en `page_content` y generando los metadatos a partir del 
+        mapeo de la configuración. Además se agrega el metadato numérico `ts_epoch` 
+        (segundos desde 1970) para poder filtrar por rango de fechas en Chroma.
+
+        Args:
+            df (pandas.DataFrame): Datos con columnas user_id, price, ts y updated_by.
+            metadata (dict): Mapeo {nombre_metadato: columna_del_dataframe}.
+
+        Returns:
+            tuple[list[Document], list[str]]: Documentos y sus ids (índice del DataFrame).
+    """
+    documents = []
+    ids = []
+
+    ts_epoch = (pd.to_datetime(df["ts"], utc=True) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    df['ts'] = df["ts"].astype(str)
+
+    for i, row in df.iterrows():
+        
+        # Construir el metadata dinámicamente
+        meta = {k: row[v] for k, v in metadata.items()}
+        meta["ts_epoch"] = int(ts_epoch[i])
+        
+        doc = Document(
+            page_content=f"El usuario {row['user_id']} realizó una compra por {row['price']} USD, "
+                     f"el {row['ts']} y fue registrado por {row['updated_by']}.",
+            metadata=meta,
+            id=str(i)
+        )
+        documents.append(doc)
+        ids.append(str(i))
+
+    return documents, ids
+
+
+def configuracion_hnsw(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+        Traduce la sección 'hnsw' de la configuración 'llm' a la configuración de 
+        colección de Chroma. Solo se incluyen los parámetros definidos; el resto queda 
+        con los valores por defecto de Chroma (space=l2, M=16, ef_construction=100, 
+        ef_search=100, sync_threshold=1000).
+
+        Args:
+            config (dict): Sección 'llm' de la configuración.
+
+        Returns:
+            dict: {"hnsw": {...}} listo para `collection_configuration`, o {} si no hay 
+                parámetros definidos.
+    """
+    hnsw = config.get("hnsw") or {}
+    mapeo = {
+        "space": "space",
+        "M": "max_neighbors",
+        "ef_construction": "ef_construction",
+        "ef_search": "ef_search",
+        "sync_threshold": "sync_threshold",
+    }
+    parametros = {destino: hnsw[origen] for origen, destino in mapeo.items() if hnsw.get(origen) is not None}
+    return {"hnsw": parametros} if parametros else {}
+
+
 class VectorStoreLLM:
     """
         Clase para gestionar un flujo de trabajo entre un DataFrame, 
@@ -25,6 +95,14 @@ class VectorStoreLLM:
             get_pregunta(pregunta: str) -> str:
                 Realiza una búsqueda semántica sobre los documentos, 
                 recupera el contexto y lo pasa al LLM junto con la pregunta.
+
+            get_pregunta_stream(pregunta: str) -> Iterator[str]:
+                Igual que `get_pregunta`, pero entrega los tokens a medida que el 
+                modelo los genera.
+
+            get_preguntas(preguntas: list, max_workers: int) -> list:
+                Responde varias preguntas: recupera en batch y genera de forma 
+                concurrente con un máximo de `max_workers` generaciones a la vez.
     """
     def __init__(self, dataframe, config):
         """ 
@@ -40,10 +118,22 @@ class VectorStoreLLM:
                     Nombre de la colección en Chroma.
                 db_location (str): 
                     Ruta en disco donde se guarda la base de datos de Chroma.
+                backend (str):
+                    "ollama" (por defecto) o "local" (embeddings por hashing y modelo eco
+                    deterministas, sin servidor).
                 embedding_model (str): 
                     Nombre del modelo de embeddings usado con Ollama.
                 k (int): 
                     Número de documentos a recuperar en cada búsqueda.
+                hnsw (dict):
+                    Parámetros del índice HNSW (space, M, ef_construction, ef_search, 
+                    sync_threshold). Los de construcción solo aplican al crear la colección; 
+                    ef_search se ajusta también sobre colecciones existentes.
+                batch_size (int):
+                    Documentos por llamada a `add_documents` al indexar.
+                retrieval (dict):
+                    Si `hibrido` es True, la recuperación extrae filtros de usuario y fecha 
+                    de la pregunta y combina búsqueda densa con BM25 (`HybridRetriever`).
                 llm_model (str): 
                     Nombre del modelo LLM de Ollama a utilizar.
                 template (str): 
@@ -63,29 +153,37 @@ class VectorStoreLLM:
         self.llm_model = self.config.get("llm_model")
         self.template = self.config.get("template")
         
-        # Cargo el modelo de emdedding (que transforma en vector los datos)
-        self.embeddings = OllamaEmbeddings(model=self.embedding_model)
+        # Cargo el modelo de emdedding (que transforma en vector los datos) segun el backend
+        self.embeddings = crear_embeddings(self.config)
         
         # Verifico si hay que agregar documentos
         self.add_documents = not os.path.exists(self.db_location)
         
-        # Inicializo vector store
+        # Inicializo vector store con los parametros del indice HNSW
+        self.hnsw = configuracion_hnsw(self.config)
         self.vector_store = Chroma(
             collection_name=self.collection_name,
             persist_directory=self.db_location,
-            embedding_function=self.embeddings
+            embedding_function=self.embeddings,
+            collection_configuration=self.hnsw or None
         )
         
         # Agrego documentos si la DB no existe
         if self.add_documents:
             self._agregar_documentos()
+        else:
+            self._ajustar_ef_search()
         
-        self.retriever = self.vector_store.as_retriever(
-            search_kwargs={"k": self.k}
-        )
+        retrieval = self.config.get('retrieval') or {}
+        if retrieval.get('hibrido'):
+            self.retriever = HybridRetriever(self.vector_store, self.k, retrieval)
+        else:
+            self.retriever = self.vector_store.as_retriever(
+                search_kwargs={"k": self.k}
+            )
 
         # Inicializo LLM + prompt
-        self.model = OllamaLLM(model=self.llm_model)
+        self.model = crear_llm(self.config)
         self.prompt = ChatPromptTemplate.from_template(self.template)
         self.chain = self.prompt | self.model
 
@@ -102,29 +200,28 @@ class VectorStoreLLM:
                 - Agrega los documentos al vector store (`self.vector_store`).
                 - Imprime la cantidad de documentos insertados.
         """
-        documents = []
-        ids = []
-        #page_content = self.config.get('page_content')
-        metadata = self.config.get('metadata')
-
-        self.df['ts'] = self.df["ts"].astype(str)
-
-        for i, row in self.df.iterrows():
-            
-            # Construir el metadata dinámicamente
-            meta = {k: row[v] for k, v in metadata.items()}
-            
-            doc = Document(
-                page_content=f"El usuario {row['user_id']} realizó una compra por {row['price']} USD, "
-                         f"el {row['ts']} y fue registrado por {row['updated_by']}.",
-                metadata=meta,
-                id=str(i)
-            )
-            documents.append(doc)
-            ids.append(str(i))
+        documents, ids = construir_documentos(self.df, self.config.get('metadata'))
         
-        self.vector_store.add_documents(documents=documents, ids=ids)
+        # Se indexa por lotes para acotar memoria y respetar el tamaño máximo de batch de Chroma
+        batch_size = self.config.get('batch_size') or len(documents) or 1
+        for inicio in range(0, len(documents), batch_size):
+            self.vector_store.add_documents(
+                documents=documents[inicio:inicio + batch_size], 
+                ids=ids[inicio:inicio + batch_size]
+            )
         print(f"Se agregaron {len(documents)} documentos al vector store.")
+
+    def _ajustar_ef_search(self):
+        """
+            Aplica el `ef_search` configurado a una colección ya existente. Es el único 
+            parámetro HNSW que se puede cambiar sin reconstruir el índice; los de 
+            construcción (space, M, ef_construction) quedan fijos al crear la colección.
+        """
+        ef_search = self.hnsw.get("hnsw", {}).get("ef_search")
+        if ef_search is None:
+            return
+        # langchain_chroma no expone la colección de forma pública
+        self.vector_store._collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
     
     def get_pregunta(self, pregunta):
         """
@@ -144,19 +241,95 @@ class VectorStoreLLM:
         """
         
         reviews = self.retriever.invoke(pregunta)
-        
-        reviews_text = "\n".join(
-            f"Usuario {r.metadata['user_id']} compró {r.metadata['precio']} USD "
-            f"el {r.metadata['timestamp']} y fue actualizado por {r.metadata['updated_by']}" 
-            for r in reviews
-        )
 
         result = self.chain.invoke({
-            "reviews": reviews_text, 
+            "reviews": self._formatear_reviews(reviews), 
             "question": pregunta
         })
         
         return result
-        
-        
-        
\ No newline at end of file
+
+    def get_pregunta_stream(self, pregunta: str) -> Iterator[str]:
+        """
+            Versión en streaming de `get_pregunta`: recupera el contexto y entrega los 
+            fragmentos de texto del LLM a medida que llegan (`chain.stream`), sin esperar 
+            la respuesta completa.
+
+            Args:
+                pregunta (str): Consulta en lenguaje natural realizada por el usuario.
+
+            Yields:
+                str: Fragmentos (tokens) de la respuesta generada por el LLM.
+        """
+        reviews = self.retriever.invoke(pregunta)
+
+        yield from self.chain.stream({
+            "reviews": self._formatear_reviews(reviews),
+            "question": pregunta
+        })
+
+    def get_preguntas(self, preguntas: List[str], max_workers: int = 4) -> List[Dict[str, Any]]:
+        """
+            Responde un lote de preguntas. La recuperación de documentos se hace en batch 
+            (`retriever.batch`, concurrente hasta `max_workers`) y las generaciones se ejecutan de forma concurrente con la 
+            interfaz asíncrona del chain, limitadas por un semáforo de `max_workers`.
+
+            Args:
+                preguntas (list[str]): Preguntas en lenguaje natural.
+                max_workers (int): Número máximo de recuperaciones y de generaciones simultáneas.
+
+            Returns:
+                list[dict]: Un diccionario por pregunta (en el mismo orden) con:
+                    - "respuesta" (str | None): Respuesta del LLM.
+                    - "latencia_s" (float): Tiempo de recuperación (prorrateado) + generación.
+                    - "error" (str, opcional): Mensaje si la generación falló.
+        """
+        if not preguntas:
+            return []
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError("max_workers debe ser un entero positivo")
+
+        inicio = time.perf_counter()
+        # Recuperación concurrente, con el mismo límite que las generaciones
+        lotes_reviews = self.retriever.batch(preguntas, config={"max_concurrency": max_workers})
+        # La recuperación es un solo batch, se reparte su tiempo entre las preguntas
+        recuperacion_s = (time.perf_counter() - inicio) / len(preguntas)
+
+        entradas = [
+            {"reviews": self._formatear_reviews(reviews), "question": pregunta}
+            for pregunta, reviews in zip(preguntas, lotes_reviews)
+        ]
+        resultados = asyncio.run(self._agenerar(entradas, max_workers))
+        for r in resultados:
+            r["latencia_s"] += recuperacion_s
+        return resultados
+
+    async def _agenerar(self, entradas: List[Dict[str, str]], max_workers: int) -> List[Dict[str, Any]]:
+        """
+            Ejecuta `chain.ainvoke` para cada entrada con un máximo de `max_workers` 
+            generaciones en paralelo, midiendo la latencia de cada una.
+        """
+        semaforo = asyncio.Semaphore(max_workers)
+
+        async def generar(entrada):
+            async with semaforo:
+                inicio = time.perf_counter()
+                try:
+                    respuesta = await self.chain.ainvoke(entrada)
+                    return {"respuesta": respuesta, "latencia_s": time.perf_counter() - inicio}
+                except Exception as e:
+                    # Un fallo no detiene el resto del lote
+                    return {"respuesta": None, "latencia_s": time.perf_counter() - inicio, "error": str(e)}
+
+        return await asyncio.gather(*(generar(e) for e in entradas))
+
+    @staticmethod
+    def _formatear_reviews(reviews) -> str:
+        """
+            Construye el contexto en texto plano a partir de los metadatos de los documentos.
+        """
+        return "\n".join(
+            f"Usuario {r.metadata['user_id']} compró {r.metadata['precio']} USD "
+            f"el {r.metadata['timestamp']} y fue actualizado por {r.metadata['updated_by']}" 
+            for r in reviews
+        )
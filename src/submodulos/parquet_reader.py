@@ -0,0 +1,98 @@
+import os
+import pandas as pd
+from typing import Any, Dict, Iterator
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+class ParquetReader():
+    """
+        Clase para la lectura de archivos Parquet por row groups, equivalente a `CSVReader`
+        para la ingesta: entrega DataFrames con las mismas columnas que el CSV.
+
+        Atributos:
+        -----------
+            config : Dict[str, Any]
+                Archivo de configuración en formato diccionario. Usa 'usecols' de la sección
+                'CSV' y 'alias' de la sección 'PARQUET' (nombre de columna del CSV → nombre
+                alternativo en el Parquet, p. ej. timestamp → ts en los archivos de `export`).
+
+        Metodos:
+        --------
+            run(file_path: str, chunksize: int)
+                Itera el archivo row group por row group, leyendo solo las columnas de 'usecols'.
+
+            estimar_bytes_por_fila(file_path: str, filas: int)
+                Memoria por fila en pandas, a partir de las primeras filas del archivo.
+    """
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config['CSV']
+        self.alias = (config.get('PARQUET') or {}).get("alias") or {}
+
+    def run(self, file_path: str = None, chunksize: int = None) -> Iterator[pd.DataFrame]:
+        """
+            Lee el archivo Parquet y devuelve un iterador de DataFrames, uno por row group.
+            El tamaño de cada lote lo define el row group del archivo (`chunksize` se
+            acepta por compatibilidad con `CSVReader` y no se usa).
+
+            Args:
+            -----
+                file_path (str = None)
+                    Path con la dirección del archivo a leer
+                chunksize (int, opcional)
+                    Sin efecto; el lote es el row group.
+
+            Returns:
+            --------
+            Iterator[pd.DataFrame]: Un DataFrame por row group, con las columnas de 'usecols'.
+        """
+        # Import diferido: pyarrow solo se necesita al leer Parquet
+        import pyarrow.parquet as pq
+
+        if not file_path:
+            logger.error(f"Se requiere 'file_path' en su configuración.")
+            raise ValueError("ParquetReader requiere un 'file_path' en config")
+
+        if not os.path.exists(file_path):
+            logger.error(f"No se encontró el archivo Parquet '{file_path}'.")
+            raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
+
+        archivo = pq.ParquetFile(file_path)
+        disponibles = set(archivo.schema_arrow.names)
+        usecols = self.config.get("usecols", None) or list(disponibles)
+
+        # Proyección de columnas: se leen solo las requeridas, resolviendo alias
+        columnas = {}
+        for col in usecols:
+            origen = col if col in disponibles else self.alias.get(col)
+            if origen not in disponibles:
+                logger.error(f"El archivo Parquet no tiene la columna '{col}'.")
+                raise ValueError(f"Columna '{col}' no encontrada en {os.path.basename(file_path)}")
+            columnas[origen] = col
+
+        logger.info(f"Leyendo archivo Parquet desde: {os.path.basename(file_path)} ({archivo.num_row_groups} row groups)")
+        return self._row_groups(archivo, columnas)
+
+    def estimar_bytes_por_fila(self, file_path: str, filas: int = 1000) -> float:
+        """
+            Memoria por fila (con strings incluidos) del DataFrame que produce la lectura,
+            medida sobre un primer lote de `filas` filas (sin leer el row group completo).
+        """
+        # Import diferido: pyarrow solo se necesita al leer Parquet
+        import pyarrow.parquet as pq
+
+        archivo = pq.ParquetFile(file_path)
+        disponibles = set(archivo.schema_arrow.names)
+        usecols = self.config.get("usecols", None) or list(disponibles)
+        columnas = [col if col in disponibles else self.alias.get(col) for col in usecols]
+        lote = next(archivo.iter_batches(batch_size=filas, columns=columnas), None)
+        if lote is None or lote.num_rows == 0:
+            return 0.0
+        df = lote.to_pandas()
+        return float(df.memory_usage(deep=True).sum()) / df.shape[0]
+
+    @staticmethod
+    def _row_groups(archivo, columnas: Dict[str, str]) -> Iterator[pd.DataFrame]:
+        for i in range(archivo.num_row_groups):
+            df = archivo.read_row_group(i, columns=list(columnas)).to_pandas()
+            yield df.rename(columns=columnas)
@@ -0,0 +1,192 @@
+import re
+import math
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+from langchain_core.documents import Document
+
+from src.submodulos.router import extraer_filtros
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+def tokenizar(texto: str) -> List[str]:
+    """ Tokens en minúsculas (palabras y números) usados por el índice BM25. """
+    return re.findall(r"\w+", texto.lower())
+
+
+def _meses(desde: pd.Timestamp, hasta: pd.Timestamp):
+    """ Meses (año, mes) que toca el rango [desde, hasta). """
+    anio, mes = desde.year, desde.month
+    while pd.Timestamp(anio, mes, 1, tz="UTC") < hasta:
+        yield anio, mes
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+class BM25Index:
+    """
+        Índice invertido en memoria con puntuación BM25 sobre el contenido de los documentos,
+        y arreglos de metadatos (user_id, fecha) para filtrar candidatos sin consultar Chroma.
+
+        Metodos:
+        --------
+            candidatos(filtros: dict) -> set | None
+                Posiciones de los documentos que cumplen los filtros (None si no hay filtros).
+
+            buscar(consulta: str, k: int, candidatos: set) -> list
+                Posiciones de los k documentos con mayor puntuación BM25.
+    """
+    def __init__(self, ids: List[str], textos: List[str], metadatas: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.ids = ids
+        self.textos = textos
+        self.metadatas = metadatas
+        self.k1 = k1
+        self.b = b
+
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.largos = []
+        for pos, texto in enumerate(textos):
+            tokens = tokenizar(texto)
+            self.largos.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                self.postings[token][pos] = tf
+        self.promedio_largo = (sum(self.largos) / len(self.largos)) if self.largos else 0.0
+
+        n = len(textos)
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+        # Metadatos para filtrar en memoria; la fecha se toma del metadato de texto 'timestamp'.
+        # Posiciones por user_id y por mes: los filtros intersectan estos conjuntos en lugar
+        # de recorrer todo el corpus en cada consulta.
+        fechas = pd.to_datetime(pd.Series([m.get("timestamp") for m in metadatas], dtype="object"), utc=True, errors="coerce")
+        self.fechas = list(fechas)
+        self.por_usuario: Dict[str, Set[int]] = defaultdict(set)
+        self.por_mes: Dict[tuple, Set[int]] = defaultdict(set)
+        for pos, (m, fecha) in enumerate(zip(metadatas, self.fechas)):
+            self.por_usuario[str(m.get("user_id"))].add(pos)
+            if not pd.isna(fecha):
+                self.por_mes[(fecha.year, fecha.month)].add(pos)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def candidatos(self, filtros: Dict[str, Any]) -> Optional[Set[int]]:
+        if filtros.get("user_id") is None and filtros.get("desde") is None:
+            return None
+        conjuntos = []
+        if filtros.get("user_id") is not None:
+            conjuntos.append(self.por_usuario.get(str(filtros["user_id"]), set()))
+        desde, hasta = filtros.get("desde"), filtros.get("hasta")
+        if desde is not None:
+            conjuntos.append(set().union(*(self.por_mes.get(mes, set()) for mes in _meses(desde, hasta))))
+        # Se parte del conjunto más chico; el rango exacto solo se revisa en esos candidatos
+        conjuntos.sort(key=len)
+        resultado = conjuntos[0].intersection(*conjuntos[1:])
+        if desde is not None:
+            resultado = {pos for pos in resultado if desde <= self.fechas[pos] < hasta}
+        return resultado
+
+    def buscar(self, consulta: str, k: int, candidatos: Optional[Set[int]] = None) -> List[int]:
+        puntajes: Dict[int, float] = defaultdict(float)
+        for token in set(tokenizar(consulta)):
+            for pos, tf in self.postings.get(token, {}).items():
+                if candidatos is not None and pos not in candidatos:
+                    continue
+                norma = self.k1 * (1 - self.b + self.b * self.largos[pos] / (self.promedio_largo or 1.0))
+                puntajes[pos] += self.idf[token] * tf * (self.k1 + 1) / (tf + norma)
+        return sorted(puntajes, key=lambda pos: (-puntajes[pos], pos))[:k]
+
+    def documento(self, pos: int) -> Document:
+        return Document(id=self.ids[pos], page_content=self.textos[pos], metadata=self.metadatas[pos])
+
+
+class HybridRetriever:
+    """
+        Recuperador híbrido para `VectorStoreLLM`: extrae de la pregunta las restricciones
+        de usuario y fecha, las aplica como filtros `where` de Chroma sobre los metadatos
+        (`user_id`, `ts_epoch`) y combina la búsqueda densa con BM25 sobre el mismo conjunto
+        de candidatos mediante Reciprocal Rank Fusion (RRF).
+
+        Cuando los filtros dejan k documentos o menos se devuelven directamente, sin
+        búsqueda vectorial. Expone `invoke` y `batch` como los retrievers de langchain.
+    """
+    def __init__(self, vector_store, k: int, config: Dict[str, Any] = None):
+        """
+            Args:
+            -----
+                vector_store (Chroma): Vector store ya poblado.
+                k (int): Número de documentos a recuperar.
+                config (dict, opcional): Sección 'retrieval' de la configuración 'llm'
+                    (bm25_k1, bm25_b, rrf_k).
+        """
+        config = config or {}
+        self.vector_store = vector_store
+        self.k = k
+        self.rrf_k = config.get("rrf_k", 60)
+
+        datos = vector_store.get(include=["documents", "metadatas"])
+        self.bm25 = BM25Index(
+            datos["ids"], datos["documents"], datos["metadatas"],
+            k1=config.get("bm25_k1", 1.5), b=config.get("bm25_b", 0.75)
+        )
+        logger.info(f"Índice BM25 construido con {len(self.bm25)} documentos.")
+
+    def _filtro_chroma(self, filtros: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """ Traduce los filtros a la sintaxis `where` de Chroma respetando el tipo guardado. """
+        condiciones = []
+        muestra = self.bm25.metadatas[0] if self.bm25.metadatas else {}
+        if filtros.get("user_id") is not None:
+            valor = str(filtros["user_id"]) if isinstance(muestra.get("user_id"), str) else filtros["user_id"]
+            condiciones.append({"user_id": valor})
+        if filtros.get("desde") is not None and "ts_epoch" in muestra:
+            condiciones.append({"ts_epoch": {"$gte": int(filtros["desde"].timestamp())}})
+            condiciones.append({"ts_epoch": {"$lt": int(filtros["hasta"].timestamp())}})
+        if not condiciones:
+            return None
+        return condiciones[0] if len(condiciones) == 1 else {"$and": condiciones}
+
+    def invoke(self, pregunta: str) -> List[Document]:
+        filtros = extraer_filtros(pregunta)
+        candidatos = self.bm25.candidatos(filtros)
+
+        if candidatos is not None and len(candidatos) <= self.k:
+            # El filtro ya reduce el conjunto: se responde sin búsqueda vectorial
+            return [self.bm25.documento(pos) for pos in sorted(candidatos, key=lambda p: self.bm25.fechas[p])]
+
+        densos = self.vector_store.similarity_search(pregunta, k=self.k, filter=self._filtro_chroma(filtros))
+        if candidatos is not None:
+            # Colecciones creadas sin 'ts_epoch' no filtran por fecha en Chroma: se filtra aquí
+            permitidos = {self.bm25.ids[p] for p in candidatos}
+            densos = [d for d in densos if d.id in permitidos]
+        lexicos = [self.bm25.documento(pos) for pos in self.bm25.buscar(pregunta, self.k, candidatos)]
+
+        # Reciprocal Rank Fusion entre la lista densa y la léxica
+        puntajes: Dict[str, float] = defaultdict(float)
+        documentos: Dict[str, Document] = {}
+        for lista in (densos, lexicos):
+            for rango, doc in enumerate(lista):
+                puntajes[doc.id] += 1.0 / (self.rrf_k + rango + 1)
+                documentos.setdefault(doc.id, doc)
+        return [documentos[i] for i in sorted(puntajes, key=lambda i: -puntajes[i])[:self.k]]
+
+    def batch(self, preguntas: List[str], config: Dict[str, Any] = None) -> List[List[Document]]:
+        """
+            Recupera los documentos de varias preguntas en paralelo, como el `batch` de los
+            retrievers de langchain: cada `invoke` corre en un hilo (la búsqueda densa espera
+            al servidor de embeddings y a Chroma), a lo sumo 'max_concurrency' a la vez.
+            El índice BM25 solo se lee, por lo que los hilos lo comparten.
+
+            Args:
+                preguntas (list[str]): Preguntas, en orden.
+                config (dict, opcional): Configuración de langchain; se usa 'max_concurrency'.
+
+            Returns:
+                list[list[Document]]: Documentos de cada pregunta, en el mismo orden.
+        """
+        if len(preguntas) <= 1:
+            return [self.invoke(p) for p in preguntas]
+        with ThreadPoolExecutor(max_workers=(config or {}).get("max_concurrency")) as ejecutor:
+            return list(ejecutor.map(self.invoke, preguntas))
@@ -0,0 +1,374 @@
+import re
+import time
+from functools import partial
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from src.modulos.db import get_running_stats, fetch_db_stats, fetch_user_stats
+from src.modulos.stats import HyperLogLog
+
+from config.logging_utils import get_logger
+logger = get_logger()
+
+
+# Patrones para detectar metricas agregadas (español / ingles) sobre el precio, y el
+# conteo de usuarios distintos (estimado con el HyperLogLog de running_stats).
+METRICAS = {
+    "conteo": r"\b(cu[aá]nt[oa]s|conteo|cantidad|n[uú]mero de|count|how many)\b",
+    "promedio": r"\b(promedio|media|average|avg|mean)\b",
+    "minimo": r"\b(m[ií]nim[oa]|min|minimum|lowest)\b",
+    "maximo": r"\b(m[aá]xim[oa]|max|maximum|highest)\b",
+    "suma": r"\b(suma|total gastado|gasto total|sum|total spent)\b",
+    "usuarios": r"\b(usuarios (distintos|[uú]nicos|diferentes)|(distinct|unique|different) users)\b",
+}
+
+ETIQUETAS = {
+    "conteo": "Total de compras",
+    "promedio": "Promedio de precio",
+    "minimo": "Precio minimo",
+    "maximo": "Precio maximo",
+    "suma": "Gasto total",
+    "usuarios": "Usuarios distintos (estimado)",
+}
+
+# Preguntas que piden agrupar, ordenar o comparar no son un agregado simple y van al RAG.
+PATRON_ABIERTO = re.compile(
+    r"\b(por (mes|d[ií]a|fecha|usuario|a[nñ]o)|cu[aá]l usuario|qu[eé] usuario|el usuario que|"
+    r"which user|fecha|cu[aá]ndo|when|listado|lista|top|ranking|per (month|day|user))\b",
+    re.IGNORECASE,
+)
+PATRON_USUARIO = re.compile(r"\b(?:usuario|user|user_id)\s*(?:#|n[uú]mero|id)?\s*(\d+)\b", re.IGNORECASE)
+# Condiciones sobre el valor ("mayor a 50", "above 50", "> 50"): ninguna fuente de agregados las aplica.
+PATRON_VALOR = re.compile(
+    r"(\b(?:mayor(?:es)?|menor(?:es)?|superior(?:es)?|inferior(?:es)?)\s+(?:a|que)|\bm[aá]s de|\bmenos de|"
+    r"\bentre|\b(?:above|over|below|under|between)|\b(?:greater|less|more|fewer) than|[<>]=?)\s*\$?\s*\d",
+    re.IGNORECASE,
+)
+
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+}
+PATRON_MES = re.compile(r"\b(" + "|".join(MESES) + r")\s+(?:de\s+|del\s+|of\s+)?(\d{4})\b", re.IGNORECASE)
+PATRON_ISO_DIA = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+PATRON_MDY = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b")
+PATRON_ISO_MES = re.compile(r"\b(\d{4})-(\d{1,2})\b")
+PATRON_ANIO = re.compile(r"\b(?:en|in|del|de|año|year)\s+(\d{4})\b", re.IGNORECASE)
+
+
+def extraer_usuario(pregunta: str) -> Optional[int]:
+    """
+        Extrae el user_id mencionado en la pregunta ("usuario 7", "user 7", "user_id 7").
+
+        Args:
+            pregunta (str): Pregunta en lenguaje natural.
+
+        Returns:
+            int | None: El user_id encontrado o None si la pregunta no menciona uno.
+    """
+    m = PATRON_USUARIO.search(pregunta)
+    return int(m.group(1)) if m else None
+
+
+def _fecha(anio: int, mes: int, dia: int = 1) -> Optional[pd.Timestamp]:
+    """ Fecha en UTC, o None si no existe ("2012-02-30", mes 13) o está fuera del rango de pandas. """
+    try:
+        return pd.Timestamp(anio, mes, dia, tz="UTC")
+    except ValueError:
+        return None
+
+
+def _rangos_de_fecha(pregunta: str):
+    """
+        (inicio, duración) de cada fecha de la pregunta, de los formatos más específicos a
+        los más generales; inicio es None si la fecha no existe. El texto de una fecha no se
+        vuelve a leer con un formato más general: "2012-02-30" no pasa a ser "2012-02".
+    """
+    formatos = (
+        (PATRON_ISO_DIA, lambda m: _fecha(int(m.group(1)), int(m.group(2)), int(m.group(3))), pd.Timedelta(days=1)),
+        # Mes/día como en los CSV; si no es una fecha válida, día/mes ("25/12/2012")
+        (PATRON_MDY, lambda m: _fecha(int(m.group(3)), int(m.group(1)), int(m.group(2)))
+            or _fecha(int(m.group(3)), int(m.group(2)), int(m.group(1))), pd.Timedelta(days=1)),
+        (PATRON_ISO_MES, lambda m: _fecha(int(m.group(1)), int(m.group(2))), pd.offsets.MonthBegin(1)),
+        (PATRON_MES, lambda m: _fecha(int(m.group(2)), MESES[m.group(1).lower()]), pd.offsets.MonthBegin(1)),
+        (PATRON_ANIO, lambda m: _fecha(int(m.group(1)), 1), pd.offsets.YearBegin(1)),
+    )
+    leidos = []
+    for patron, inicio, duracion in formatos:
+        for m in patron.finditer(pregunta):
+            if any(m.start() < fin and ini < m.end() for ini, fin in leidos):
+                continue
+            leidos.append(m.span())
+            yield inicio(m), duracion
+
+
+def extraer_filtros(pregunta: str) -> Dict[str, Any]:
+    """
+        Extrae restricciones de usuario y fecha de una pregunta en lenguaje natural.
+
+        Formatos de fecha reconocidos: "2012-01-10", "1/10/2012" (mes/día/año, como en
+        los CSV; "25/12/2012" se lee como día/mes), "2012-01", "enero 2012" /
+        "enero de 2012" / "january 2012" y "en 2012". Se toma la primera fecha válida;
+        una fecha inexistente ("2012-02-30", "1234-56") no filtra.
+
+        Args:
+            pregunta (str): Pregunta en lenguaje natural.
+
+        Returns:
+            dict: {"user_id": int | None, "desde": pd.Timestamp | None,
+                "hasta": pd.Timestamp | None}, con `desde` inclusivo y `hasta` exclusivo (UTC).
+    """
+    desde = hasta = None
+    for inicio, duracion in _rangos_de_fecha(pregunta):
+        if inicio is not None:
+            desde, hasta = inicio, inicio + duracion
+            break
+
+    return {"user_id": extraer_usuario(pregunta), "desde": desde, "hasta": hasta}
+
+
+@dataclass
+class Intencion:
+    """
+        Resultado de clasificar una pregunta.
+
+            Attributes:
+            -----------
+            tipo : str
+                "agregado" (todas las compras), "usuario" (compras de un usuario) o "rag".
+            metricas : list
+                Metricas pedidas (conteo, promedio, minimo, maximo, suma, usuarios).
+            user_id : int | None
+                Usuario sobre el que se pregunta, solo para tipo "usuario".
+            desde, hasta : pd.Timestamp | None
+                Rango de fechas [desde, hasta) de un tipo "agregado" (ver `extraer_filtros`).
+    """
+    tipo: str
+    metricas: List[str] = field(default_factory=list)
+    user_id: Optional[int] = None
+    desde: Optional[pd.Timestamp] = None
+    hasta: Optional[pd.Timestamp] = None
+
+
+class QueryRouter:
+    """
+        Enrutador de preguntas que se coloca delante de `VectorStoreLLM.get_pregunta`.
+
+        Las preguntas de agregados ("cual es el precio promedio", "max purchase of user 7")
+        se responden directamente desde `running_stats` o con una consulta SQL indexada
+        sobre `events`, de forma exacta sobre todo el dataset; con una fecha ("en enero 2012",
+        "2012-03") se consulta solo ese rango. Las preguntas abiertas, y las que tienen una
+        condición que ninguna fuente aplica ("above 50", una fecha junto a un usuario), se
+        envian al RAG.
+
+        Metodos:
+        --------
+            clasificar(pregunta: str) -> Intencion
+                Detecta si la pregunta es un agregado global, un agregado por usuario o abierta.
+
+            responder(pregunta: str) -> str
+                Responde la pregunta con la fuente adecuada.
+
+            responder_stream(pregunta: str) -> Iterator[str]
+                Igual que `responder`, entregando la respuesta del RAG token a token.
+
+            responder_lote(preguntas: list, max_workers: int) -> list
+                Responde muchas preguntas: los agregados directamente y las abiertas
+                en un solo lote concurrente contra el RAG.
+    """
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        rag: Any = None,
+        fuente_stats: Callable = partial(get_running_stats, lectura=True),
+        fuente_usuario: Callable = fetch_user_stats,
+        fuente_rango: Callable = fetch_db_stats,
+    ):
+        """
+            Args:
+            -----
+                config (dict): Configuración general (se pasa a las fuentes de datos).
+                rag (object, opcional): Objeto con metodo `get_pregunta(pregunta)` usado
+                    para preguntas abiertas (normalmente `VectorStoreLLM`).
+                fuente_stats (callable): Función que devuelve las running stats (por defecto
+                    de la réplica de lectura, ver `get_conn_lectura`).
+                fuente_usuario (callable): Función que devuelve los agregados de un usuario.
+                fuente_rango (callable): Función que devuelve los agregados de un rango de
+                    fechas, `fuente_rango(config, desde, hasta)`.
+        """
+        self.config = config
+        self.rag = rag
+        self.fuente_stats = fuente_stats
+        self.fuente_usuario = fuente_usuario
+        self.fuente_rango = fuente_rango
+
+    def clasificar(self, pregunta: str) -> Intencion:
+        """
+            Clasifica la pregunta en una intención.
+
+            Args:
+                pregunta (str): Pregunta en lenguaje natural.
+
+            Returns:
+                Intencion: Tipo de pregunta, metricas detectadas y usuario (si aplica).
+        """
+        texto = pregunta.lower()
+        metricas = [nombre for nombre, patron in METRICAS.items() if re.search(patron, texto)]
+        filtros = extraer_filtros(texto)
+        user_id, desde, hasta = filtros["user_id"], filtros["desde"], filtros["hasta"]
+
+        if not metricas or PATRON_ABIERTO.search(texto) or PATRON_VALOR.search(texto):
+            return Intencion(tipo="rag")
+        if "usuarios" in metricas:
+            # "cuántos usuarios distintos": el conteo es de usuarios. El sketch es de todo
+            # el histórico, por lo que no responde por un usuario ni por un rango.
+            if user_id is not None or desde is not None:
+                return Intencion(tipo="rag")
+            return Intencion(tipo="agregado", metricas=["usuarios"])
+        if user_id is not None:
+            # Los agregados por usuario no se filtran por fecha
+            if desde is not None:
+                return Intencion(tipo="rag")
+            return Intencion(tipo="usuario", metricas=metricas, user_id=user_id)
+        if re.search(r"\b(usuarios?|users?)\b", texto):
+            # Pregunta por usuarios sin indicar cual: no es un agregado global.
+            return Intencion(tipo="rag")
+        return Intencion(tipo="agregado", metricas=metricas, desde=desde, hasta=hasta)
+
+    def responder(self, pregunta: str) -> str:
+        """
+            Responde la pregunta desde running_stats, SQL o el RAG segun su intención.
+
+            Args:
+                pregunta (str): Pregunta en lenguaje natural.
+
+            Returns:
+                str: Respuesta a la pregunta.
+
+            Raises:
+                ValueError: Si la pregunta es abierta y no se configuró un RAG.
+        """
+        intencion = self.clasificar(pregunta)
+        logger.info(f"Pregunta enrutada como '{intencion.tipo}': {pregunta}")
+
+        if intencion.tipo == "agregado" and intencion.desde is not None:
+            db = self.fuente_rango(self.config, intencion.desde, intencion.hasta)
+            valores = {
+                "conteo": db["total_rows"],
+                "promedio": db["avg_price"],
+                "minimo": db["min_price"],
+                "maximo": db["max_price"],
+                "suma": (db["avg_price"] or 0.0) * db["total_rows"],
+            }
+            sujeto = f"Compras desde {intencion.desde:%Y-%m-%d} hasta {intencion.hasta:%Y-%m-%d} (exclusivo)"
+            return self._formatear(sujeto, intencion.metricas, valores, db["total_rows"])
+
+        if intencion.tipo == "agregado":
+            rs = self.fuente_stats(self.config)
+            valores = {
+                "conteo": rs["count"],
+                "promedio": rs["mean"],
+                "minimo": rs["min"],
+                "maximo": rs["max"],
+                "suma": rs["mean"] * rs["count"],
+            }
+            if "usuarios" in intencion.metricas:
+                valores["usuarios"] = HyperLogLog.desde_bytes(rs.get("hll")).estimar()
+            return self._formatear("Todas las compras", intencion.metricas, valores, rs["count"])
+
+        if intencion.tipo == "usuario":
+            us = self.fuente_usuario(intencion.user_id, self.config)
+            valores = {
+                "conteo": us["total_rows"],
+                "promedio": us["avg_price"],
+                "minimo": us["min_price"],
+                "maximo": us["max_price"],
+                "suma": us["sum_price"],
+            }
+            return self._formatear(f"Usuario {intencion.user_id}", intencion.metricas, valores, us["total_rows"])
+
+        if self.rag is None:
+            raise ValueError("QueryRouter requiere un 'rag' para responder preguntas abiertas")
+        return self.rag.get_pregunta(pregunta)
+
+    def responder_stream(self, pregunta: str) -> Iterator[str]:
+        """
+            Versión en streaming de `responder`. Los agregados se entregan completos en un 
+            solo fragmento; las preguntas abiertas se entregan token a token desde el RAG.
+
+            Args:
+                pregunta (str): Pregunta en lenguaje natural.
+
+            Yields:
+                str: Fragmentos de la respuesta.
+        """
+        if self.clasificar(pregunta).tipo != "rag":
+            yield self.responder(pregunta)
+            return
+        if self.rag is None:
+            raise ValueError("QueryRouter requiere un 'rag' para responder preguntas abiertas")
+        logger.info(f"Pregunta enrutada como 'rag' (streaming): {pregunta}")
+        yield from self.rag.get_pregunta_stream(pregunta)
+
+    def responder_lote(self, preguntas: List[str], max_workers: int = 4) -> List[Dict[str, Any]]:
+        """
+            Responde un lote de preguntas conservando el orden de entrada. Las preguntas de 
+            agregados se responden una a una (son consultas baratas) y las abiertas se envian 
+            juntas a `rag.get_preguntas` para recuperar en batch y generar concurrentemente.
+
+            Args:
+                preguntas (list[str]): Preguntas en lenguaje natural.
+                max_workers (int): Número máximo de generaciones simultáneas en el RAG.
+
+            Returns:
+                list[dict]: Un registro por pregunta con "pregunta", "ruta", "respuesta",
+                    "latencia_s" y opcionalmente "error".
+        """
+        resultados: List[Dict[str, Any]] = [None] * len(preguntas)
+        abiertas = []
+
+        for i, pregunta in enumerate(preguntas):
+            intencion = self.clasificar(pregunta)
+            if intencion.tipo == "rag":
+                abiertas.append(i)
+                continue
+            inicio = time.perf_counter()
+            registro = {"pregunta": pregunta, "ruta": intencion.tipo}
+            try:
+                registro["respuesta"] = self.responder(pregunta)
+            except Exception as e:
+                registro["respuesta"] = None
+                registro["error"] = str(e)
+            registro["latencia_s"] = time.perf_counter() - inicio
+            resultados[i] = registro
+
+        if abiertas:
+            if self.rag is None:
+                raise ValueError("QueryRouter requiere un 'rag' para responder preguntas abiertas")
+            respuestas = self.rag.get_preguntas([preguntas[i] for i in abiertas], max_workers=max_workers)
+            for i, r in zip(abiertas, respuestas):
+                resultados[i] = {"pregunta": preguntas[i], "ruta": "rag", **r}
+
+        return resultados
+
+    @staticmethod
+    def _formatear(sujeto: str, metricas: List[str], valores: Dict[str, Any], conteo: int) -> str:
+        """
+            Construye la respuesta en texto para un agregado.
+        """
+        if not conteo:
+            return f"{sujeto} → No hay compras registradas."
+        partes = []
+        for m in metricas:
+            valor = valores[m]
+            if m == "conteo":
+                partes.append(f"{ETIQUETAS[m]}: {valor}")
+            elif m == "usuarios":
+                partes.append(f"{ETIQUETAS[m]}: {valor:,.0f}")
+            else:
+                partes.append(f"{ETIQUETAS[m]}: {valor:.2f}")
+        return f"{sujeto} → " + ", ".join(partes)
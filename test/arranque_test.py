@@ -0,0 +1,52 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Raíz del proyecto: los subprocesos importan 'src' y 'config' desde aquí
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Segundos que puede sumar `import src.proceso` al arranque del intérprete
+PRESUPUESTO_S = 0.5
+
+# Módulos que solo deben cargar los comandos que los usan (load, export, llm, bench-*)
+PESADOS = {"pandas", "pyarrow", "langchain_core", "langchain_chroma", "langchain_ollama", "chromadb", "ollama"}
+
+# -----------------------------
+# Helper: mejor tiempo de varias ejecuciones de un script en un intérprete nuevo
+# -----------------------------
+def _tiempo(codigo: str, repeticiones: int = 3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, check=True, capture_output=True)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+# -----------------------------
+# Test de arranque de la CLI
+# -----------------------------
+def test_print_stats_no_importa_modulos_pesados():
+    # print-stats con la consulta a la base de datos simulada
+    codigo = """
+import json, sys
+import src.modulos.db as db
+db.get_running_stats = lambda config, lectura=False: {
+    "count": 2, "mean": 1.5, "min": 1.0, "max": 2.0, "updated_at": None, "stddev": 0.7, "hll": None,
+}
+from click.testing import CliRunner
+from src.proceso import cli
+resultado = CliRunner().invoke(cli, ["print-stats"])
+print(json.dumps({"salida": resultado.output, "modulos": sorted({m.split(".")[0] for m in sys.modules})}))
+"""
+    proceso = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, check=True, capture_output=True, text=True)
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+
+    assert "Conteo=2" in resultado["salida"]
+    assert PESADOS.isdisjoint(resultado["modulos"])
+
+def test_tiempo_de_arranque_dentro_del_presupuesto():
+    base = _tiempo("pass")
+    cli = _tiempo("import src.proceso")
+    assert cli - base < PRESUPUESTO_S, f"import src.proceso tarda {cli - base:.3f}s (presupuesto {PRESUPUESTO_S}s)"
@@ -0,0 +1,85 @@
+import math
+import numpy as np
+import pytest
+
+from src.submodulos.backends import HashEmbeddings, EchoLLM, crear_embeddings, crear_llm
+from src.modulos.benchmark import generar_eventos, vecinos_exactos
+from src.submodulos.llm import configuracion_hnsw
+
+# -----------------------------
+# Test de HashEmbeddings
+# -----------------------------
+def test_hash_embeddings_deterministas():
+    emb = HashEmbeddings(dimension=64)
+    v1 = emb.embed_query("El usuario 9 compró 50 USD")
+    v2 = HashEmbeddings(dimension=64).embed_documents(["El usuario 9 compró 50 USD"])[0]
+    assert v1 == v2
+    assert len(v1) == 64
+    assert math.isclose(sum(x * x for x in v1), 1.0)
+
+def test_hash_embeddings_similitud():
+    emb = HashEmbeddings(dimension=256)
+    base, parecido, distinto = np.asarray(emb.embed_documents([
+        "El usuario 9 realizó una compra por 50 USD",
+        "El usuario 9 realizó una compra por 51 USD",
+        "registro de pgadmin sin relacion",
+    ]))
+    assert base @ parecido > base @ distinto
+
+def test_hash_embeddings_parametros_invalidos():
+    with pytest.raises(ValueError):
+        HashEmbeddings(dimension=0)
+
+# -----------------------------
+# Test de EchoLLM
+# -----------------------------
+def test_echo_llm_invoke_y_stream():
+    llm = EchoLLM(plantilla="eco: {pregunta}")
+    assert llm.invoke("contexto\n¿cuál es el total?") == "eco: ¿cuál es el total?"
+    assert "".join(llm.stream("contexto\nhola mundo")) == "eco: hola mundo"
+
+# -----------------------------
+# Test de las fábricas de backend
+# -----------------------------
+def test_crear_backend_local():
+    config = {"backend": "local", "local": {"dimension": 32}}
+    assert isinstance(crear_embeddings(config), HashEmbeddings)
+    assert crear_embeddings(config).dimension == 32
+    assert isinstance(crear_llm(config), EchoLLM)
+
+def test_crear_backend_invalido():
+    with pytest.raises(ValueError):
+        crear_embeddings({"backend": "otro"})
+    with pytest.raises(ValueError):
+        crear_llm({"backend": "otro"})
+
+# -----------------------------
+# Test de utilidades del benchmark
+# -----------------------------
+def test_generar_eventos_reproducible():
+    df1, df2 = generar_eventos(50, seed=3), generar_eventos(50, seed=3)
+    assert df1.equals(df2)
+    assert list(df1.columns) == ["user_id", "price", "ts", "updated_by"]
+    assert df1["user_id"].between(1, 10).all()
+
+def test_vecinos_exactos():
+    matriz = np.array([[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]])
+    assert list(vecinos_exactos(matriz, np.array([1.0, 0.1]), k=2)) == [0, 2]
+
+def test_vecinos_exactos_segun_espacio():
+    # Coseno ignora la norma; ip la premia; l2 prefiere el punto más cercano
+    matriz = np.array([[1.0, 0.0], [3.0, 3.0], [0.9, 0.5]])
+    consulta = np.array([1.0, 0.5])
+    assert list(vecinos_exactos(matriz, consulta, k=1, space="cosine")) == [2]
+    assert list(vecinos_exactos(matriz, consulta, k=1, space="ip")) == [1]
+    assert list(vecinos_exactos(matriz, np.array([1.2, 0.0]), k=3, space="l2")) == [0, 2, 1]
+    with pytest.raises(ValueError):
+        vecinos_exactos(matriz, consulta, k=1, space="manhattan")
+
+# -----------------------------
+# Test de configuracion_hnsw
+# -----------------------------
+def test_configuracion_hnsw():
+    config = {"hnsw": {"space": "cosine", "M": 32, "ef_construction": 200, "ef_search": None}}
+    assert configuracion_hnsw(config) == {"hnsw": {"space": "cosine", "max_neighbors": 32, "ef_construction": 200}}
+    assert configuracion_hnsw({}) == {}
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from src.modulos.benchmark import (
+    benchmark_componentes, cargar_linea_base, comparar_con_linea_base, configuracion_carga, escribir_csv_eventos,
+    generar_eventos, guardar_linea_base, medir_calibracion, mejor_tiempo, parametros_rendimiento, relativas,
+    VERSION_BASE,
+)
+from src.submodulos.csv_reader import CSVReader
+
+# -----------------------------
+# Fixture: configuración mínima de lectura y parámetros pequeños
+# -----------------------------
+CONFIG = {
+    "CSV": {"separadores": ",", "usecols": ["user_id", "price", "timestamp"], "usar_chunk": True},
+    "SQL": {"ventana": {"bucket_s": 3600, "buckets": 720}},
+    "BENCHMARK": {"filas": 2000, "chunksize": 500, "repeticiones": 1, "e2e": {"archivos": 1, "filas": 100}},
+}
+
+# -----------------------------
+# Test de la comparación con la línea base
+# -----------------------------
+def test_comparar_estados_por_metrica():
+    base = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0}
+    actual = {"a": 1.2, "b": 1.5, "c": 0.5, "e": 2.0}
+    resultados = {r["metrica"]: r for r in comparar_con_linea_base(actual, base, 0.3, {"b": 0.6})}
+
+    assert resultados["a"]["estado"] == "ok" and resultados["a"]["delta"] == pytest.approx(0.2)
+    # Tolerancia propia de la métrica
+    assert resultados["b"]["estado"] == "ok" and resultados["b"]["tolerancia"] == 0.6
+    assert resultados["c"]["estado"] == "mejora"
+    assert resultados["d"]["estado"] == "omitida" and resultados["d"]["actual"] is None
+    assert resultados["e"]["estado"] == "nueva" and resultados["e"]["delta"] is None
+    assert [r["estado"] for r in comparar_con_linea_base({"a": 1.31}, {"a": 1.0}, 0.3)] == ["regresion"]
+
+def test_relativas_a_la_calibracion():
+    # La misma carga en una máquina el doble de lenta: los cocientes no cambian
+    base = relativas({"calibracion": 0.05, "lectura": 0.1, "carga.e2e": 2.0})
+    actual = relativas({"calibracion": 0.1, "lectura": 0.2, "carga.e2e": 4.0})
+    assert base == pytest.approx({"lectura": 2.0, "carga.e2e": 40.0}) and actual == pytest.approx(base)
+    assert [r["estado"] for r in comparar_con_linea_base(actual, base, 0.3)] == ["ok", "ok"]
+    with pytest.raises(KeyError):
+        relativas({"lectura": 0.1})
+
+def test_linea_base_versionada(tmp_path):
+    path = tmp_path / "base.json"
+    parametros = parametros_rendimiento(CONFIG)
+    guardar_linea_base(path, {"calibracion": 0.05, "lectura": 0.1234567891}, parametros, configuracion_carga(CONFIG))
+
+    datos = cargar_linea_base(path, parametros)
+    assert datos["version"] == VERSION_BASE and datos["metricas"] == {"calibracion": 0.05, "lectura": 0.123457}
+    assert {"python", "cpu", "cpus", "memoria_gib"} <= set(datos["entorno"])
+    assert datos["configuracion"] == {"mode": "chunk", "page_size": None, "particionado": False, "compacto": False, "dtypes": None}
+
+    # Otros parámetros: las métricas no son comparables
+    with pytest.raises(ValueError, match="filas"):
+        cargar_linea_base(path, {**parametros, "filas": 10})
+    datos["version"] = VERSION_BASE + 1
+    path.write_text(json.dumps(datos))
+    with pytest.raises(ValueError, match="versión"):
+        cargar_linea_base(path, parametros)
+
+    # Sin calibración las métricas no se pueden comparar entre máquinas
+    guardar_linea_base(path, {"lectura": 0.1}, parametros)
+    with pytest.raises(ValueError, match="calibracion"):
+        cargar_linea_base(path, parametros)
+
+# -----------------------------
+# Test de los datos y micro-benchmarks
+# -----------------------------
+def test_csv_sintetico_con_formato_de_entrada(tmp_path):
+    path = escribir_csv_eventos(generar_eventos(10, seed=2), tmp_path / "eventos.csv")
+    df = CSVReader(config=CONFIG).run(path, 100).get_chunk()
+    assert list(df.columns) == ["timestamp", "price", "user_id"] and len(df) == 10
+    assert df["timestamp"].str.match(r"\d{2}/\d{2}/2012").all()
+
+def test_mejor_tiempo_no_cuenta_la_preparacion():
+    llamadas = []
+    mejor = mejor_tiempo(lambda: llamadas.append("medida"), 2, preparar=lambda: llamadas.append("preparar"))
+    # Una corrida de calentamiento más las repeticiones, cada una precedida por preparar()
+    assert llamadas == ["preparar", "medida"] * 3 and mejor < 0.01
+
+def test_calibracion():
+    assert medir_calibracion(parametros_rendimiento(CONFIG))["calibracion"] > 0
+
+def test_benchmark_componentes_mide_todas_las_metricas():
+    metricas = benchmark_componentes(CONFIG, parametros_rendimiento(CONFIG))
+    assert set(metricas) == {
+        "lectura", "limpieza_df", "validacion", "running_stats.update_one", "running_stats.chunk", "ventana.update_batch",
+    }
+    assert all(segundos > 0 for segundos in metricas.values())
@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+
+import pytest
+
+from src.modulos import cola
+from src.modulos.cola import WorkerCola
+from src.modulos.stats import RunningStats, WindowedStats
+
+# -----------------------------
+# Fixture: cola y base de datos simuladas
+# -----------------------------
+class FakeConn:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    for nombre in ("a.csv", "b.csv", "validation.csv"):
+        (tmp_path / nombre).write_text("timestamp,price,user_id\n1/1/2012,10,1\n")
+
+    estado = {"pendientes": [], "completados": [], "fallidos": [], "merges": [], "lease_propio": True}
+    conn = FakeConn()
+
+    def encolar(nombres, config):
+        estado["pendientes"].extend(sorted(nombres))
+
+    def reclamar(worker, config):
+        return (estado["pendientes"].pop(0), 1) if estado["pendientes"] else None
+
+    def cargar(path, mode, chunksize, config, conn):
+        if path.name in estado.get("con_error", ()):
+            raise ValueError("archivo corrupto")
+        rs = RunningStats()
+        rs.update_one(10.0)
+        return 1, rs, WindowedStats()
+
+    def completar(nombre, worker, filas, config, conn):
+        if estado["lease_propio"]:
+            estado["completados"].append(nombre)
+        return estado["lease_propio"]
+
+    monkeypatch.setattr(cola, "iter_csv_files", lambda config, include_validation: sorted(tmp_path.glob("[ab].csv")))
+    monkeypatch.setattr(cola, "conexion", contextmanager(lambda config: (yield conn)))
+    monkeypatch.setattr(cola, "encolar_archivos", encolar)
+    monkeypatch.setattr(cola, "reclamar_archivo", reclamar)
+    monkeypatch.setattr(cola, "estado_cola", lambda config: (len(estado["pendientes"]), 0))
+    monkeypatch.setattr(cola, "cargar_archivo_en_transaccion", cargar)
+    monkeypatch.setattr(cola, "completar_archivo", completar)
+    monkeypatch.setattr(cola, "fallar_archivo", lambda nombre, worker, error, config: estado["fallidos"].append(nombre))
+    monkeypatch.setattr(cola, "merge_running_stats", lambda *args, m2, hll: estado["merges"].append(args[:4] + (m2,)))
+    monkeypatch.setattr(cola, "persist_windowed_stats", lambda ventana, config, conn: None)
+    monkeypatch.setattr(cola, "limpiar_caches", lambda: None)
+
+    config = {"CSV": {"CSV_DIR": str(tmp_path)}, "SQL": {"cola": {"heartbeat_s": 60, "espera_s": 0}}}
+    return estado, conn, config
+
+# -----------------------------
+# Test del ciclo del worker
+# -----------------------------
+def test_worker_procesa_la_cola_hasta_vaciarla(entorno):
+    estado, conn, config = entorno
+    resumen = WorkerCola(config, worker_id="w1").ejecutar()
+
+    assert resumen == {"completados": 2, "fallidos": 0, "filas": 2}
+    assert estado["completados"] == ["a.csv", "b.csv"]
+    # Cada archivo fusiona sus estadísticas y confirma en su propia transacción
+    assert estado["merges"] == [(1, 10.0, 10.0, 10.0, 0.0)] * 2
+    assert conn.commits == 2 and conn.rollbacks == 0
+
+def test_lease_perdido_revierte_la_carga(entorno):
+    estado, conn, config = entorno
+    estado["lease_propio"] = False
+    resumen = WorkerCola(config, worker_id="w1").ejecutar()
+
+    assert resumen["completados"] == 0 and resumen["fallidos"] == 2
+    assert estado["merges"] == [] and conn.commits == 0 and conn.rollbacks == 2
+    # Perder el lease no cuenta como intento fallido: el archivo es de otro worker
+    assert estado["fallidos"] == []
+
+def test_error_de_carga_marca_el_archivo(entorno):
+    estado, conn, config = entorno
+    estado["con_error"] = {"a.csv"}
+    resumen = WorkerCola(config, worker_id="w1").ejecutar()
+
+    assert resumen == {"completados": 1, "fallidos": 1, "filas": 1}
+    assert estado["fallidos"] == ["a.csv"]
+    assert estado["completados"] == ["b.csv"]
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Los logs de los tests (y de los subprocesos que lanzan, que heredan el entorno) van a un
+# directorio temporal en lugar de config/logs. Se fija antes de importar los módulos del
+# proyecto: cada uno crea su logger al importarse.
+os.environ.setdefault("PIPELINE_LOG_DIR", tempfile.mkdtemp(prefix="pipeline_logs_"))
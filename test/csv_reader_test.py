@@ -67,7 +67,7 @@ def test_run_with_chunksize(mock_read_csv, csv_config):
     mock_read_csv.return_value = mock_df
 
     result = reader.run(file_path=file_path, chunksize=2)
-    mock_read_csv.assert_called_once_with(file_path, sep=",", usecols=["col1","col2"], chunksize=2)
+    mock_read_csv.assert_called_once_with(file_path, sep=",", usecols=["col1","col2"], dtype=None, chunksize=2)
     assert result == mock_df
 
 # -----------------------------
@@ -82,5 +82,57 @@ def test_run_without_chunksize(mock_read_csv, csv_config):
     mock_read_csv.return_value = mock_df
 
     result = reader.run(file_path=file_path)
-    mock_read_csv.assert_called_once_with(file_path, sep=",", usecols=["col1","col2"])
+    mock_read_csv.assert_called_once_with(file_path, sep=",", usecols=["col1","col2"], dtype=None)
     assert result.equals(mock_df)
+
+# -----------------------------
+# Test tipos al leer ('dtypes'): texto repetido como category
+# -----------------------------
+def test_run_con_dtypes_reduce_memoria(tmp_path):
+    file_path = tmp_path / "eventos.csv"
+    file_path.write_text("timestamp,price,user_id\n" + "".join(f"1/{i % 28 + 1}/2012,{i},{i % 7}\n" for i in range(2000)))
+    config = {"CSV": {"separadores": ",", "usecols": ["timestamp", "price", "user_id"], "usar_chunk": False}}
+    sin_tipos = CSVReader(config).run(str(file_path))
+    config["CSV"]["dtypes"] = {"timestamp": "category"}
+    reader = CSVReader(config)
+    con_tipos = reader.run(str(file_path))
+
+    assert con_tipos["timestamp"].dtype == "category"
+    assert con_tipos["timestamp"].astype(str).equals(sin_tipos["timestamp"])
+    assert con_tipos.memory_usage(deep=True).sum() * 3 < sin_tipos.memory_usage(deep=True).sum()
+    # La estimación para el presupuesto de memoria usa los mismos tipos
+    assert reader.estimar_bytes_por_fila(str(file_path)) * 3 < CSVReader({"CSV": {**config["CSV"], "dtypes": None}}).estimar_bytes_por_fila(str(file_path))
+
+# -----------------------------
+# Test lectura de CSV comprimidos (gzip, bz2, zstd) por chunks
+# -----------------------------
+@pytest.mark.parametrize("extension", [".gz", ".bz2", ".zst"])
+@pytest.mark.parametrize("anticipada", [True, False])
+def test_run_comprimido(tmp_path, extension, anticipada):
+    import gzip, bz2, zstandard
+    contenido = "col1,col2\n" + "".join(f"{i},{i * 2}\n" for i in range(10))
+    file_path = tmp_path / f"datos.csv{extension}"
+    comprimir = {
+        ".gz": gzip.compress,
+        ".bz2": bz2.compress,
+        ".zst": lambda b: zstandard.ZstdCompressor().compress(b),
+    }[extension]
+    file_path.write_bytes(comprimir(contenido.encode()))
+
+    config = {"CSV": {"usecols": ["col1", "col2"], "usar_chunk": True, "lectura_anticipada": anticipada, "bloque_bytes": 16}}
+    chunks = list(CSVReader(config).run(file_path=str(file_path), chunksize=4))
+    assert [len(c) for c in chunks] == [4, 4, 2]
+    assert pd.concat(chunks)["col2"].tolist() == [i * 2 for i in range(10)]
+
+    config["CSV"]["usar_chunk"] = False
+    assert len(CSVReader(config).run(file_path=str(file_path))) == 10
+
+def test_lectura_anticipada_cierre_anticipado(tmp_path):
+    import gzip
+    file_path = tmp_path / "datos.csv.gz"
+    file_path.write_bytes(gzip.compress(("col1,col2\n" + "1,2\n" * 1000).encode()))
+    config = {"CSV": {"usecols": ["col1", "col2"], "usar_chunk": True, "bloque_bytes": 8, "bloques_en_cola": 1}}
+    chunks = CSVReader(config).run(file_path=str(file_path), chunksize=10)
+    assert len(next(chunks)) == 10
+    # Cerrar el iterador a mitad del archivo detiene el hilo de descompresión sin bloquearse
+    chunks.close()
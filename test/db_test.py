@@ -0,0 +1,338 @@
+import datetime as dt
+import pandas as pd
+import pytest
+
+from src.modulos import db
+from src.modulos.db import (
+    meses_de_ts, asegurar_particiones, fetch_db_stats, get_query, filas_compactas,
+    a_marcadores_posicionales, ejecutar_preparada, esquema_temporal, FilasChunk, insert_events,
+    reclamar_archivo, estado_cola, get_running_stats, get_windowed_stats, reiniciar_esquema
+)
+
+# -----------------------------
+# Cursor falso que registra las queries ejecutadas
+# -----------------------------
+class FakeCursor:
+    def __init__(self):
+        self.ejecutadas = []
+
+    def execute(self, query, params=None):
+        self.ejecutadas.append(params)
+
+    def fetchone(self):
+        return (f"events_{self.ejecutadas[-1][0]:%Y_%m}",)
+
+class FakeConn:
+    """ Conexión falsa para get_conn: guarda las queries y devuelve una fila fija. """
+    def __init__(self):
+        self.queries = []
+        self.closed = False
+        self.readonly = False
+
+    def set_session(self, readonly=False):
+        self.readonly = readonly
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+
+    def fetchone(self):
+        return (4, 25.0, 10.0, 40.0)
+
+# -----------------------------
+# Test de meses_de_ts
+# -----------------------------
+def test_meses_de_ts_utc():
+    ts = [
+        pd.Timestamp("2012-01-10", tz="UTC"),
+        pd.Timestamp("2012-01-31 23:00", tz="UTC"),
+        # 2012-02-01 01:00 en Bogotá ya es febrero en UTC
+        pd.Timestamp("2012-01-31 21:00", tz="America/Bogota"),
+    ]
+    assert meses_de_ts(ts) == {dt.date(2012, 1, 1), dt.date(2012, 2, 1)}
+    # La columna de un chunk limpio
+    assert meses_de_ts(pd.Series(pd.to_datetime(["2012-03-05", "2012-12-31"], utc=True))) == {dt.date(2012, 3, 1), dt.date(2012, 12, 1)}
+
+# -----------------------------
+# Test de asegurar_particiones
+# -----------------------------
+def test_asegurar_particiones_usa_cache(monkeypatch):
+    monkeypatch.setattr(db, "_particiones_creadas", set())
+    config = {"query_particion": "SELECT crear_particion_mes(%s);"}
+    meses = {dt.date(2012, 3, 1)}
+
+    cur = FakeCursor()
+    asegurar_particiones(cur, meses, config)
+    asegurar_particiones(cur, meses, config)
+    # La segunda llamada no vuelve a ir a la base de datos
+    assert cur.ejecutadas == [(dt.date(2012, 3, 1),)]
+
+# -----------------------------
+# Test de fetch_db_stats
+# -----------------------------
+def test_fetch_db_stats_elige_query(monkeypatch):
+    conn = FakeConn()
+    monkeypatch.setattr(db, "get_conn", lambda: conn)
+    config = {"SQL": {"query_stats": "agg", "query_stats_exacto": "exacto", "query_stats_rango": "rango"}}
+
+    stats = fetch_db_stats(config)
+    fetch_db_stats(config, exacto=True)
+    fetch_db_stats(config, desde=dt.datetime(2012, 1, 1, tzinfo=dt.timezone.utc))
+
+    assert conn.queries == ["agg", "exacto", "rango"]
+    assert stats == {"total_rows": 4, "avg_price": 25.0, "min_price": 10.0, "max_price": 40.0}
+    # Sin réplica configurada las lecturas van al primario, en modo solo lectura
+    assert conn.readonly
+
+def test_lecturas_no_preparan_sentencias(monkeypatch):
+    from contextlib import contextmanager
+
+    class ConnPreparada(FakeConn):
+        preparadas = set()
+        @property
+        def connection(self):
+            return self
+        def fetchone(self):
+            return (2, 1.5, 1.0, 2.0, None, 0.5, 0.0, 0.0, None)
+        def fetchall(self):
+            return []
+
+    conn = ConnPreparada()
+    monkeypatch.setattr(db, "conexion_lectura", contextmanager(lambda config: (yield conn)))
+    config = {"SQL": {"query_running": "SELECT running", "query_ventana": "SELECT ventana"}}
+
+    assert get_running_stats(config, lectura=True)["count"] == 2
+    assert get_windowed_stats(config, lectura=True) == []
+    # Una consulta por conexión: el texto va directo, sin PREPARE / EXECUTE
+    assert conn.queries == ["SELECT running", "SELECT ventana"] and not conn.preparadas
+
+# -----------------------------
+# Test de la réplica de lectura
+# -----------------------------
+class FakeReplica(FakeConn):
+    """ Réplica falsa: 'query_retraso_replica' devuelve el retraso indicado. """
+    def __init__(self, retraso):
+        super().__init__()
+        self.retraso = retraso
+
+    def fetchone(self):
+        return (self.retraso,)
+
+LECTURA = {"lectura": {"host": "replica", "port": 5433, "max_retraso_s": 30}, "query_retraso_replica": "retraso"}
+
+def _conectar(monkeypatch, replica):
+    primario = FakeConn()
+    monkeypatch.setattr(db, "get_conn", lambda: primario)
+    parametros = {}
+    def connect(**kwargs):
+        parametros.update(kwargs)
+        if isinstance(replica, Exception):
+            raise replica
+        return replica
+    monkeypatch.setattr(db.psycopg2, "connect", connect)
+    return primario, parametros
+
+def test_lectura_usa_replica_al_dia(monkeypatch):
+    replica = FakeReplica(2.5)
+    primario, parametros = _conectar(monkeypatch, replica)
+    assert db.get_conn_lectura(LECTURA) is replica
+    assert replica.readonly and replica.queries == ["retraso"]
+    assert (parametros["host"], parametros["port"], parametros["connect_timeout"]) == ("replica", 5433, 3)
+
+def test_lectura_vuelve_al_primario_si_la_replica_esta_atrasada(monkeypatch):
+    replica = FakeReplica(120.0)
+    primario, _ = _conectar(monkeypatch, replica)
+    assert db.get_conn_lectura(LECTURA) is primario
+    assert replica.closed and primario.readonly
+
+def test_lectura_vuelve_al_primario_si_la_replica_no_aplico_transacciones(monkeypatch):
+    primario, _ = _conectar(monkeypatch, FakeReplica(None))
+    assert db.get_conn_lectura(LECTURA) is primario
+
+def test_lectura_vuelve_al_primario_si_la_replica_no_responde(monkeypatch):
+    primario, _ = _conectar(monkeypatch, db.psycopg2.OperationalError("timeout"))
+    with db.conexion_lectura(LECTURA) as conn:
+        assert conn is primario
+    # La conexión de lectura se cierra al salir
+    assert primario.closed
+
+def test_lectura_sin_limite_de_retraso(monkeypatch):
+    replica = FakeReplica(3600.0)
+    _conectar(monkeypatch, replica)
+    config = {**LECTURA, "lectura": {"host": "replica", "port": 5433, "max_retraso_s": None}}
+    assert db.get_conn_lectura(config) is replica
+
+# -----------------------------
+# Test del almacenamiento compacto
+# -----------------------------
+def test_get_query_variante_compacta():
+    config = {"query_llm": "base", "query_llm_compacto": "vista", "query_stats": "stats"}
+    assert get_query(config, "query_llm") == "base"
+    config["compacto"] = True
+    assert get_query(config, "query_llm") == "vista"
+    # Sin variante '_compacto' se usa la query base
+    assert get_query(config, "query_stats") == "stats"
+
+def test_filas_compactas(monkeypatch):
+    monkeypatch.setattr(db, "_usuarios_carga", {"root": 1})
+
+    class CursorUsuarios:
+        def __init__(self):
+            self.consultados = []
+        def execute(self, query, params):
+            self.consultados.append(params[0])
+        def fetchone(self):
+            return (2,)
+
+    cur = CursorUsuarios()
+    ts = pd.Timestamp("2012-01-10", tz="UTC")
+    rows = [("9", 50, ts, "root"), (7, 20.5, ts, "etl")]
+    assert filas_compactas(cur, rows, {"query_usuario_carga": "q"}) == [(9, 50.0, ts, 1), (7, 20.5, ts, 2)]
+    # Solo se consulta el usuario que no estaba en caché
+    assert cur.consultados == ["etl"]
+
+def test_filas_compactas_sobre_el_chunk(monkeypatch):
+    monkeypatch.setattr(db, "_usuarios_carga", {"root": 1})
+
+    class CursorUsuarios:
+        def execute(self, query, params):
+            self.consultado = params[0]
+        def fetchone(self):
+            return (2,)
+
+    ts = pd.to_datetime(["2012-01-10", "2012-01-11", "2012-01-12"], utc=True)
+    df = pd.DataFrame({
+        "user_id": pd.array([9, 7, 9], dtype="int32"), "price": [50.0, 20.5, 1.0], "ts": ts,
+        "updated_by": pd.Categorical(["etl", "root", "etl"]),
+    })
+    filas = filas_compactas(CursorUsuarios(), FilasChunk(df), {"query_usuario_carga": "q"})
+
+    # Sigue siendo una secuencia por páginas, con el id en lugar del nombre
+    assert isinstance(filas, FilasChunk) and str(filas.df["updated_by"].dtype) == "int16"
+    assert filas[0:3] == [(9, 50.0, ts[0], 2), (7, 20.5, ts[1], 1), (9, 1.0, ts[2], 2)]
+
+@pytest.mark.parametrize("sql", [{"compacto": True}, {"particionado": True}, {"compacto": True, "particionado": True}])
+def test_insert_events_por_paginas_compacto_y_particionado(monkeypatch, sql):
+    monkeypatch.setattr(db, "_usuarios_carga", {"etl": 3})
+    monkeypatch.setattr(db, "_particiones_creadas", set())
+    paginas, particiones = [], []
+    monkeypatch.setattr(db, "ejecutar_preparada", lambda cur, nombre, config, params: paginas.append(params))
+    monkeypatch.setattr(db, "asegurar_particiones", lambda cur, meses, config: particiones.append(meses))
+    # Ni la compactación ni los meses pueden armar las tuplas de todo el chunk
+    monkeypatch.setattr(FilasChunk, "__iter__", lambda self: pytest.fail("se recorrieron todas las filas"))
+
+    ts = pd.to_datetime(["2012-01-10", "2012-02-11", "2012-02-12"], utc=True)
+    df = pd.DataFrame({
+        "user_id": pd.array([9, 7, 9], dtype="int32"), "price": [50.0, 20.5, 1.0], "ts": ts,
+        "updated_by": pd.Categorical(["etl"] * 3),
+    })
+    config = {"SQL": {"page_size": 2, **sql}}
+    assert insert_events(FilasChunk(df), config, conn=FakeConn()) == 3
+
+    usuario = 3 if sql.get("compacto") else "etl"
+    assert paginas == [([9, 7], [50.0, 20.5], list(ts[:2]), [usuario] * 2), ([9], [1.0], [ts[2]], [usuario])]
+    assert particiones == ([{dt.date(2012, 1, 1), dt.date(2012, 2, 1)}] if sql.get("particionado") else [])
+
+# -----------------------------
+# Test de las sentencias preparadas
+# -----------------------------
+def test_marcadores_posicionales():
+    assert a_marcadores_posicionales("UPDATE t SET a=%s, b=%s WHERE id=1;\n") == ("UPDATE t SET a=$1, b=$2 WHERE id=1", [None, None])
+    # Un mismo nombre reutiliza su parámetro; '%%' es un '%' literal
+    texto, nombres = a_marcadores_posicionales("SELECT %(n)s + %(m)s, %(n)s % 2, '100%%'")
+    assert texto == "SELECT $1 + $2, $1 % 2, '100%'"
+    assert nombres == ["n", "m"]
+
+class CursorPreparado:
+    """ Cursor falso de una conexión con registro de sentencias preparadas. """
+    def __init__(self):
+        self.connection = type("Conexion", (), {"preparadas": set()})()
+        self.ejecutadas = []
+
+    def execute(self, query, params=None):
+        self.ejecutadas.append((query, params))
+
+def test_ejecutar_preparada_prepara_una_vez_por_conexion():
+    config = {"query_merge_running": "UPDATE r SET c = c + %(count)s, m = %(mean)s / (c + %(count)s)"}
+    cur = CursorPreparado()
+    ejecutar_preparada(cur, "query_merge_running", config, {"mean": 2.5, "count": 4})
+    ejecutar_preparada(cur, "query_merge_running", config, {"mean": 1.0, "count": 1})
+
+    assert cur.ejecutadas == [
+        ("PREPARE query_merge_running AS UPDATE r SET c = c + $1, m = $2 / (c + $1)", None),
+        ("EXECUTE query_merge_running (%s, %s)", (4, 2.5)),
+        ("EXECUTE query_merge_running (%s, %s)", (1, 1.0)),
+    ]
+    # Otra conexión prepara su propia copia
+    otro = CursorPreparado()
+    ejecutar_preparada(otro, "query_merge_running", config, {"mean": 1.0, "count": 1})
+    assert otro.ejecutadas[0][0].startswith("PREPARE")
+
+def test_ejecutar_preparada_variante_compacta_y_sin_registro():
+    config = {"compacto": True, "insert_query": "base %s", "insert_query_compacto": "compacta %s"}
+    cur = CursorPreparado()
+    ejecutar_preparada(cur, "insert_query", config, ([1],))
+    assert cur.ejecutadas[0][0] == "PREPARE insert_query_compacto AS compacta $1"
+
+    # Sin registro de sentencias se ejecuta el texto de la query
+    simple = FakeCursor()
+    ejecutar_preparada(simple, "insert_query", config, ([1],))
+    assert simple.ejecutadas == [([1],)]
+
+# -----------------------------
+# Test del esquema desechable de perf-check
+# -----------------------------
+def test_esquema_temporal_fija_search_path_y_lo_elimina(monkeypatch):
+    conexiones = []
+    class ConnEsquema(FakeConn):
+        def __init__(self):
+            super().__init__()
+            self.pgoptions = db.os.environ.get("PGOPTIONS")
+            conexiones.append(self)
+
+        def commit(self):
+            pass
+
+    monkeypatch.setattr(db, "get_conn", ConnEsquema)
+    monkeypatch.setattr(db, "init_db", lambda config: conexiones.append("init_db"))
+    monkeypatch.setenv("PGOPTIONS", "-c statement_timeout=0")
+    config = {"SQL": {"query_crear_esquema": "CREATE SCHEMA {esquema}", "query_borrar_esquema": "DROP SCHEMA {esquema}"}}
+
+    with esquema_temporal(config, "perf_check_1") as esquema:
+        assert db.os.environ["PGOPTIONS"] == "-c statement_timeout=0 -c search_path=perf_check_1"
+        reiniciar_esquema(config, esquema)
+
+    crear, init, borrar = conexiones
+    assert init == "init_db" and db.os.environ["PGOPTIONS"] == "-c statement_timeout=0"
+    assert crear.pgoptions.endswith("search_path=perf_check_1")
+    assert "Identifier('perf_check_1')" in repr(crear.queries[0]) and "CREATE SCHEMA" in repr(crear.queries[0])
+    assert "DROP SCHEMA" in repr(borrar.queries[0])
+
+# -----------------------------
+# Test de las operaciones de la cola
+# -----------------------------
+def test_cola_usa_conexiones_del_pool(monkeypatch):
+    from contextlib import contextmanager
+    conn = FakeConn()
+    prestadas = []
+    monkeypatch.setattr(db, "conexion", contextmanager(lambda config: (yield prestadas.append(config) or conn)))
+    monkeypatch.setattr(db, "get_conn", lambda: pytest.fail("conexión nueva fuera del pool"))
+    config = {"SQL": {"query_reclamar": "reclamar", "query_estado_cola": "estado", "cola": {"max_intentos": 2}}}
+
+    assert reclamar_archivo("w1", config) == (4, 25.0, 10.0, 40.0)
+    assert estado_cola(config) == (4, 25.0)
+    assert conn.queries == ["reclamar", "estado"] and prestadas == [config["SQL"]] * 2
@@ -2,7 +2,7 @@ import pytest
 from pathlib import Path
 from unittest.mock import patch
 from pathlib import Path
-from src.modulos.ingesta import iter_csv_files, load_running_stats_from_db, persist_running_stats
+from src.modulos.ingesta import iter_csv_files, load_running_stats_from_db, persist_running_stats, formato_entrada, FilasChunk
 from src.modulos.stats import RunningStats
 
 from typing import Dict, Any
@@ -14,9 +14,12 @@ from typing import Dict, Any
 @pytest.fixture
 def csv_config(tmp_path):
     # Crear archivos CSV de ejemplo
-    archivos = ["2012-1.csv", "2012-2.csv", "2012-3.csv", "validacion.csv"]
+    archivos = ["2012-1.csv", "2012-2.csv", "2012-3.csv", "2012-4.parquet", "2012-5.csv.gz", "2012-6.csv.zst", "validacion.csv"]
     for archivo in archivos:
         (tmp_path / archivo).write_text("col1,col2\n1,2\n3,4")
+    # Archivos con otras extensiones se ignoran
+    (tmp_path / "notas.txt").write_text("ignorar")
+    (tmp_path / "notas.txt.gz").write_text("ignorar")
     
     # Config simulando archivo config.yaml
     config: Dict[str, Any] = {
@@ -44,6 +47,17 @@ def test_iter_csv_files_exclude_validation(csv_config):
     expected_files = sorted([Path(config["CSV"]["CSV_DIR"]) / f for f in archivos if f != "validacion.csv"])
     assert result == expected_files
 
+# ----------------------------
+# Test de formato_entrada
+# ----------------------------
+def test_formato_entrada():
+    assert formato_entrada(Path("2012-1.csv")) == ".csv"
+    assert formato_entrada(Path("2012-1.CSV.GZ")) == ".csv"
+    assert formato_entrada(Path("2012-1.csv.bz2")) == ".csv"
+    assert formato_entrada(Path("2012-1.parquet")) == ".parquet"
+    assert formato_entrada(Path("2012-1.parquet.gz")) is None
+    assert formato_entrada(Path("datos.gz")) is None
+
 # ----------------------------
 # Test de load_running_stats_from_db
 # ----------------------------
@@ -71,4 +85,74 @@ def test_persist_running_stats(mock_update_rs):
     
     persist_running_stats(rs, config)
     
-    mock_update_rs.assert_called_once_with(3, 2.0, 1.0, 3.0, config)
+    mock_update_rs.assert_called_once_with(3, 2.0, 1.0, 3.0, config, m2=0.0, mean_c=0.0, m2_c=0.0, hll=rs.usuarios.a_bytes())
+
+# ----------------------------
+# Test de FilasChunk
+# ----------------------------
+def test_filas_chunk_arma_tuplas_por_pagina():
+    import pandas as pd
+    df = pd.DataFrame({
+        "ts": pd.to_datetime(["2012-01-01", "2012-01-02", "2012-01-03"], utc=True),
+        "user_id": pd.array([1, 2, 3], dtype="int32"),
+        "price": [1.5, 2.5, 3.5],
+        "updated_by": pd.Categorical(["etl"] * 3),
+        "archivo": ["a.csv"] * 3,
+    }, index=[5, 7, 9])
+    filas = FilasChunk(df)
+    esperadas = list(df[["user_id", "price", "ts", "updated_by"]].itertuples(index=False, name=None))
+
+    assert len(filas) == 3 and list(filas) == esperadas
+    assert filas[1:3] == esperadas[1:3] and filas[0] == esperadas[0]
+    # Las columnas por página que arma insertar_por_columnas
+    assert [list(c) for c in zip(*filas[0:2])] == [[1, 2], [1.5, 2.5], list(df["ts"][:2]), ["etl", "etl"]]
+
+# ----------------------------
+# Test de ingest_files_coalesced
+# ----------------------------
+def test_ingest_files_coalesced_agrupa_archivos(tmp_path, monkeypatch):
+    from contextlib import contextmanager
+    from src.modulos import ingesta
+    from src.modulos.stats import WindowedStats
+
+    (tmp_path / "a.csv").write_text("timestamp,price,user_id\n1/1/2012,10,1\n1/2/2012,20,2\n")
+    (tmp_path / "b.csv").write_text("timestamp,price,user_id\n1/3/2012,,3\n1/4/2012,40,4\n")
+    (tmp_path / "c.csv").write_text("timestamp,price,user_id\n1/5/2012,50,5\n1/6/2012,60,6\n1/7/2012,70,7\n")
+    (tmp_path / "d.csv").write_text("timestamp,price,user_id\n")
+
+    inserciones, lotes = [], []
+    monkeypatch.setattr(ingesta, "conexion", contextmanager(lambda config: (yield None)))
+    monkeypatch.setattr(ingesta, "insert_events", lambda rows, config, conn, meses=None: inserciones.append(len(rows)) or len(rows))
+    monkeypatch.setattr(ingesta, "insert_cuarentena", lambda rows, config, conn: None)
+    monkeypatch.setattr(ingesta, "registrar_archivos", lambda conteos, config, conn: lotes.append(conteos) or len(lotes))
+    monkeypatch.setattr(ingesta, "load_running_stats_from_db", lambda config: RunningStats())
+    monkeypatch.setattr(ingesta, "load_windowed_stats_from_db", lambda config: WindowedStats())
+    monkeypatch.setattr(ingesta, "persist_running_stats", lambda rs, config: None)
+    monkeypatch.setattr(ingesta, "persist_windowed_stats", lambda ventana, config: None)
+
+    config = {"CSV": {"usar_chunk": True, "usecols": ["user_id", "price", "timestamp"]}, "SQL": {}}
+    paths = sorted(tmp_path.glob("*.csv"))
+    total = ingesta.ingest_files_coalesced(paths, "chunk", config, filas_lote=4)
+
+    # a y b completan el primer lote; c y el archivo vacío van en el segundo
+    assert inserciones == [3, 3]
+    assert lotes == [{"a.csv": [2, 0], "b.csv": [1, 1]}, {"c.csv": [3, 0], "d.csv": [0, 0]}]
+    assert total == {"a.csv": [2, 0], "b.csv": [1, 1], "c.csv": [3, 0], "d.csv": [0, 0]}
+
+# ----------------------------
+# Test de leer_chunks con presupuesto de memoria
+# ----------------------------
+def test_leer_chunks_ajusta_al_presupuesto(tmp_path, monkeypatch):
+    from src.modulos import ingesta, memoria
+
+    (tmp_path / "a.csv").write_text("timestamp,price,user_id\n" + "1/1/2012,10,1\n" * 100)
+    config = {"CSV": {"usar_chunk": False, "usecols": ["user_id", "price", "timestamp"]}}
+
+    # Sin presupuesto y sin 'usar_chunk' el archivo completo es un único chunk
+    assert [len(c) for c in ingesta.leer_chunks(tmp_path / "a.csv", 40, config)] == [100]
+
+    # Presupuesto para 30 filas de 100 bytes con su memoria de trabajo
+    monkeypatch.setattr(memoria, "rss_actual", lambda: 0)
+    config["CSV"]["max_memoria"] = 30 * 100 * memoria.FACTOR_TRABAJO
+    tamanos = [len(c) for c in ingesta.leer_chunks(tmp_path / "a.csv", 40, config, bytes_por_fila=100.0)]
+    assert tamanos == [30, 30, 30, 10]
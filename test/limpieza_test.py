@@ -41,6 +41,13 @@ def test_cambiar_tipo_fecha(sample_df):
     assert pd.api.types.is_datetime64_any_dtype(df_clean['fecha'])
     assert df_clean['fecha'].isnull().sum() == 1  
 
+def test_cambiar_tipo_fecha_categorica(sample_df):
+    # Leída como category: mismo resultado, convirtiendo cada fecha distinta una vez
+    esperado = limpieza_df(sample_df.copy()).cambiar_tipo_fecha(['fecha']).resultado()['fecha']
+    df = sample_df.astype({'fecha': 'category'})
+    df_clean = limpieza_df(df).cambiar_tipo_fecha(['fecha']).resultado()
+    assert df_clean['fecha'].equals(esperado)
+
 # ----------------------------
 # Test de renombrar_columnas
 # ----------------------------
@@ -57,3 +64,15 @@ def test_resultado(sample_df):
     result = obj.resultado()
     assert isinstance(result, pd.DataFrame)
     assert result.equals(sample_df)
+
+# ----------------------------
+# Test de reducir_tipos
+# ----------------------------
+def test_reducir_tipos():
+    df = pd.DataFrame({'id': [1, 2, 3], 'grande': [1, 2, 2**40], 'usuario': ['root', 'root', 'etl']})
+    df_clean = limpieza_df(df).reducir_tipos(enteros=['id', 'grande'], categoricas=['usuario']).resultado()
+    assert df_clean['id'].dtype == 'int32'
+    # Un valor fuera de int32 deja la columna como estaba
+    assert df_clean['grande'].dtype == 'int64'
+    assert df_clean['usuario'].dtype == 'category'
+    assert df_clean['usuario'].tolist() == ['root', 'root', 'etl']
@@ -0,0 +1,51 @@
+import pytest
+
+from src.modulos import memoria
+from src.modulos.memoria import PresupuestoMemoria, parse_tamano, rss_actual, rss_pico, FACTOR_TRABAJO
+
+MiB = 1 << 20
+
+# -----------------------------
+# Test de parse_tamano
+# -----------------------------
+@pytest.mark.parametrize("valor, esperado", [("512M", 512 * MiB), ("2g", 2 << 30), ("800KB", 800 << 10), ("4096", 4096), (1024, 1024)])
+def test_parse_tamano(valor, esperado):
+    assert parse_tamano(valor) == esperado
+
+@pytest.mark.parametrize("valor", ["", "M", "0M", "1.5G", "12X", "-5M"])
+def test_parse_tamano_invalido(valor):
+    with pytest.raises(ValueError):
+        parse_tamano(valor)
+
+# -----------------------------
+# Test de PresupuestoMemoria con el RSS simulado
+# -----------------------------
+@pytest.fixture
+def rss(monkeypatch):
+    estado = {"rss": 100 * MiB}
+    monkeypatch.setattr(memoria, "rss_actual", lambda: estado["rss"])
+    return estado
+
+def test_filas_por_chunk_descuenta_el_rss_base(rss):
+    presupuesto = PresupuestoMemoria(200 * MiB)
+    # 100 MiB disponibles, 100 bytes por fila y su memoria de trabajo
+    filas = presupuesto.filas_por_chunk(100.0)
+    assert filas == int(100 * MiB / (100 * FACTOR_TRABAJO))
+    assert presupuesto.filas_por_chunk(100.0, pedido=5000) == 5000
+    # Sin memoria disponible el chunk es de una fila
+    assert PresupuestoMemoria(50 * MiB).filas_por_chunk(100.0) == 1
+
+def test_excedido_por_pendientes_o_rss(rss):
+    presupuesto = PresupuestoMemoria(200 * MiB)
+    assert not presupuesto.excedido(MiB)
+    assert presupuesto.excedido(100 * MiB // FACTOR_TRABAJO + 1)
+    rss["rss"] = 201 * MiB
+    assert presupuesto.excedido(0)
+    assert presupuesto.aliviar()
+
+def test_desde_config():
+    assert PresupuestoMemoria.desde_config({"CSV": {}}) is None
+    assert PresupuestoMemoria.desde_config({"CSV": {"max_memoria": "1G"}}).max_bytes == 1 << 30
+
+def test_rss_del_proceso():
+    assert 0 < rss_actual() <= rss_pico()
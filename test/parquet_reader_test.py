@@ -0,0 +1,47 @@
+import pytest
+import pandas as pd
+
+from src.submodulos.parquet_reader import ParquetReader
+
+@pytest.fixture
+def parquet_config(tmp_path):
+    # Archivo Parquet con 2 row groups de 2 filas y la fecha bajo el nombre 'ts'
+    file_path = tmp_path / "2012-1.parquet"
+    df = pd.DataFrame({
+        "user_id": [9, 10, 7, 9],
+        "price": [50.0, 87.0, 64.0, 14.0],
+        "ts": pd.to_datetime(["2012-01-10", "2012-01-11", "2012-01-12", "2012-01-13"], utc=True),
+        "updated_by": ["root"] * 4,
+    })
+    df.to_parquet(file_path, row_group_size=2, index=False)
+
+    config = {
+        "CSV": {"usecols": ["user_id", "price", "timestamp"]},
+        "PARQUET": {"alias": {"timestamp": "ts"}},
+    }
+    return config, str(file_path)
+
+# -----------------------------
+# Test lectura por row groups con proyección de columnas
+# -----------------------------
+def test_run_por_row_groups(parquet_config):
+    config, file_path = parquet_config
+    chunks = list(ParquetReader(config).run(file_path))
+    assert [len(c) for c in chunks] == [2, 2]
+    # 'ts' se entrega con el nombre del CSV y 'updated_by' no se lee
+    assert list(chunks[0].columns) == ["user_id", "price", "timestamp"]
+    assert chunks[1]["price"].tolist() == [64.0, 14.0]
+
+# -----------------------------
+# Test errores de archivo y columnas
+# -----------------------------
+def test_run_file_not_found(parquet_config):
+    config, _ = parquet_config
+    with pytest.raises(FileNotFoundError):
+        ParquetReader(config).run("no_existe.parquet")
+
+def test_run_columna_faltante(parquet_config):
+    config, file_path = parquet_config
+    config["PARQUET"]["alias"] = {}
+    with pytest.raises(ValueError, match="timestamp"):
+        ParquetReader(config).run(file_path)
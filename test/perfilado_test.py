@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from src.modulos import perfilado
+from src.modulos.perfilado import etapa_de, perfilar, resumir_pilas, guardar_perfil, ruta_relativa
+
+# -----------------------------
+# Helper: funciones que simulan etapas del pipeline
+# -----------------------------
+def ocupado(segundos):
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        pass
+
+def carga():
+    ocupado(0.15)
+
+# -----------------------------
+# Test de la atribución a etapas
+# -----------------------------
+def test_etapa_de_modulos_del_pipeline():
+    assert etapa_de("src/modulos/limpieza.py", "limpieza_df.eliminar_duplicados") == "limpieza_df.eliminar_duplicados"
+    assert etapa_de("src/modulos/db.py", "insert_events") == "db.insert_events"
+    assert etapa_de("src/modulos/stats.py", "RunningStats.merge_batch") == "stats.RunningStats.merge_batch"
+    assert etapa_de("pandas/io/parsers/readers.py", "TextFileReader.__next__") == "lectura"
+    assert etapa_de("src/modulos/ingesta.py", "procesar_chunk") is None
+    assert etapa_de("src/modulos/db.py", "<module>") is None
+
+def test_pila_se_atribuye_al_frame_mas_externo():
+    pilas = {
+        ("src/modulos/ingesta.py:ingest_file", "src/modulos/db.py:insert_events", "src/modulos/db.py:ejecutar_preparada", "psycopg2/extras.py:execute_values"): 3_000_000,
+        ("src/modulos/ingesta.py:ingest_file", "src/modulos/ingesta.py:procesar_chunk", "pandas/core/series.py:Series.min"): 1_000_000,
+        ("src/proceso.py:load", "src/modulos/ingesta.py:<module>"): 500_000,
+    }
+    etapas, funciones = resumir_pilas(pilas)
+    assert etapas == {"db.insert_events": 3.0, "ingesta.procesar_chunk": 1.0, "importación": 0.5}
+    assert funciones[0] == ("psycopg2/extras.py:execute_values", 3.0)
+
+def test_ruta_relativa():
+    assert ruta_relativa(str(perfilado.RAIZ / "src" / "modulos" / "db.py")) == "src/modulos/db.py"
+    assert ruta_relativa("/usr/lib/python3/site-packages/pandas/io/parsers/readers.py") == "pandas/io/parsers/readers.py"
+
+# -----------------------------
+# Test de los perfiladores
+# -----------------------------
+def test_muestreo_registra_las_pilas(tmp_path):
+    perfil = perfilar(carga, intervalo=0.002)
+    assert perfil.total_s >= 0.15
+    # Las pilas empiezan en la función perfilada, sin los frames de quien llama
+    assert all(pila[0].endswith(":carga") for pila in perfil.pilas)
+    assert any(pila[-1].endswith(":ocupado") for pila in perfil.pilas)
+    assert sum(perfil.etapas.values()) == pytest.approx(perfil.total_s, abs=0.05)
+
+    rutas = guardar_perfil(perfil, tmp_path)
+    assert set(rutas) == {"reporte", "pilas"}
+    linea = rutas["pilas"].read_text().splitlines()[0]
+    pila, valor = linea.rsplit(" ", 1)
+    assert pila.startswith("test/perfilado_test.py:carga;") and int(valor) > 0
+    assert "Perfilador: muestreo" in rutas["reporte"].read_text()
+
+def test_determinista_guarda_pstats(tmp_path):
+    perfil = perfilar(carga, perfilador="determinista")
+    assert "otros" in perfil.etapas and perfil.stats is not None
+    assert any(f.endswith(":ocupado") for f, _ in perfil.funciones)
+    rutas = guardar_perfil(perfil, tmp_path)
+    assert set(rutas) == {"reporte", "pstats"} and rutas["pstats"].stat().st_size > 0
+
+    with pytest.raises(ValueError):
+        perfilar(carga, perfilador="otro")
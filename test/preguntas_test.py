@@ -0,0 +1,106 @@
+import json
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from src.modulos.preguntas import leer_preguntas, escribir_respuestas, consumir_stream
+from src.submodulos.llm import VectorStoreLLM
+
+
+class StubRetriever:
+    """ Retriever determinista: devuelve un documento por pregunta. """
+    def invoke(self, pregunta):
+        return self.batch([pregunta])[0]
+
+    def batch(self, preguntas, config=None):
+        return [[SimpleNamespace(metadata={"user_id": 1, "precio": 10.0, "timestamp": "2012-01-01", "updated_by": "test"})]
+                for _ in preguntas]
+
+
+class StubChain:
+    """ Chain determinista: responde con la pregunta y falla si se le indica. """
+    def __init__(self):
+        self.en_curso = 0
+        self.max_en_curso = 0
+
+    def stream(self, entrada):
+        for palabra in f"respuesta a {entrada['question']}".split(" "):
+            yield palabra + " "
+
+    async def ainvoke(self, entrada):
+        self.en_curso += 1
+        self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        await asyncio.sleep(0.01)
+        self.en_curso -= 1
+        if entrada["question"] == "falla":
+            raise RuntimeError("modelo caido")
+        return f"respuesta a {entrada['question']}"
+
+
+@pytest.fixture
+def vector():
+    # Se evita el __init__ para no depender de Ollama ni de Chroma
+    vector = object.__new__(VectorStoreLLM)
+    vector.retriever = StubRetriever()
+    vector.chain = StubChain()
+    return vector
+
+# -----------------------------
+# Test de leer_preguntas
+# -----------------------------
+def test_leer_preguntas(tmp_path):
+    path = tmp_path / "preguntas.txt"
+    path.write_text("# nocturnas\nprimera\n\n  segunda  \n", encoding="utf-8")
+    assert leer_preguntas(path) == ["primera", "segunda"]
+
+def test_leer_preguntas_no_existe(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        leer_preguntas(tmp_path / "no_existe.txt")
+
+# -----------------------------
+# Test de escribir_respuestas
+# -----------------------------
+def test_escribir_respuestas(tmp_path):
+    path = tmp_path / "salida" / "respuestas.jsonl"
+    resultados = [{"pregunta": "¿hola?", "respuesta": "sí", "latencia_s": 0.1}]
+    assert escribir_respuestas(path, resultados) == 1
+    lineas = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(l) for l in lineas] == resultados
+
+# -----------------------------
+# Test de get_preguntas (lote concurrente)
+# -----------------------------
+def test_get_preguntas_orden_y_concurrencia(vector):
+    preguntas = [f"p{i}" for i in range(6)]
+    resultados = vector.get_preguntas(preguntas, max_workers=2)
+    assert [r["respuesta"] for r in resultados] == [f"respuesta a p{i}" for i in range(6)]
+    assert all(r["latencia_s"] > 0 for r in resultados)
+    assert vector.chain.max_en_curso == 2
+
+def test_get_preguntas_error_no_detiene_lote(vector):
+    resultados = vector.get_preguntas(["ok", "falla"], max_workers=4)
+    assert resultados[0]["respuesta"] == "respuesta a ok"
+    assert resultados[1]["respuesta"] is None
+    assert resultados[1]["error"] == "modelo caido"
+
+def test_get_preguntas_workers_invalido(vector):
+    with pytest.raises(ValueError):
+        vector.get_preguntas(["p"], max_workers=0)
+
+# -----------------------------
+# Test de streaming
+# -----------------------------
+def test_get_pregunta_stream(vector):
+    assert list(vector.get_pregunta_stream("p1")) == ["respuesta ", "a ", "p1 "]
+
+def test_consumir_stream(vector):
+    recibidos = []
+    medicion = consumir_stream(vector.get_pregunta_stream("p1"), recibidos.append)
+    assert medicion["respuesta"] == "respuesta a p1 "
+    assert recibidos == ["respuesta ", "a ", "p1 "]
+    assert 0 <= medicion["ttft_s"] <= medicion["latencia_s"]
+
+def test_consumir_stream_vacio():
+    medicion = consumir_stream(iter([]))
+    assert medicion["respuesta"] == ""
+    assert medicion["ttft_s"] is None
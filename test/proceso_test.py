@@ -0,0 +1,24 @@
+import pytest
+from click.testing import CliRunner
+
+from src.proceso import cli
+
+# -----------------------------
+# Test de las opciones de load
+# -----------------------------
+@pytest.mark.parametrize("argumentos, mensaje", [
+    (["--worker", "--follow"], "--worker y --follow no se pueden combinar"),
+    (["--follow", "--single", "a.csv", "--coalesce"], "--follow y --single y --coalesce no se pueden combinar"),
+    (["--batch-rows", "10"], "--batch-rows solo aplica con --coalesce"),
+    (["--poll"], "--poll solo aplica con --follow"),
+    (["--coalesce", "--poll"], "--poll solo aplica con --follow"),
+    (["--worker-id", "w1"], "--worker-id solo aplica con --worker"),
+])
+def test_load_rechaza_opciones_incompatibles(monkeypatch, argumentos, mensaje):
+    import src.modulos.db as db
+    # El error de uso se detecta antes de tocar la base de datos
+    monkeypatch.setattr(db, "validar_sql", lambda config: pytest.fail("se validaron las queries"))
+
+    resultado = CliRunner().invoke(cli, ["load", *argumentos])
+    assert resultado.exit_code == 2
+    assert mensaje in resultado.output
@@ -0,0 +1,124 @@
+import pandas as pd
+from langchain_core.documents import Document
+
+from src.submodulos.retrieval import extraer_filtros, BM25Index, HybridRetriever
+
+# -----------------------------
+# Datos de prueba
+# -----------------------------
+FILAS = [
+    ("a", "9", "2012-01-10 00:00:00+00:00", "El usuario 9 realizó una compra por 50.0 USD"),
+    ("b", "9", "2012-02-20 00:00:00+00:00", "El usuario 9 realizó una compra por 14.0 USD"),
+    ("c", "7", "2012-01-15 00:00:00+00:00", "El usuario 7 realizó una compra por 89.0 USD"),
+    ("d", "7", "2012-03-01 00:00:00+00:00", "El usuario 7 realizó una devolución por 33.0 USD"),
+]
+
+class StubStore:
+    """ Vector store mínimo: get() devuelve todo y similarity_search respeta el orden y el filtro de usuario. """
+    def __init__(self):
+        self.filtros = []
+
+    def get(self, include=None):
+        return {
+            "ids": [f[0] for f in FILAS],
+            "documents": [f[3] for f in FILAS],
+            "metadatas": [{"user_id": f[1], "timestamp": f[2]} for f in FILAS],
+        }
+
+    def similarity_search(self, pregunta, k, filter=None):
+        self.filtros.append(filter)
+        docs = [Document(id=f[0], page_content=f[3], metadata={"user_id": f[1], "timestamp": f[2]}) for f in FILAS]
+        if filter and "user_id" in filter:
+            docs = [d for d in docs if d.metadata["user_id"] == filter["user_id"]]
+        return docs[:k]
+
+# -----------------------------
+# Test de extraer_filtros
+# -----------------------------
+def test_extraer_filtros_formatos():
+    dia = extraer_filtros("compras del usuario 9 el 1/10/2012")
+    assert dia["user_id"] == 9
+    assert dia["desde"] == pd.Timestamp("2012-01-10", tz="UTC")
+    assert dia["hasta"] == pd.Timestamp("2012-01-11", tz="UTC")
+
+    mes = extraer_filtros("¿qué compró el usuario 7 en enero de 2012?")
+    assert (mes["desde"], mes["hasta"]) == (pd.Timestamp("2012-01-01", tz="UTC"), pd.Timestamp("2012-02-01", tz="UTC"))
+
+    assert extraer_filtros("compras de 2012-03")["desde"] == pd.Timestamp("2012-03-01", tz="UTC")
+    assert extraer_filtros("ventas en 2012")["hasta"] == pd.Timestamp("2013-01-01", tz="UTC")
+
+def test_extraer_filtros_sin_restricciones():
+    assert extraer_filtros("¿cuál fue la compra más cara?") == {"user_id": None, "desde": None, "hasta": None}
+
+def test_extraer_filtros_fechas_invalidas_no_filtran():
+    # Fechas inexistentes: sin filtro de fecha, y sin releer el texto como mes o año
+    assert extraer_filtros("compras del 2012-02-30")["desde"] is None
+    assert extraer_filtros("pedido 1234-56")["desde"] is None
+    # Día/mes cuando mes/día no es una fecha válida
+    filtros = extraer_filtros("precio 25/12/2012")
+    assert filtros["desde"] == pd.Timestamp("2012-12-25", tz="UTC")
+    assert filtros["hasta"] == pd.Timestamp("2012-12-26", tz="UTC")
+
+# -----------------------------
+# Test de BM25Index
+# -----------------------------
+def test_bm25_ranking_y_candidatos():
+    datos = StubStore().get()
+    indice = BM25Index(datos["ids"], datos["documents"], datos["metadatas"])
+    assert indice.buscar("devolución", k=2) == [3]
+
+    candidatos = indice.candidatos(extraer_filtros("usuario 9 en enero 2012"))
+    assert candidatos == {0}
+    assert indice.candidatos({"user_id": None, "desde": None}) is None
+    # Índices por usuario y por mes
+    assert indice.por_usuario["9"] == {0, 1} and indice.por_mes[(2012, 1)] == {0, 2}
+    assert indice.candidatos(extraer_filtros("compras del 2012-02-20")) == {1}
+    assert indice.candidatos(extraer_filtros("usuario 7 en 2012")) == {2, 3}
+    assert indice.candidatos(extraer_filtros("usuario 5")) == set()
+
+# -----------------------------
+# Test de HybridRetriever
+# -----------------------------
+def test_hybrid_retriever_filtro_directo():
+    store = StubStore()
+    retriever = HybridRetriever(store, k=2)
+    docs = retriever.invoke("compras del usuario 9")
+    # Dos candidatos <= k: se devuelven ordenados por fecha sin búsqueda vectorial
+    assert [d.id for d in docs] == ["a", "b"]
+    assert store.filtros == []
+
+def test_hybrid_retriever_fusion_respeta_filtros():
+    store = StubStore()
+    retriever = HybridRetriever(store, k=1)
+    docs = retriever.invoke("devolución del usuario 7")
+    assert len(docs) == 1 and docs[0].metadata["user_id"] == "7"
+    assert store.filtros == [{"user_id": "7"}]
+    assert len(retriever.batch(["usuario 7", "usuario 9"])) == 2
+
+def test_hybrid_retriever_batch_concurrente():
+    import threading
+    import time
+
+    class StoreLento(StubStore):
+        def __init__(self):
+            super().__init__()
+            self.lock = threading.Lock()
+            self.en_curso = self.max_en_curso = 0
+
+        def similarity_search(self, pregunta, k, filter=None):
+            with self.lock:
+                self.en_curso += 1
+                self.max_en_curso = max(self.max_en_curso, self.en_curso)
+            time.sleep(0.05)
+            with self.lock:
+                self.en_curso -= 1
+            return super().similarity_search(pregunta, k, filter)
+
+    store = StoreLento()
+    retriever = HybridRetriever(store, k=1)
+    preguntas = ["devolución del usuario 7", "reseña del usuario 9", "envío", "precio", "calidad"]
+    lotes = retriever.batch(preguntas, config={"max_concurrency": 2})
+
+    # Mismo orden y resultado que invoke, con a lo sumo 'max_concurrency' búsquedas a la vez
+    assert lotes == [retriever.invoke(p) for p in preguntas]
+    assert store.max_en_curso == 2
@@ -0,0 +1,143 @@
+import pandas as pd
+import pytest
+from src.modulos.stats import HyperLogLog
+from src.submodulos.router import QueryRouter, extraer_usuario
+
+
+class StubRAG:
+    """ Modelo determinista que reemplaza a VectorStoreLLM en los test. """
+    def __init__(self):
+        self.preguntas = []
+
+    def get_pregunta(self, pregunta):
+        self.preguntas.append(pregunta)
+        return f"RAG: {pregunta}"
+
+
+@pytest.fixture
+def router():
+    rag = StubRAG()
+    hll = HyperLogLog()
+    hll.update_batch(pd.Series(range(1, 101)))
+    fuente_stats = lambda config: {"count": 4, "mean": 25.0, "min": 10.0, "max": 40.0, "hll": hll.a_bytes()}
+    fuente_usuario = lambda user_id, config: {
+        "total_rows": 2, "avg_price": 15.0, "min_price": 10.0, "max_price": 20.0, "sum_price": 30.0
+    }
+    fuente_rango = lambda config, desde, hasta: {"total_rows": 3, "avg_price": 12.0, "min_price": 5.0, "max_price": 20.0}
+    router = QueryRouter(
+        {"dummy": "config"}, rag=rag, fuente_stats=fuente_stats, fuente_usuario=fuente_usuario, fuente_rango=fuente_rango,
+    )
+    return router, rag
+
+# -----------------------------
+# Test de extraer_usuario
+# -----------------------------
+def test_extraer_usuario():
+    assert extraer_usuario("max purchase of user 7") == 7
+    assert extraer_usuario("compras del usuario 12 en enero") == 12
+    assert extraer_usuario("cual es el promedio") is None
+
+# -----------------------------
+# Test de clasificar
+# -----------------------------
+def test_clasificar_agregado(router):
+    router, _ = router
+    intencion = router.clasificar("What is the average price?")
+    assert intencion.tipo == "agregado"
+    assert intencion.metricas == ["promedio"]
+
+def test_clasificar_usuario(router):
+    router, _ = router
+    intencion = router.clasificar("max purchase of user 7")
+    assert intencion.tipo == "usuario"
+    assert intencion.user_id == 7
+    assert intencion.metricas == ["maximo"]
+
+@pytest.mark.parametrize("pregunta", [
+    "Cual fue el promedio de gastos por mes y dame un listado de los 5 primeros",
+    "Cual fue el usuario que menos gasto",
+    "En que fecha se obtuvieron los mayores y menores ingresos",
+    "Que opinas de las compras?",
+    # Condiciones que ninguna fuente de agregados aplica
+    "average price of purchases above 50",
+    "cuantas compras mayores a 100",
+    "promedio del usuario 7 en enero 2012",
+    "cuantos usuarios distintos compraron en 2012",
+])
+def test_clasificar_abiertas(router, pregunta):
+    router, _ = router
+    assert router.clasificar(pregunta).tipo == "rag"
+
+@pytest.mark.parametrize("pregunta, desde, hasta", [
+    ("cual es el precio promedio en enero 2012", "2012-01-01", "2012-02-01"),
+    ("cuántas compras hubo en 2012-03", "2012-03-01", "2012-04-01"),
+])
+def test_clasificar_agregado_con_fecha(router, pregunta, desde, hasta):
+    router, _ = router
+    intencion = router.clasificar(pregunta)
+    assert intencion.tipo == "agregado"
+    assert (intencion.desde, intencion.hasta) == (pd.Timestamp(desde, tz="UTC"), pd.Timestamp(hasta, tz="UTC"))
+
+def test_clasificar_usuarios_distintos(router):
+    router, _ = router
+    intencion = router.clasificar("cuántos usuarios distintos hay")
+    assert intencion.tipo == "agregado" and intencion.metricas == ["usuarios"]
+
+# -----------------------------
+# Test de responder
+# -----------------------------
+def test_responder_desde_running_stats(router):
+    router, rag = router
+    respuesta = router.responder("cual es el precio minimo y maximo")
+    assert respuesta == "Todas las compras → Precio minimo: 10.00, Precio maximo: 40.00"
+    assert rag.preguntas == []
+
+def test_responder_rango_de_fechas(router):
+    router, rag = router
+    rangos = []
+    fuente_rango = router.fuente_rango
+    router.fuente_rango = lambda config, desde, hasta: rangos.append((desde, hasta)) or fuente_rango(config, desde, hasta)
+    respuesta = router.responder("cuántas compras hubo en 2012-03")
+    assert respuesta == "Compras desde 2012-03-01 hasta 2012-04-01 (exclusivo) → Total de compras: 3"
+    assert rangos == [(pd.Timestamp("2012-03-01", tz="UTC"), pd.Timestamp("2012-04-01", tz="UTC"))]
+    assert rag.preguntas == []
+
+def test_responder_usuarios_distintos_desde_hll(router):
+    router, rag = router
+    respuesta = router.responder("how many distinct users?")
+    sujeto, estimacion = respuesta.split(" → Usuarios distintos (estimado): ")
+    # 100 usuarios en el sketch; la estimación tiene error de ~1.6 %
+    assert sujeto == "Todas las compras" and abs(int(estimacion) - 100) <= 5
+    assert rag.preguntas == []
+
+def test_responder_usuario(router):
+    router, rag = router
+    respuesta = router.responder("cuantas compras y gasto total del usuario 3")
+    assert respuesta == "Usuario 3 → Total de compras: 2, Gasto total: 30.00"
+    assert rag.preguntas == []
+
+def test_responder_fallback_rag(router):
+    router, rag = router
+    respuesta = router.responder("Cual fue el usuario que menos gasto")
+    assert respuesta == "RAG: Cual fue el usuario que menos gasto"
+    assert rag.preguntas == ["Cual fue el usuario que menos gasto"]
+
+def test_responder_stream(router):
+    router, rag = router
+    rag.get_pregunta_stream = lambda pregunta: iter(["RAG", ": ", pregunta])
+    assert list(router.responder_stream("describe las compras")) == ["RAG", ": ", "describe las compras"]
+    assert list(router.responder_stream("cual es el maximo")) == ["Todas las compras → Precio maximo: 40.00"]
+
+def test_responder_lote(router):
+    router, rag = router
+    rag.get_preguntas = lambda preguntas, max_workers: [{"respuesta": f"RAG: {p}", "latencia_s": 0.5} for p in preguntas]
+    resultados = router.responder_lote(["describe las compras", "cual es el promedio"], max_workers=2)
+    assert [r["ruta"] for r in resultados] == ["rag", "agregado"]
+    assert resultados[0]["respuesta"] == "RAG: describe las compras"
+    assert resultados[1]["respuesta"] == "Todas las compras → Promedio de precio: 25.00"
+    assert all("latencia_s" in r for r in resultados)
+
+def test_responder_sin_rag():
+    router = QueryRouter({}, fuente_stats=lambda c: {}, fuente_usuario=lambda u, c: {})
+    with pytest.raises(ValueError):
+        router.responder("describe las compras")
@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+
+import pytest
+
+from src.modulos import seguimiento
+from src.modulos.seguimiento import Seguidor
+from src.modulos.stats import RunningStats, WindowedStats
+
+# -----------------------------
+# Fixture: directorio seguido y base de datos simulada
+# -----------------------------
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    datos = tmp_path / "datos"
+    datos.mkdir()
+    insertados = []
+
+    def procesar(chunk, rs, mode, config, conn=None, ventana=None, conteos=None):
+        insertados.append(chunk.copy())
+        for nombre, n in chunk["archivo"].value_counts().items():
+            conteos.setdefault(nombre, [0, 0])[0] += int(n)
+        return len(chunk)
+
+    monkeypatch.setattr(seguimiento, "procesar_chunk", procesar)
+    monkeypatch.setattr(seguimiento, "conexion", contextmanager(lambda config: (yield None)))
+    monkeypatch.setattr(seguimiento, "registrar_archivos", lambda conteos, config, conn: None)
+    monkeypatch.setattr(seguimiento, "fetch_archivos_cargados", lambda config: set())
+    monkeypatch.setattr(seguimiento, "persist_running_stats", lambda rs, config: None)
+    monkeypatch.setattr(seguimiento, "load_running_stats_from_db", lambda config: RunningStats())
+    monkeypatch.setattr(seguimiento, "load_windowed_stats_from_db", lambda config: WindowedStats())
+    monkeypatch.setattr(seguimiento, "persist_windowed_stats", lambda ventana, config: None)
+
+    def config(**follow):
+        return {"SQL": {}, "CSV": {
+            "CSV_DIR": str(datos),
+            "file_validation": "validation.csv",
+            "usecols": ["user_id", "price", "timestamp"],
+            "follow": {"max_latencia_s": 100, "estado": str(tmp_path / "estado.json"), **follow},
+        }}
+    return datos, insertados, config
+
+@pytest.fixture
+def procedencia(entorno, monkeypatch):
+    """ Lotes registrados en 'archivos_cargados' y archivos que la base de datos da por cargados. """
+    lotes, cargados = [], set()
+    monkeypatch.setattr(seguimiento, "registrar_archivos", lambda conteos, config, conn: lotes.append(conteos))
+    monkeypatch.setattr(seguimiento, "fetch_archivos_cargados", lambda config: cargados)
+    return lotes, cargados
+
+# -----------------------------
+# Test de filas agregadas a un CSV que sigue creciendo
+# -----------------------------
+def test_sigue_filas_agregadas(entorno):
+    datos, insertados, config = entorno
+    archivo = datos / "2012-1.csv"
+    archivo.write_text("timestamp,price,user_id\n1/10/2012,50,9\n1/11/2012,87,10\n1/12/2012,6")
+
+    seguidor = Seguidor(config())
+    seguidor.revisar()
+    # La latencia máxima no se cumplió: las filas quedan en el lote pendiente
+    assert insertados == [] and seguidor.filas_pendientes == 2
+    seguidor.vaciar()
+    assert insertados[0]["price"].tolist() == [50, 87]
+
+    # La línea incompleta se carga cuando termina
+    with open(archivo, "a") as f:
+        f.write("4,7\n")
+    seguidor.revisar()
+    seguidor.vaciar()
+    assert insertados[1][["price", "user_id"]].values.tolist() == [[64, 7]]
+    assert seguidor.estado["2012-1.csv"]["offset"] == archivo.stat().st_size
+
+    # Un nuevo proceso continúa desde el offset guardado
+    otro = Seguidor(config())
+    otro.revisar()
+    otro.vaciar()
+    assert len(insertados) == 2
+
+def test_vacia_por_tamano_y_archivo_quieto(entorno):
+    datos, insertados, config = entorno
+    (datos / "2012-1.csv").write_text("timestamp,price,user_id\n1/10/2012,50,9\n1/11/2012,87,10\n1/12/2012,64,7")
+    (datos / "validation.csv").write_text("timestamp,price,user_id\n1/1/2012,1,1\n")
+
+    # max_latencia_s = 0: el archivo está quieto y su última línea sin salto también se carga
+    seguidor = Seguidor(config(max_filas=2, max_latencia_s=0))
+    seguidor.revisar()
+    assert [len(c) for c in insertados] == [3]
+    assert seguidor.filas_pendientes == 0
+
+def test_archivo_truncado_se_relee(entorno):
+    datos, insertados, config = entorno
+    archivo = datos / "2012-1.csv"
+    archivo.write_text("timestamp,price,user_id\n1/10/2012,50,9\n1/11/2012,87,10\n")
+    seguidor = Seguidor(config())
+    seguidor.revisar()
+    seguidor.vaciar()
+
+    archivo.write_text("timestamp,price,user_id\n2/1/2012,5,1\n")
+    seguidor.revisar()
+    seguidor.vaciar()
+    assert insertados[-1]["price"].tolist() == [5]
+
+# -----------------------------
+# Test de procedencia y del estado inicial
+# -----------------------------
+def test_lote_registra_el_archivo_de_cada_fila(entorno, procedencia):
+    datos, insertados, config = entorno
+    lotes, _ = procedencia
+    (datos / "2012-1.csv").write_text("timestamp,price,user_id\n1/10/2012,50,9\n")
+    # La misma fila en otro archivo no es un duplicado del lote
+    (datos / "2012-2.csv").write_text("timestamp,price,user_id\n1/10/2012,50,9\n2/1/2012,5,1\n")
+    seguidor = Seguidor(config())
+    seguidor.revisar()
+    seguidor.vaciar()
+    assert insertados[0]["archivo"].tolist() == ["2012-1.csv", "2012-2.csv", "2012-2.csv"]
+    assert lotes == [{"2012-1.csv": [1, 0], "2012-2.csv": [2, 0]}]
+
+def test_sin_estado_parte_de_los_archivos_cargados(entorno, procedencia):
+    datos, insertados, config = entorno
+    _, cargados = procedencia
+    archivo = datos / "2012-1.csv"
+    archivo.write_text("timestamp,price,user_id\n1/10/2012,50,9\n")
+    (datos / "2012-2.csv").write_text("timestamp,price,user_id\n2/1/2012,5,1\n")
+    cargados.add("2012-1.csv")
+
+    seguidor = Seguidor(config())
+    seguidor.revisar()
+    seguidor.vaciar()
+    # Solo el archivo que la base de datos no registra como cargado
+    assert insertados[0]["archivo"].tolist() == ["2012-2.csv"]
+
+    # Las filas nuevas del archivo ya cargado se leen con su cabecera
+    with open(archivo, "a") as f:
+        f.write("1/11/2012,87,10\n")
+    seguidor.revisar()
+    seguidor.vaciar()
+    assert insertados[1][["price", "user_id", "archivo"]].values.tolist() == [[87, 10, "2012-1.csv"]]
@@ -0,0 +1,166 @@
+import math
+
+import numpy as np
+import pytest
+import pandas as pd
+
+from src.modulos.stats import RunningStats, WindowedStats, HyperLogLog, splitmix64, suma_compensada
+
+# -----------------------------
+# Test de RunningStats contra NumPy
+# -----------------------------
+def test_update_one_welford_coincide_con_numpy():
+    valores = np.random.default_rng(7).normal(50.0, 12.0, 200_000)
+    rs = RunningStats()
+    for x in valores.tolist():
+        rs.update_one(x)
+
+    assert rs.count == len(valores)
+    assert rs.mean + rs.mean_c == pytest.approx(valores.mean(), rel=1e-12)
+    assert rs.varianza == pytest.approx(valores.var(ddof=1), rel=1e-9)
+    assert rs.desviacion == pytest.approx(valores.std(ddof=1), rel=1e-9)
+    assert (rs.min, rs.max) == (valores.min(), valores.max())
+
+def test_merge_batch_chan_con_desplazamiento_grande():
+    # Media muy grande frente a la dispersión: la fórmula ingenua sum(x^2) - n*mean^2 falla aquí
+    valores = 1e9 + np.random.default_rng(11).uniform(0.0, 1.0, 1_000_000)
+    rs = RunningStats()
+    for lote in np.array_split(valores, 337):
+        media = float(lote.mean())
+        rs.merge_batch(len(lote), media, float(lote.min()), float(lote.max()), float(((lote - media) ** 2).sum()))
+
+    assert rs.count == len(valores)
+    assert rs.mean + rs.mean_c == pytest.approx(valores.mean(), rel=1e-15)
+    assert rs.varianza == pytest.approx(valores.var(ddof=1), rel=1e-9)
+    assert (rs.min, rs.max) == (valores.min(), valores.max())
+
+def test_merge_de_dos_running_stats():
+    valores = np.random.default_rng(3).exponential(20.0, 50_000)
+    a, b = RunningStats(), RunningStats()
+    for x in valores[:1000].tolist():
+        a.update_one(x)
+    for x in valores[1000:].tolist():
+        b.update_one(x)
+    a.merge(b)
+
+    assert a.count == len(valores)
+    assert a.varianza == pytest.approx(valores.var(ddof=1), rel=1e-10)
+    # Un batch vacío no cambia nada
+    antes = (a.count, a.mean, a.m2)
+    a.merge_batch(0, 0.0, math.inf, -math.inf)
+    assert (a.count, a.mean, a.m2) == antes
+
+def test_varianza_con_menos_de_dos_valores():
+    rs = RunningStats()
+    assert rs.varianza is None
+    rs.update_one(5.0)
+    assert rs.varianza is None and rs.desviacion is None
+
+def test_suma_compensada_recupera_bits_perdidos():
+    total, comp = 1.0, 0.0
+    for _ in range(10_000):
+        total, comp = suma_compensada(total, comp, 1e-16)
+    # Sin compensación cada 1e-16 se pierde frente a 1.0
+    assert total == 1.0
+    assert total + comp == pytest.approx(1.0 + 1e-12, rel=1e-15)
+
+# -----------------------------
+# Test de HyperLogLog
+# -----------------------------
+def test_splitmix64_vector_de_referencia():
+    # Primeras salidas del generador splitmix64 con semilla 0 y 1
+    assert [hex(int(h)) for h in splitmix64([0, 1])] == ["0xe220a8397b1dcdaf", "0x910a2dec89025cc1"]
+
+@pytest.mark.parametrize("n", [100, 5_000, 250_000])
+def test_hll_estima_dentro_de_la_cota(n):
+    usuarios = np.random.default_rng(n).choice(10**12, size=n, replace=False)
+    hll = HyperLogLog()
+    # Los repetidos no cambian la estimación
+    hll.update_batch(usuarios)
+    hll.update_batch(usuarios[: n // 2])
+    # 3 errores estándar: la prueba no falla por azar
+    assert abs(hll.estimar() / n - 1) <= 3 * hll.error_relativo(0.68)
+
+def test_hll_fusion_igual_a_sketch_unico():
+    usuarios = np.random.default_rng(1).integers(0, 10**9, 100_000)
+    completo, a, b = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    completo.update_batch(usuarios)
+    a.update_batch(usuarios[:30_000])
+    b.update_batch(usuarios[20_000:])
+    a.merge(b)
+    assert np.array_equal(a.registros, completo.registros)
+
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(p=10))
+
+def test_hll_serializacion():
+    hll = HyperLogLog(p=12)
+    hll.update_batch(np.arange(1000))
+    copia = HyperLogLog.desde_bytes(hll.a_bytes())
+    assert copia.p == 12 and copia.estimar() == hll.estimar()
+    # Sin sketch persistido: vacío
+    assert HyperLogLog.desde_bytes(None).estimar() == 0.0
+
+def test_running_stats_fusiona_usuarios():
+    a, b = RunningStats(), RunningStats()
+    a.usuarios.update_batch(np.array([1, 2, 3]))
+    b.usuarios.update_batch(np.array([3, 4]))
+    b.update_one(1.0)
+    a.merge(b)
+    assert round(a.usuarios.estimar()) == 4
+
+# -----------------------------
+# Helper: lote de valores con su fecha
+# -----------------------------
+def lote(*pares):
+    ts = pd.to_datetime(pd.Series([p[0] for p in pares]), utc=True)
+    precios = pd.Series([float(p[1]) for p in pares])
+    return ts, precios
+
+# -----------------------------
+# Test de WindowedStats
+# -----------------------------
+def test_ventana_resume_los_ultimos_buckets():
+    ws = WindowedStats(bucket_s=86400, n_buckets=7)
+    ws.update_batch(*lote(("2012-01-01", 10), ("2012-01-05", 20), ("2012-01-06", 30), ("2012-01-06", 50)))
+
+    dia = ws.resumen(86400)
+    assert (dia["count"], dia["mean"], dia["min"], dia["max"]) == (2, 40.0, 30.0, 50.0)
+    assert str(dia["desde"]) == "2012-01-06 00:00:00+00:00"
+    assert str(dia["hasta"]) == "2012-01-07 00:00:00+00:00"
+
+    # Dos días: entra el 5 de enero; la ventana se redondea a buckets completos
+    dos = ws.resumen(86400 + 3600)
+    assert (dos["count"], dos["min"], dos["max"]) == (3, 20.0, 50.0)
+    assert ws.resumen(7 * 86400)["count"] == 4
+
+def test_ventana_descarta_buckets_fuera_de_retencion():
+    ws = WindowedStats(bucket_s=86400, n_buckets=3)
+    ws.update_batch(*lote(("2012-01-01", 10), ("2012-01-02", 20)))
+    # El 4 de enero ocupa el slot del 1 de enero, que sale de la retención
+    ws.update_batch(*lote(("2012-01-04", 40)))
+    assert ws.resumen(3 * 86400)["count"] == 2
+    # Un valor más antiguo que la retención se descarta
+    ws.update_batch(*lote(("2012-01-01", 99)))
+    assert ws.resumen(3 * 86400)["max"] == 40.0
+
+    with pytest.raises(ValueError):
+        ws.resumen(4 * 86400)
+
+def test_ventana_se_reconstruye_desde_filas():
+    ws = WindowedStats(bucket_s=3600, n_buckets=24)
+    ws.update_batch(*lote(("2012-01-01 10:00", 1), ("2012-01-01 10:30", 3), ("2012-01-01 12:00", 5)))
+    filas = ws.filas()
+    assert len(filas) == 2
+    ws.limpiar()
+    assert ws.filas() == []
+
+    copia = WindowedStats.desde_filas(filas, bucket_s=3600, n_buckets=24)
+    assert copia.resumen(3 * 3600) == ws.resumen(3 * 3600)
+    # Con otra retención los slots se recalculan a partir del bucket
+    menor = WindowedStats.desde_filas(filas, bucket_s=3600, n_buckets=5)
+    assert menor.resumen(5 * 3600)["count"] == 3
+
+def test_ventana_vacia():
+    resumen = WindowedStats().resumen(3600)
+    assert resumen["count"] == 0 and resumen["mean"] is None and resumen["desde"] is None
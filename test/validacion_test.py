@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from src.modulos.validacion import Validador, MOTIVOS
+from src.modulos.limpieza import limpieza_df
+
+# -----------------------------
+# Fixture: chunk como lo entrega el lector de CSV
+# -----------------------------
+def chunk_crudo():
+    return pd.DataFrame({
+        "timestamp": ["1/1/2012", "1/2/2012", "1/3/2012", "13/45/2012", "1/4/2012", "1/5/2012", None],
+        "price": ["10", None, "20", "30", "-5", "40", "x"],
+        "user_id": ["1", "2", "abc", "3", "4", "1.5", None],
+    })
+
+def con_fechas(chunk):
+    return limpieza_df(chunk).renombrar_columnas({"timestamp": "ts"}).cambiar_tipo_fecha(["ts"]).resultado()
+
+CONFIG = {"VALIDACION": {"reglas": {"price": {"min": 0}, "ts": {"desde": "2012-01-01", "hasta": "2012-01-05"}}}}
+
+# -----------------------------
+# Test de las reglas
+# -----------------------------
+def test_separar_valida_tipos_y_rangos():
+    crudo = chunk_crudo()
+    validas, rechazadas = Validador(CONFIG).separar(con_fechas(crudo), crudo=crudo)
+
+    assert validas["user_id"].tolist() == [1]
+    assert validas["user_id"].dtype == "int64" and validas["price"].dtype == "float64"
+    assert rechazadas["motivo"].tolist() == [
+        "price vacío o no numérico",
+        "user_id vacío o no entero",
+        "ts vacío o inválido",
+        "price fuera de rango",
+        # 2012-01-05 queda fuera: 'hasta' es exclusivo
+        "user_id vacío o no entero; ts fuera de rango",
+        "ts vacío o inválido; price vacío o no numérico; user_id vacío o no entero",
+    ]
+    # Se guardan los valores originales como texto
+    assert rechazadas.loc[3, ["user_id", "price", "ts"]].tolist() == ["3", "30", "13/45/2012"]
+    assert rechazadas.loc[6, "ts"] is None
+
+def test_usuarios_permitidos():
+    df = pd.DataFrame({"ts": pd.to_datetime(["2012-01-01"] * 3, utc=True), "price": [1.0, 2.0, 3.0], "user_id": [7, 8, 9]})
+    config = {"VALIDACION": {"reglas": {"user_id": {"permitidos": [9, 7], "max": 8}}}}
+    validas, rechazadas = Validador(config).separar(df)
+
+    assert validas["user_id"].tolist() == [7]
+    assert rechazadas["motivo"].tolist() == ["user_id no permitido", "user_id fuera de rango"]
+
+def test_chunk_valido_sin_configuracion():
+    df = pd.DataFrame({"ts": pd.to_datetime(["2012-01-01"], utc=True), "price": ["12.5"], "user_id": [3.0]})
+    validas, rechazadas = Validador({}).separar(df)
+    assert validas["price"].tolist() == [12.5] and validas["user_id"].tolist() == [3]
+    assert rechazadas.empty and "motivo" in rechazadas.columns
+
+def test_motivos_por_codigo():
+    codigos = np.array([1, 0b1000000, 1, 0b110], dtype=np.uint8)
+    assert Validador.motivos(codigos).tolist() == [
+        MOTIVOS[0], MOTIVOS[6], MOTIVOS[0], f"{MOTIVOS[1]}; {MOTIVOS[2]}",
+    ]